@@ -0,0 +1,74 @@
+"""
+Сравнение скорости извлечения текста из .docx: потоковый разбор XML
+(src.model.docx_text) против объектной модели python-docx.
+
+Запуск из корня проекта:
+    python benchmarks/bench_docx_extraction.py --pages 300
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from docx import Document
+
+from src.model.ioc_parser import IOCParser
+
+PARAGRAPHS_PER_PAGE = 12
+TABLE_ROWS_PER_PAGE = 8
+
+
+def build_document(path, pages):
+    """
+    Создает документ примерно на `pages` страниц: абзацы текста и таблица
+    индикаторов с объединенными ячейками на каждой странице.
+    """
+    document = Document()
+    for page in range(pages):
+        for i in range(PARAGRAPHS_PER_PAGE):
+            document.add_paragraph(f"Страница {page}, абзац {i}: вредоносный домен evil{page}-{i}[.]com, адрес 10[.]0[.]{page % 256}[.]{i}.")
+        table = document.add_table(rows=TABLE_ROWS_PER_PAGE, cols=3)
+        for r, row in enumerate(table.rows):
+            row.cells[0].text = f"{page:08x}{r:08x}{page:08x}{r:08x}"
+            row.cells[1].text = f"\"payload_{page}_{r}.exe\""
+        # Объединенная ячейка: python-docx возвращает ее текст для каждой позиции сетки
+        merged = table.cell(0, 2).merge(table.cell(TABLE_ROWS_PER_PAGE - 1, 2))
+        merged.text = f"Общий комментарий к таблице {page}: hxxp[:]//bad{page}[.]ru/gate.php"
+    document.save(path)
+
+
+def timed(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--pages", type=int, default=300, help="Примерный размер документа в страницах")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Число повторов (берется лучшее время)")
+    args = arg_parser.parse_args()
+
+    parser = IOCParser()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bulletin.docx"
+        build_document(path, args.pages)
+        size_kb = path.stat().st_size / 1024
+
+        stream_time, stream_text = timed(parser._get_text_from_docx, path, repeat=args.repeat)
+        legacy_time, legacy_text = timed(parser._get_text_from_docx_legacy, path, repeat=args.repeat)
+
+    print(f"Документ: ~{args.pages} стр., {size_kb:.0f} КБ")
+    print(f"python-docx:      {legacy_time:8.3f} с, {len(legacy_text):>10} символов")
+    print(f"потоковый разбор: {stream_time:8.3f} с, {len(stream_text):>10} символов")
+    print(f"Ускорение: x{legacy_time / stream_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
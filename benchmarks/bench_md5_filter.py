@@ -0,0 +1,74 @@
+"""
+Масштабирование фильтра "MD5 внутри SHA1/SHA256" из IOCParser.extract_all_iocs:
+индекс ContainmentIndex против прежнего перебора any(h in s for s in sha_set).
+
+Запуск из корня проекта:
+    python benchmarks/bench_md5_filter.py --sizes 5000 10000 25000 50000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.model.containment_index import ContainmentIndex
+
+# Прежний алгоритм квадратичен, поэтому для него берутся только малые объемы
+LEGACY_LIMIT = 5000
+
+
+def make_hashes(total, rng):
+    """
+    Делит total хешей поровну между MD5, SHA1 и SHA256; часть MD5
+    специально вырезается из SHA, чтобы фильтру было что отсеивать.
+    """
+    def hexstr(n): return "%0*x" % (n, rng.getrandbits(n * 4))
+    per_type = total // 3
+    sha1s = [hexstr(40) for _ in range(per_type)]
+    sha256s = [hexstr(64) for _ in range(per_type)]
+    md5s = [hexstr(32) for _ in range(per_type - per_type // 10)]
+    for sha in rng.sample(sha1s + sha256s, per_type // 10):
+        start = rng.randrange(len(sha) - 31)
+        md5s.append(sha[start:start + 32])
+    return md5s, sha1s, sha256s
+
+
+def indexed_filter(md5s, sha1s, sha256s):
+    index = ContainmentIndex(sha1s + sha256s)
+    return [h for h in md5s if not index.contains(h)]
+
+
+def legacy_filter(md5s, sha1s, sha256s):
+    sha_set = set(sha1s) | set(sha256s)
+    return [h for h in md5s if not any(h in s for s in sha_set)]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 10000, 25000, 50000], help="Общее число хешей в прогоне")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'хешей':>8} {'индекс, с':>10} {'мкс/хеш':>8} {'перебор, с':>11}")
+    for size in args.sizes:
+        md5s, sha1s, sha256s = make_hashes(size, rng)
+        indexed_time, indexed = timed(indexed_filter, md5s, sha1s, sha256s)
+        legacy = "-"
+        if size <= LEGACY_LIMIT:
+            legacy_time, expected = timed(legacy_filter, md5s, sha1s, sha256s)
+            assert indexed == expected, "Результаты фильтров расходятся"
+            legacy = f"{legacy_time:.3f}"
+        print(f"{size:>8} {indexed_time:>10.3f} {indexed_time / size * 1e6:>8.2f} {legacy:>11}")
+
+
+if __name__ == "__main__":
+    main()
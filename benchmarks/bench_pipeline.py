@@ -0,0 +1,169 @@
+"""
+Поэтапный бенчмарк конвейера на синтетическом корпусе бюллетеней:
+извлечение текста .docx, поиск по каждому типу IOC, очистка DNS/MD5,
+формирование запросов, запись XLSX и TXT. Для каждого этапа берется
+лучшее время из нескольких повторов.
+
+Результат пишется в JSON; при заданном --baseline этапы сравниваются
+с прошлым прогоном, и замедление больше --threshold дает код выхода 1.
+
+Запуск из корня проекта (используются типы IOC из config.txt):
+    python benchmarks/bench_pipeline.py --files 20 --paragraphs 300 --out bench.json
+    python benchmarks/bench_pipeline.py --files 20 --paragraphs 300 --baseline bench.json
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic_corpus import build_corpus
+from src.model.ioc_parser import IOCParser
+from src.model.report_generator import ReportGenerator
+from src.model.scan_plan import ScanPlan
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+
+
+def load_config(path):
+    """
+    Типы IOC и лимиты запросов: из указанного JSON-файла или из config.txt приложения.
+    """
+    if path:
+        with open(path, 'r', encoding='utf-8') as f: data = json.load(f)
+        return ScanPlan(data.get("ioc_types", {})), data.get("settings", {}).get("query_limits")
+    from src.model.config_manager import ConfigManager
+    config = ConfigManager()
+    return config.get_scan_plan(), config.get_setting("query_limits")
+
+
+def best_of(repeat, func, *args):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_stages(paths, scan_plan, query_limits, out_dir, repeat):
+    parser = IOCParser()
+    reporter = ReportGenerator(query_limits=query_limits)
+    engine = parser._get_engine(scan_plan)
+    stages, scan_by_type = {}, {}
+
+    stages["extract"], texts = best_of(repeat, lambda: [parser._get_text_from_docx(p) for p in paths])
+    documents = [(path, text) for path, text in zip(paths, texts) if text]
+    texts = [text for _, text in documents]
+
+    def scan_type(entry):
+        finds = []
+        for text in texts:
+            found = set()
+            for start, end in entry.windows(text):
+                found.update(entry.extract(text, start, end))
+            finds.append(found)
+        return finds
+
+    for entry in engine.entries:
+        scan_by_type[entry.name], _ = best_of(repeat, scan_type, entry)
+    stages["scan"], per_file = best_of(repeat, lambda: [(p, {n: set(f) for n, f in engine.scan(t).items()}) for p, t in documents])
+
+    def cleanup():
+        # Тот же путь, что и в extract_all_iocs: слияние с файлами-источниками, затем очистка
+        sources = parser._collect(per_file, len(per_file), None, None) or {}
+        return parser.clean_finds({name: sorted(found, key=str) for name, found in sources.items()}, sources)
+
+    stages["cleanup"], found_iocs = best_of(repeat, cleanup)
+    stages["queries"], query_data = best_of(repeat, reporter.generate_query_data, found_iocs, scan_plan)
+
+    xlsx_path, txt_path = Path(out_dir) / "report.xlsx", Path(out_dir) / "report_queries.txt"
+    stages["xlsx"], (ok, msg) = best_of(repeat, reporter.create_xlsx_report, str(xlsx_path), found_iocs, scan_plan)
+    if not ok: raise RuntimeError(msg)
+    stages["txt"], (ok, msg) = best_of(repeat, reporter.create_query_file, txt_path, query_data, scan_plan)
+    if not ok: raise RuntimeError(msg)
+
+    counts = {
+        "indicators": sum(len(v) for v in found_iocs.values()),
+        "queries": sum(len(v) for v in query_data.values()),
+        "text_chars": sum(len(t) for t in texts),
+    }
+    return stages, scan_by_type, counts
+
+
+def compare(current, baseline, threshold, min_delta):
+    """
+    Возвращает список строк о замедлившихся этапах (пустой - регрессий нет).
+    Изменения меньше min_delta секунд считаются шумом.
+    """
+    regressions = []
+    for section in ("stages", "scan_by_type"):
+        old_values = baseline.get(section, {})
+        for name, new in current[section].items():
+            old = old_values.get(name)
+            if old is None or new - old < min_delta: continue
+            if new > old * (1 + threshold):
+                regressions.append(f"{section}.{name}: {old:.4f} с -> {new:.4f} с (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--files", type=int, default=10, help="Число бюллетеней в корпусе")
+    arg_parser.add_argument("--paragraphs", type=int, default=200, help="Абзацев в одном бюллетене")
+    arg_parser.add_argument("--density", type=float, default=1.0, help="Индикаторов на абзац в среднем")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Число повторов каждого этапа (берется лучшее время)")
+    arg_parser.add_argument("--config", help="JSON-конфиг с ioc_types вместо config.txt")
+    arg_parser.add_argument("--out", help="Куда записать результаты в JSON")
+    arg_parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    arg_parser.add_argument("--threshold", type=float, default=0.25, help="Допустимое замедление этапа (0.25 = 25%%)")
+    arg_parser.add_argument("--min-delta", type=float, default=0.01, help="Изменения меньше стольких секунд не считаются регрессией")
+    args = arg_parser.parse_args()
+
+    scan_plan, query_limits = load_config(args.config)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths, inserted = build_corpus(Path(tmp) / "corpus", args.files, args.paragraphs, args.density, args.seed)
+        stages, scan_by_type, counts = run_stages(paths, scan_plan, query_limits, tmp, args.repeat)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "files": args.files, "paragraphs": args.paragraphs, "density": args.density,
+            "seed": args.seed, "repeat": args.repeat, "inserted": inserted, **counts,
+        },
+        "stages": {name: round(value, 6) for name, value in stages.items()},
+        "scan_by_type": {name: round(value, 6) for name, value in scan_by_type.items()},
+    }
+
+    print(f"Корпус: {args.files} файлов, {counts['text_chars']} символов, найдено {counts['indicators']} индикаторов")
+    for section in ("stages", "scan_by_type"):
+        for name, value in result[section].items():
+            print(f"  {section + '.' + name:<28} {value:9.4f} с")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        if baseline.get("meta", {}).get("text_chars") != counts["text_chars"]:
+            print("Внимание: корпус отличается от базового прогона, сравнение может быть некорректным")
+        regressions = compare(result, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print("Регрессии производительности:")
+            for line in regressions: print(f"  {line}")
+            return EXIT_REGRESSION
+        print("Регрессий нет.")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
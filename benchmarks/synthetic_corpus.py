@@ -0,0 +1,136 @@
+"""
+Генератор синтетических бюллетеней .docx для бенчмарков: абзацы текста
+и таблицы индикаторов с "обезвреженными" IP, доменами, URI, почтовыми
+адресами, хешами, именами файлов и ключами реестра.
+
+Можно запускать отдельно, чтобы получить корпус для ручных проверок:
+    python benchmarks/synthetic_corpus.py --out corpus --files 20 --paragraphs 400 --density 1.5
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from docx import Document
+
+TLDS = ["com", "ru", "net", "org", "info", "xyz"]
+WORDS = ["вредоносный", "загрузчик", "рассылка", "вложение", "сервер", "управления", "злоумышленник",
+         "фишинговое", "письмо", "макрос", "документ", "эксплуатация", "уязвимость", "бюллетень",
+         "активность", "обнаружен", "шифровальщик", "троян", "исполняемый", "файл", "узел", "сеть"]
+REGISTRY_ROOTS = ["HKLM", "HKCU", "HKEY_LOCAL_MACHINE", "HKEY_CURRENT_USER"]
+
+
+class IndicatorFactory:
+    """
+    Выдает случайные индикаторы в том виде, в каком они встречаются в бюллетенях.
+    Часть MD5 вырезается из уже выданных SHA, а часть доменов - из URI,
+    чтобы этапу очистки в IOCParser было что отсеивать.
+    """
+    def __init__(self, rng):
+        self.rng = rng
+        self._shas = []
+        self._uri_hosts = []
+
+    def _hex(self, length):
+        return "%0*x" % (length, self.rng.getrandbits(length * 4))
+
+    def ip(self):
+        return "[.]".join(str(self.rng.randrange(1, 255)) for _ in range(4))
+
+    def domain(self):
+        if self._uri_hosts and self.rng.random() < 0.2:
+            return self.rng.choice(self._uri_hosts)
+        return f"evil-{self.rng.randrange(10 ** 6)}[.]{self.rng.choice(TLDS)}"
+
+    def uri(self):
+        host = f"cdn{self.rng.randrange(10 ** 5)}[.]{self.rng.choice(TLDS)}"
+        self._uri_hosts.append(host)
+        return f"{self.rng.choice(['hxxp', 'hxxps'])}[:]//{host}/{self._hex(6)}/gate.php?id={self.rng.randrange(1000)}"
+
+    def email(self):
+        return f"user{self.rng.randrange(10 ** 5)}@mail{self.rng.randrange(100)}[.]{self.rng.choice(TLDS)}"
+
+    def md5(self):
+        if self._shas and self.rng.random() < 0.1:
+            sha = self.rng.choice(self._shas)
+            start = self.rng.randrange(len(sha) - 31)
+            return sha[start:start + 32]
+        return self._hex(32)
+
+    def sha1(self):
+        value = self._hex(40); self._shas.append(value); return value
+
+    def sha256(self):
+        value = self._hex(64); self._shas.append(value); return value
+
+    def file(self):
+        return f"\"invoice_{self.rng.randrange(10 ** 5)}.{self.rng.choice(['exe', 'dll', 'doc.js', 'zip'])}\""
+
+    def registry(self):
+        return f"{self.rng.choice(REGISTRY_ROOTS)}\\Software\\Microsoft\\Windows\\CurrentVersion\\Run\\upd{self.rng.randrange(1000)}"
+
+    KINDS = ("ip", "domain", "uri", "email", "md5", "sha1", "sha256", "file", "registry")
+
+    def any(self):
+        kind = self.rng.choice(self.KINDS)
+        return kind, getattr(self, kind)()
+
+
+def build_bulletin(path, rng, paragraphs=200, density=1.0, table_every=20, table_rows=10):
+    """
+    Создает один бюллетень: paragraphs абзацев, в каждом в среднем density
+    индикаторов, и после каждых table_every абзацев - таблица из table_rows
+    индикаторов. Возвращает число вставленных индикаторов.
+    """
+    factory = IndicatorFactory(rng)
+    document = Document()
+    document.add_heading(f"Бюллетень {rng.randrange(10 ** 6)}", level=1)
+    inserted = 0
+    for number in range(paragraphs):
+        words = rng.choices(WORDS, k=rng.randrange(12, 40))
+        count = int(density) + (rng.random() < density - int(density))
+        for _ in range(count):
+            words.insert(rng.randrange(len(words) + 1), factory.any()[1])
+        inserted += count
+        document.add_paragraph(" ".join(words) + ".")
+        if table_every and (number + 1) % table_every == 0:
+            table = document.add_table(rows=table_rows, cols=2)
+            for row in table.rows:
+                kind, value = factory.any()
+                row.cells[0].text, row.cells[1].text = kind, value
+            inserted += table_rows
+    document.save(path)
+    return inserted
+
+
+def build_corpus(directory, files=10, paragraphs=200, density=1.0, seed=1, **kwargs):
+    """
+    Создает files бюллетеней в directory. Возвращает (список путей, число индикаторов).
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths, inserted = [], 0
+    for index in range(files):
+        path = directory / f"bulletin_{index:03d}.docx"
+        inserted += build_bulletin(path, rng, paragraphs, density, **kwargs)
+        paths.append(str(path))
+    return paths, inserted
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--out", required=True, help="Каталог для бюллетеней")
+    arg_parser.add_argument("--files", type=int, default=10)
+    arg_parser.add_argument("--paragraphs", type=int, default=200, help="Абзацев в одном бюллетене")
+    arg_parser.add_argument("--density", type=float, default=1.0, help="Индикаторов на абзац в среднем")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    args = arg_parser.parse_args()
+    paths, inserted = build_corpus(args.out, args.files, args.paragraphs, args.density, args.seed)
+    print(f"Создано файлов: {len(paths)}, индикаторов: {inserted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,11 @@
 import sys
+import time
+
+# Момент запуска - для отчета о времени старта интерфейса (см. run_gui)
+STARTED_AT = time.perf_counter()
+
+import argparse
+import multiprocessing
 from pathlib import Path
 
 # Класс-заглушка для перенаправления вывода в бесконсольном режиме
@@ -27,38 +34,140 @@ project_root = Path(__file__).parent
 sys.path.append(str(project_root))
 
 # --- Основные импорты из модулей ---
-from src.model.config_manager import ConfigManager
+# Модули интерфейса (tkinter, ttkbootstrap) импортируются только в run_gui(),
+# а python-docx и openpyxl - моделью по мере надобности
+from src.model.config_manager import ConfigManager, CACHE_FILE, HISTORY_FILE, get_base_path
+from src.model.analysis_cache import AnalysisCache
+from src.model.ioc_history import IOCHistory
 from src.model.ioc_parser import IOCParser
 from src.model.report_generator import ReportGenerator
-from src.view.main_view import MainView
-from src.controller.app_controller import AppController
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Парсер индикаторов компрометации (IOC) из бюллетеней .docx")
+    parser.add_argument("--headless", action="store_true", help="Пакетный режим без графического интерфейса")
+    parser.add_argument("--in", dest="inputs", action="append", default=[], metavar="PATH",
+                        help="Каталог с .docx или отдельный файл .docx/.txt/.log/.csv/.eml (можно указать несколько раз)")
+    parser.add_argument("--out", metavar="REPORT.xlsx", help="Путь к отчету Excel; запросы пишутся в <имя>_queries.txt рядом")
+    parser.add_argument("--jsonl", metavar="PATH", help="Дополнительно выгрузить индикаторы в JSON Lines (*.gz - со сжатием)")
+    parser.add_argument("--csv", metavar="PATH", help="Дополнительно выгрузить индикаторы в CSV (*.gz - со сжатием)")
+    parser.add_argument("--workers", type=int, help="Число процессов для разбора (по умолчанию - из config.txt)")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш результатов разбора")
+    parser.add_argument("--new-only", action="store_true", help="Включать в отчеты только индикаторы, не встречавшиеся в прошлых запусках")
+    parser.add_argument("--watch", metavar="DIR", help="Следить за каталогом и дописывать новые индикаторы в отчет --out")
+    parser.add_argument("--interval", type=float, default=10, help="Период проверки каталога в режиме --watch, с")
+    parser.add_argument("--serve", action="store_true", help="Запустить локальный HTTP-сервис анализа (POST /analyze, GET /metrics)")
+    parser.add_argument("--host", default="127.0.0.1", help="Адрес HTTP-сервиса в режиме --serve")
+    parser.add_argument("--port", type=int, default=8765, help="Порт HTTP-сервиса в режиме --serve")
+    args = parser.parse_args(argv)
+    if args.headless and (not args.inputs or not args.out):
+        parser.error("в режиме --headless обязательны --in и --out")
+    if args.watch and not args.out:
+        parser.error("в режиме --watch обязателен --out")
+    return args
+
+def create_model(use_cache=True):
     """
-    Главная функция для инициализации и запуска приложения.
+    Создает экземпляры всех компонентов Модели (Model).
     """
-    # 1. Создаем экземпляры всех компонентов Модели (Model)
     config_manager = ConfigManager()
-    ioc_parser = IOCParser()
-    report_generator = ReportGenerator()
+    cache = None
+    if use_cache and config_manager.get_setting("cache_enabled"):
+        cache = AnalysisCache(CACHE_FILE, max_bytes=config_manager.get_setting("cache_max_mb") * 1024 * 1024)
+    ioc_parser = IOCParser(
+        cache,
+        pattern_budget=config_manager.get_setting("regex_scan_budget_s"),
+        text_chunk_size=config_manager.get_setting("text_chunk_mb") * 1024 * 1024,
+        text_overlap=config_manager.get_setting("text_overlap_chars"),
+        text_encoding=config_manager.get_setting("text_encoding")
+    )
+    report_generator = ReportGenerator(query_limits=config_manager.get_setting("query_limits"))
+    history = IOCHistory(HISTORY_FILE) if config_manager.get_setting("history_enabled") else None
     
     # Собираем все части модели в один словарь для удобства передачи
-    model = {
+    return {
         "config": config_manager,
         "parser": ioc_parser,
-        "reporter": report_generator
+        "reporter": report_generator,
+        "history": history
     }
 
-    # 2. Создаем экземпляр главного окна (View)
+def run_gui(model):
+    # Этапы запуска (мс от старта процесса) выводятся в лог, когда окно впервые отрисовано
+    timings = [("модель", time.perf_counter())]
+    from src.view.main_view import MainView
+    from src.view.log_sink import LogSink
+    from src.controller.app_controller import AppController
+    timings.append(("импорт интерфейса", time.perf_counter()))
+
+    config = model['config']
+    log_file = config.get_setting("log_file")
+    log_sink = LogSink(
+        capacity=config.get_setting("log_max_lines"),
+        log_path=get_base_path() / log_file if log_file else None,
+        max_bytes=config.get_setting("log_file_max_kb") * 1024,
+        backups=config.get_setting("log_file_backups")
+    )
+
+    # Создаем экземпляр главного окна (View)
     # Тема 'flatly' - одна из многих красивых тем ttkbootstrap.
     # Другие варианты: 'darkly', 'superhero', 'cyborg', 'vapor' и т.д.
-    view = MainView(theme="superhero")
+    view = MainView(theme="superhero", lazy_settings=config.get_setting("lazy_settings_editors"),
+                    log_sink=log_sink, log_max_lines=config.get_setting("log_max_lines"))
 
-    # 3. Создаем экземпляр Контроллера и связываем его с Моделью и Представлением
+    timings.append(("окно", time.perf_counter()))
+
+    # Создаем экземпляр Контроллера и связываем его с Моделью и Представлением
     controller = AppController(model, view)
+    timings.append(("контроллер", time.perf_counter()))
+
+    def report_startup():
+        timings.append(("отрисовка", time.perf_counter()))
+        stages, previous = [], STARTED_AT
+        for name, moment in timings:
+            stages.append(f"{name} {(moment - previous) * 1000:.0f}")
+            previous = moment
+        view.log(f"Время запуска: {(previous - STARTED_AT) * 1000:.0f} мс ({', '.join(stages)} мс)")
+    view.after_idle(report_startup)
 
-    # 4. Запускаем главный цикл приложения
+    # Запускаем главный цикл приложения
     view.mainloop()
+    log_sink.close()
+    return 0
+
+def main(argv=None):
+    """
+    Главная функция для инициализации и запуска приложения.
+    """
+    args = parse_args(argv)
+    model = create_model(use_cache=not args.no_cache)
+    if args.watch:
+        from src.controller.watch import FolderWatcher
+        workers = args.workers if args.workers is not None else model['config'].get_setting("workers")
+        try:
+            FolderWatcher(model, args.watch, args.out, workers=workers, interval=args.interval).run()
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.serve:
+        from src.controller.server import AnalysisService
+        config = model['config']
+        service = AnalysisService(model, args.host, args.port, concurrency=config.get_setting("server_concurrency"),
+                                  queue_timeout=config.get_setting("server_queue_timeout_s"),
+                                  max_upload_mb=config.get_setting("server_max_upload_mb"))
+        print(f"Сервис анализа запущен: {service.address}", file=sys.stderr)
+        try:
+            service.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.server.server_close()
+        return 0
+    if args.headless:
+        from src.controller.headless import run_headless
+        return run_headless(args, model)
+    return run_gui(model)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Нужно для пула процессов в скомпилированном .exe
+    multiprocessing.freeze_support()
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,164 @@
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+
+from src.model.ioc_parser import AnalysisCancelled
+
+
+class AnalysisWorker(threading.Thread):
+    """
+    Фоновый поток анализа: разбор файлов, генерация запросов, запись XLSX и TXT.
+    С интерфейсом общается только через очередь events, которую контроллер
+    опрашивает из главного цикла Tk через after(). Элементы очереди - кортежи:
+        ("log", сообщение)
+        ("progress", готово, всего, описание этапа)
+        ("done", словарь результатов или None, если индикаторы не найдены)
+        ("cancelled", None)
+        ("error", текст ошибки)
+    """
+    def __init__(self, model, filepaths, scan_plan, workers, xlsx_path, txt_path, stats=None, new_only=False):
+        super().__init__(daemon=True)
+        self.model = model
+        self.filepaths = list(filepaths)
+        self.scan_plan = scan_plan
+        self.workers = workers
+        self.xlsx_path = xlsx_path
+        self.txt_path = txt_path
+        self.stats = stats  # RunStats, если включены замеры производительности
+        self.new_only = new_only  # Отчеты только по индикаторам, которых нет в истории
+        self.events = queue.Queue()
+        self._cancel_event = threading.Event()
+        # Разбор каждого файла + запросы + XLSX + TXT
+        self.total_steps = len(self.filepaths) + 3
+
+    def cancel(self):
+        """
+        Просит остановить анализ. Остановка происходит между файлами или этапами.
+        """
+        self._cancel_event.set()
+
+    def run(self):
+        try:
+            self.events.put(("done", self._run()))
+        except AnalysisCancelled:
+            self.events.put(("cancelled", None))
+        except Exception as e:
+            self.events.put(("error", str(e)))
+
+    def _log(self, message):
+        self.events.put(("log", message))
+
+    def _progress(self, done, stage):
+        self.events.put(("progress", done, self.total_steps, stage))
+
+    def _check_cancel(self):
+        if self._cancel_event.is_set():
+            raise AnalysisCancelled()
+
+    def _on_file_scanned(self, done, total, path):
+        self._progress(done, f"Разбор файлов: {done}/{total} ({Path(path).name})")
+
+    def _run(self):
+        files_count = len(self.filepaths)
+        self._log("Начало анализа...")
+        self._progress(0, "Разбор файлов...")
+        all_iocs = self.model['parser'].extract_all_iocs(
+            self.filepaths, self.scan_plan, workers=self.workers,
+            progress=self._on_file_scanned, cancel_event=self._cancel_event, stats=self.stats
+        )
+        for message in self.model['parser'].skipped_types.values():
+            self._log(message)
+        if not all_iocs:
+            return None
+        self._log(f"Найдено {sum(len(v) for v in all_iocs.values())} уникальных индикаторов.")
+        found_iocs = self._filter_new(all_iocs)
+        if not found_iocs:
+            self._record_history(all_iocs)
+            return None
+
+        reporter = self.model['reporter']
+        self._check_cancel()
+        self._progress(files_count, "Формирование запросов...")
+        query_data = reporter.generate_query_data(found_iocs, self.scan_plan, stats=self.stats)
+
+        self._check_cancel()
+        self._progress(files_count + 1, "Запись отчета Excel...")
+        success_xlsx, msg_xlsx = reporter.create_xlsx_report(self.xlsx_path, found_iocs, self.scan_plan, stats=self.stats)
+        self._log(msg_xlsx)
+
+        self._check_cancel()
+        self._progress(files_count + 2, "Запись файла запросов...")
+        success_txt, msg_txt = reporter.create_query_file(self.txt_path, query_data, self.scan_plan, stats=self.stats)
+        self._log(msg_txt)
+        self._record_history(all_iocs)
+        if self.stats is not None:
+            self._report_stats()
+
+        self._progress(self.total_steps, "Готово")
+        return {
+            "found_iocs": found_iocs,
+            "query_data": query_data,
+            "success": success_xlsx and success_txt,
+        }
+
+    def _filter_new(self, found_iocs):
+        """
+        В режиме new_only оставляет только индикаторы, которых нет в истории.
+        """
+        history = self.model.get('history')
+        if not self.new_only or history is None:
+            return found_iocs
+        try:
+            new_iocs = history.filter_new(found_iocs)
+        except sqlite3.Error as e:
+            self._log(f"История индикаторов недоступна, в отчеты попадут все найденные: {e}")
+            return found_iocs
+        self._log(f"Новых с прошлых запусков: {sum(len(v) for v in new_iocs.values())} из {sum(len(v) for v in found_iocs.values())}.")
+        return new_iocs
+
+    def _record_history(self, found_iocs):
+        """
+        Запоминает все найденные индикаторы (не только новые) в истории.
+        """
+        history = self.model.get('history')
+        if history is None:
+            return
+        try:
+            history.record(found_iocs)
+        except sqlite3.Error as e:
+            self._log(f"Не удалось обновить историю индикаторов: {e}")
+
+    def _report_stats(self):
+        """
+        Выводит сводку замеров в лог и сохраняет полную статистику рядом с отчетом.
+        """
+        self._log("Замеры производительности:\n" + "\n".join(self.stats.summary_lines()))
+        xlsx_path = Path(self.xlsx_path)
+        stats_path = xlsx_path.with_name(f"{xlsx_path.stem}_stats.json")
+        try:
+            self.stats.write_json(stats_path)
+            self._log(f"Статистика сохранена: {stats_path}")
+        except OSError as e:
+            self._log(f"Не удалось сохранить статистику: {e}")
+
+
+class RegexCheckWorker(threading.Thread):
+    """
+    Фоновая проверка скорости регулярных выражений перед сохранением настроек
+    (см. ConfigManager.check_regex_cost), чтобы окно не зависало на время замера.
+    События в очереди events - как у AnalysisWorker:
+        ("done", (blocked, slow))
+        ("error", текст ошибки) - например, не удалось запустить процесс проверки
+    """
+    def __init__(self, config, ioc_types):
+        super().__init__(daemon=True)
+        self.config = config
+        self.ioc_types = ioc_types
+        self.events = queue.Queue()
+
+    def run(self):
+        try:
+            self.events.put(("done", self.config.check_regex_cost(self.ioc_types)))
+        except Exception as e:
+            self.events.put(("error", str(e)))
@@ -1,8 +1,15 @@
 from tkinter import filedialog, simpledialog, messagebox
 from datetime import datetime
 import collections
+import queue
 from pathlib import Path
 
+from src.controller.analysis_worker import AnalysisWorker, RegexCheckWorker
+from src.model.run_stats import RunStats
+
+# Период опроса очереди событий фонового анализа, мс
+ANALYSIS_POLL_MS = 100
+
 class AppController:
     """
     Класс-контроллер. Связывает View (интерфейс) и Model (логику).
@@ -10,6 +17,8 @@ class AppController:
     def __init__(self, model, view):
         self.model = model
         self.view = view
+        self._analysis = None  # Текущий фоновый анализ (AnalysisWorker)
+        self._regex_check = None  # Текущая проверка шаблонов перед сохранением (RegexCheckWorker)
         self._init_view()
         self._bind_events()
 
@@ -17,9 +26,12 @@ class AppController:
         """
         Первоначальная загрузка данных из модели в представление.
         """
-        ioc_config = self.model['config'].get_ioc_types()
-        self.view.settings_tab.populate_settings(ioc_config)
-        self._bind_settings_tab_events()
+        self.view.main_tab.new_only_var.set(self.model['config'].get_setting("history_new_only"))
+        if self.model.get('history') is None:
+            self.view.main_tab.new_only_check.config(state="disabled")
+        # Вкладки настроек и результатов создаются при первом открытии - тогда же заполняются и привязываются
+        self.view.on_tab_built("settings", self._init_settings_tab)
+        self.view.on_tab_built("results", self._init_results_tab)
         self.view.log("Приложение готово к работе.")
 
     def _bind_events(self):
@@ -30,20 +42,34 @@ class AppController:
         self.view.main_tab.browse_button.config(command=self._handle_browse_files)
         self.view.main_tab.clear_button.config(command=self._handle_clear_files)
         self.view.main_tab.run_button.config(command=self._handle_run_analysis)
-        
-        # --- Вкладка "Настройка IOC" ---
-        self.view.settings_tab.save_button.config(command=self._handle_save_config)
-        self.view.settings_tab.add_button.config(command=self._handle_add_ioc)
+        self.view.main_tab.clear_cache_button.config(command=self._handle_clear_cache)
+        self.view.main_tab.cancel_button.config(command=self._handle_cancel_analysis)
 
-    def _bind_settings_tab_events(self):
+    def _init_settings_tab(self, settings_tab):
         """
-        Привязывает события к динамически созданным кнопкам на вкладке настроек.
+        Заполняет вкладку "Настройка IOC" и привязывает ее кнопки (вызывается при создании вкладки).
         """
-        for button, name in self.view.settings_tab.move_up_buttons:
-            button.config(command=lambda n=name: self._handle_move_ioc(n, direction=-1))
-        
-        for button, name in self.view.settings_tab.move_down_buttons:
-            button.config(command=lambda n=name: self._handle_move_ioc(n, direction=1))
+        settings_tab.save_button.config(command=self._handle_save_config)
+        settings_tab.add_button.config(command=self._handle_add_ioc)
+        self._bind_settings_tab_events(settings_tab.populate_settings(self.model['config'].get_ioc_types()))
+
+    def _init_results_tab(self, results_tab):
+        """
+        Привязывает кнопки вкладки "Результаты запросов" (вызывается при создании вкладки).
+        """
+        results_tab.copy_selected_button.config(command=self._handle_copy_selected)
+        results_tab.copy_checked_button.config(command=self._handle_copy_checked)
+        results_tab.tree.bind("<Double-1>", lambda e: self._handle_copy_selected())
+
+    def _bind_settings_tab_events(self, names):
+        """
+        Привязывает события к кнопкам новых блоков на вкладке настроек.
+        Блоки постоянные, поэтому привязка делается один раз при создании блока.
+        """
+        for name in names:
+            block = self.view.settings_tab.blocks[name]
+            block["move_up"].config(command=lambda n=name: self._handle_move_ioc(n, direction=-1))
+            block["move_down"].config(command=lambda n=name: self._handle_move_ioc(n, direction=1))
 
     # --- Обработчики событий (Handlers) ---
 
@@ -52,8 +78,8 @@ class AppController:
         Обрабатывает нажатие кнопки "Добавить файлы...".
         """
         filepaths = filedialog.askopenfilenames(
-            title="Выберите один или несколько .docx файлов",
-            filetypes=(("Документы Word", "*.docx"), ("Все файлы", "*.*"))
+            title="Выберите один или несколько файлов",
+            filetypes=(("Документы Word", "*.docx"), ("Текстовые файлы и логи", "*.txt *.log *.csv *.eml"), ("Все файлы", "*.*"))
         )
         if filepaths:
             listbox = self.view.main_tab.file_listbox
@@ -70,10 +96,29 @@ class AppController:
         self.view.main_tab.file_listbox.delete(0, "end")
         self.view.log("Список файлов очищен.")
 
+    def _handle_clear_cache(self):
+        """
+        Обрабатывает нажатие кнопки "Очистить кэш".
+        """
+        cache = self.model['parser'].cache
+        if cache is None:
+            self.view.log("Кэш отключен в настройках (settings.cache_enabled).")
+            return
+        try:
+            cache.clear()
+            self.view.log("Кэш результатов разбора очищен.")
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось очистить кэш: {e}")
+
     def _handle_run_analysis(self):
         """
         Обрабатывает нажатие кнопки "Сформировать отчеты".
+        Сам анализ выполняется в фоновом потоке (AnalysisWorker).
         """
+        if self._analysis is not None:
+            self.view.log("Анализ уже выполняется. Дождитесь завершения или нажмите \"Отмена\".")
+            return
+
         filepaths = self.view.main_tab.file_listbox.get(0, "end")
         if not filepaths:
             messagebox.showerror("Ошибка", "Пожалуйста, добавьте хотя бы один файл для анализа.")
@@ -93,33 +138,71 @@ class AppController:
         output_path = Path(output_xlsx_path)
         txt_filepath = output_path.with_name(f"{output_path.stem}_queries.txt")
 
-        self.view.log("Начало анализа...")
-        
-        ioc_config = self.model['config'].get_ioc_types()
-        found_iocs = self.model['parser'].extract_all_iocs(filepaths, ioc_config)
-        
-        if not found_iocs:
+        scan_plan = self.model['config'].get_scan_plan()
+        workers = self.model['config'].get_setting("workers")
+        stats = RunStats() if self.model['config'].get_setting("instrumentation") else None
+        new_only = self.view.main_tab.new_only_var.get() and self.model.get('history') is not None
+        self._analysis = AnalysisWorker(self.model, filepaths, scan_plan, workers, output_xlsx_path, txt_filepath, stats, new_only)
+        self.view.main_tab.set_running(True)
+        self._analysis.start()
+        self.view.after(ANALYSIS_POLL_MS, self._poll_analysis)
+
+    def _handle_cancel_analysis(self):
+        """
+        Обрабатывает нажатие кнопки "Отмена".
+        """
+        if self._analysis is not None and self._analysis.is_alive():
+            self._analysis.cancel()
+            self.view.main_tab.cancel_button.config(state="disabled")
+            self.view.log("Отмена анализа: остановка после текущего файла...")
+
+    def _poll_analysis(self):
+        """
+        Забирает события фонового анализа из очереди и отображает их.
+        Вызывается из главного цикла Tk через after(), пока анализ не завершится.
+        """
+        worker = self._analysis
+        while True:
+            try:
+                event = worker.events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == "log":
+                self.view.log(event[1])
+            elif kind == "progress":
+                self.view.main_tab.set_progress(*event[1:])
+            elif kind == "done":
+                self._finish_analysis(worker, event[1])
+            elif kind == "cancelled":
+                self.view.log("Анализ отменен пользователем.")
+            elif kind == "error":
+                self.view.log(f"Ошибка анализа: {event[1]}")
+                messagebox.showerror("Ошибка", f"Анализ завершился с ошибкой:\n{event[1]}")
+
+        if worker.is_alive() or not worker.events.empty():
+            self.view.after(ANALYSIS_POLL_MS, self._poll_analysis)
+        else:
+            self._analysis = None
+            self.view.main_tab.set_running(False)
+
+    def _finish_analysis(self, worker, result):
+        """
+        Показывает результаты завершенного анализа (в потоке интерфейса).
+        """
+        if result is None:
+            if worker.new_only:
+                self.view.log("Анализ завершен. Новых индикаторов нет.")
+                messagebox.showinfo("Завершено", "Новых индикаторов компрометации с прошлых запусков не найдено.")
+                return
             self.view.log("Анализ завершен. Индикаторы не найдены.")
             messagebox.showinfo("Завершено", "Индикаторы компрометации в файлах не найдены.")
             return
-            
-        self.view.log(f"Найдено {sum(len(v) for v in found_iocs.values())} уникальных индикаторов.")
 
-        reporter = self.model['reporter']
-        query_data = reporter.generate_query_data(found_iocs, ioc_config)
-        
-        self.view.results_tab.populate_results(query_data, ioc_config)
-        for button, entry, var in self.view.results_tab.copy_buttons:
-            button.config(command=lambda e=entry, v=var: self._handle_copy_to_clipboard(e, v))
-            
-        success_xlsx, msg_xlsx = reporter.create_xlsx_report(output_xlsx_path, found_iocs, ioc_config)
-        self.view.log(msg_xlsx)
-        
-        success_txt, msg_txt = reporter.create_query_file(txt_filepath, query_data, ioc_config)
-        self.view.log(msg_txt)
+        self.view.results_tab.populate_results(result["query_data"], worker.scan_plan)
         
         self.view.log("Анализ успешно завершен.")
-        messagebox.showinfo("Готово", f"Отчеты успешно сохранены:\n{output_xlsx_path}\n{txt_filepath}")
+        messagebox.showinfo("Готово", f"Отчеты успешно сохранены:\n{worker.xlsx_path}\n{worker.txt_path}")
         
         self.view.switch_to_results_tab()
 
@@ -127,32 +210,69 @@ class AppController:
         """
         Обрабатывает нажатие кнопки "Сохранить все настройки".
         """
-        gui_order = [name for _, name in self.view.settings_tab.move_up_buttons]
-        updated_config_data = collections.OrderedDict()
-        
-        for name in gui_order:
-            widgets = self.view.settings_tab.ioc_widgets[name]
-            updated_config_data[name] = {
-                "enabled": widgets["enabled"].get(),
-                "regex": widgets["regex"].get(),
-                "report_template": {
-                    "Тип Индикатора": widgets["type"].get(),
-                    "Статус Активности NTA": widgets["nta"].get(),
-                    "Статус Активности SIEM (MP)": widgets["siem_mp"].get()
-                },
-                "query_templates": {
-                    "MP10": [line for line in widgets["mp10_queries"].get("1.0", "end-1c").strip().split('\n') if line],
-                    "NAD": [line for line in widgets["nad_queries"].get("1.0", "end-1c").strip().split('\n') if line]
-                }
-            }
+        updated_config_data = collections.OrderedDict(self.view.settings_tab.get_all_ioc_data())
         
+        errors = self.model['config'].validate_ioc_types(updated_config_data)
+        if errors:
+            details = "\n".join(f"{name}: {error}" for name, error in errors.items())
+            self.view.log(f"Конфигурация не сохранена, ошибки в регулярных выражениях:\n{details}")
+            messagebox.showerror("Ошибка", f"Исправьте регулярные выражения перед сохранением:\n\n{details}")
+            return
+        if self._regex_check is not None:
+            return
+        # Замер шаблонов может занять до нескольких секунд - выполняется в фоне
+        self.view.log("Проверка скорости регулярных выражений...")
+        self.view.settings_tab.save_button.config(state="disabled")
+        self._regex_check = RegexCheckWorker(self.model['config'], updated_config_data)
+        self._regex_check.start()
+        self.view.after(ANALYSIS_POLL_MS, self._poll_regex_check)
+
+    def _poll_regex_check(self):
+        """
+        Ждет окончания фоновой проверки шаблонов и продолжает сохранение.
+        """
+        worker = self._regex_check
+        try:
+            kind, result = worker.events.get_nowait()
+        except queue.Empty:
+            self.view.after(ANALYSIS_POLL_MS, self._poll_regex_check)
+            return
+        self._regex_check = None
+        self.view.settings_tab.save_button.config(state="normal")
+        if kind == "error":
+            self.view.log(f"Конфигурация не сохранена, не удалось проверить регулярные выражения: {result}")
+            messagebox.showerror("Ошибка", f"Не удалось проверить скорость регулярных выражений:\n{result}")
+            return
+        if self._check_regex_cost(*result):
+            self._save_config(worker.ioc_types)
+
+    def _save_config(self, updated_config_data):
         self.model['config'].update_ioc_types(updated_config_data)
         self.model['config'].save()
         self.view.log("Конфигурация успешно сохранена.")
         messagebox.showinfo("Сохранено", "Настройки успешно сохранены в файл config.txt.")
         
-        self.view.settings_tab.populate_settings(updated_config_data)
-        self._bind_settings_tab_events()
+        # Виджеты уже показывают сохраненные значения - перестраивать их не нужно
+        self.view.settings_tab.mark_saved(updated_config_data)
+
+    def _check_regex_cost(self, blocked, slow):
+        """
+        Показывает итог проверки скорости новых и измененных регулярных выражений
+        (см. ConfigManager.check_regex_cost). Шаблоны, прерванные по лимиту времени,
+        блокируют сохранение, о медленных пользователь предупреждается.
+        Возвращает True, если можно сохранять.
+        """
+        if blocked:
+            details = "\n".join(f"{name}: {detail}" for name, detail in blocked.items())
+            self.view.log(f"Конфигурация не сохранена, слишком медленные регулярные выражения:\n{details}")
+            messagebox.showerror("Ошибка", "Эти регулярные выражения выполняются недопустимо долго "
+                                 f"(вероятен катастрофический возврат):\n\n{details}")
+            return False
+        if slow:
+            details = "\n".join(f"{name}: {detail}" for name, detail in slow.items())
+            self.view.log(f"Медленные регулярные выражения:\n{details}")
+            return messagebox.askyesno("Предупреждение", f"Эти регулярные выражения работают медленно:\n\n{details}\n\nСохранить все равно?")
+        return True
 
     def _handle_add_ioc(self):
         """
@@ -172,20 +292,39 @@ class AppController:
             config[name] = new_ioc_data
             self.model['config'].update_ioc_types(config)
             
-            self.view.settings_tab.populate_settings(config)
-            self._bind_settings_tab_events()
+            self.view.settings_tab.add_block(name, new_ioc_data)
+            self._bind_settings_tab_events([name])
             self.view.log(f"Добавлен новый тип IOC: {name}. Не забудьте настроить и сохранить.")
         elif name:
             messagebox.showerror("Ошибка", "IOC с таким системным именем уже существует.", parent=self.view)
 
-    def _handle_copy_to_clipboard(self, entry, var):
+    def _handle_copy_selected(self):
         """
-        Обрабатывает нажатие кнопок "Копировать" на вкладке результатов.
+        Обрабатывает кнопку "Копировать выбранные" и двойной щелчок по строке результатов.
         """
+        self._copy_queries(self.view.results_tab.get_selected_indexes())
+
+    def _handle_copy_checked(self):
+        """
+        Обрабатывает кнопку "Копировать все отмеченные".
+        """
+        self._copy_queries(self.view.results_tab.get_checked_indexes())
+
+    def _copy_queries(self, indexes):
+        """
+        Копирует запросы (по одному в строке) в буфер обмена и снимает с них отметку.
+        Полный текст берется из модели вкладки только в момент копирования.
+        """
+        if not indexes:
+            return
+        queries = self.view.results_tab.get_queries(indexes)
         self.view.clipboard_clear()
-        self.view.clipboard_append(entry.get())
-        self.view.log(f"Скопировано: \"{entry.get()[:70]}...\"")
-        var.set(False)
+        self.view.clipboard_append("\n".join(queries))
+        if len(queries) == 1:
+            self.view.log(f"Скопировано: \"{queries[0][:70]}...\"")
+        else:
+            self.view.log(f"Скопировано запросов: {len(queries)}")
+        self.view.results_tab.set_checked(indexes, False)
 
     def _handle_move_ioc(self, ioc_name, direction):
         """
@@ -210,5 +349,5 @@ class AppController:
             
             self.model['config'].update_ioc_types(new_ordered_dict)
             
-            self.view.settings_tab.populate_settings(new_ordered_dict)
-            self._bind_settings_tab_events()
\ No newline at end of file
+            # Переставляем только сам блок, остальные виджеты не трогаем
+            self.view.settings_tab.move_block(ioc_name, new_index)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import contextlib
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from src.model.run_stats import RunStats
+from src.model.text_input import is_text_input
+
+# Пакетный режим не должен импортировать tkinter/ttkbootstrap и модули интерфейса
+
+EXIT_OK = 0
+EXIT_FAILURE = 1
+
+
+def collect_input_files(inputs):
+    """
+    Раскрывает список путей: каталоги - в отсортированный список .docx и текстовых
+    файлов (.txt, .log, .csv, .eml) внутри них, файлы берутся как есть. Повторы убираются с сохранением порядка.
+    """
+    files = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.extend(sorted(str(p) for p in path.iterdir() if p.is_file() and not p.name.startswith("~$")
+                                and (p.suffix.lower() == ".docx" or is_text_input(p))))
+        else:
+            files.append(str(path))
+    return list(dict.fromkeys(files))
+
+
+def run_headless(args, model):
+    """
+    Выполняет анализ без интерфейса: разбор файлов, запросы, XLSX и TXT.
+    Сообщения пишутся в stderr, а в stdout - одна JSON-строка со статистикой.
+    Возвращает код завершения процесса.
+    """
+    stats = {"status": "ok"}
+    started = time.perf_counter()
+    try:
+        # Служебные print() модели не должны портить машиночитаемый stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            stats.update(_run(args, model))
+    except Exception as e:
+        stats.update(status="error", error=str(e))
+    stats["elapsed_sec"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(stats, ensure_ascii=False))
+    return EXIT_OK if stats["status"] != "error" else EXIT_FAILURE
+
+
+def _run(args, model):
+    filepaths = collect_input_files(args.inputs)
+    if not filepaths:
+        raise ValueError("Не найдено ни одного входного файла")
+    missing = [path for path in filepaths if not Path(path).is_file()]
+    if missing:
+        raise FileNotFoundError(f"Файлы не найдены: {', '.join(missing)}")
+
+    output_path = Path(args.out)
+    txt_filepath = output_path.with_name(f"{output_path.stem}_queries.txt")
+    scan_plan = model['config'].get_scan_plan()
+    workers = args.workers if args.workers is not None else model['config'].get_setting("workers")
+    run_stats = RunStats() if model['config'].get_setting("instrumentation") else None
+
+    history = model.get('history')
+    new_only = getattr(args, "new_only", False) or model['config'].get_setting("history_new_only")
+
+    print(f"Разбор {len(filepaths)} файлов...")
+    all_iocs = model['parser'].extract_all_iocs(filepaths, scan_plan, workers=workers, stats=run_stats)
+    found_iocs = all_iocs
+    if new_only and history is not None and all_iocs:
+        try:
+            found_iocs = history.filter_new(all_iocs)
+        except sqlite3.Error as e:
+            print(f"История индикаторов недоступна, в отчеты попадут все найденные: {e}")
+    stats = {
+        "files": len(filepaths),
+        "skipped_types": list(model['parser'].skipped_types),
+        "indicators": sum(len(v) for v in all_iocs.values()),
+        "by_type": {name: len(all_iocs[name]) for name in scan_plan.names() if name in all_iocs},
+    }
+    if found_iocs is not all_iocs:
+        stats["new_indicators"] = sum(len(v) for v in found_iocs.values())
+        stats["new_by_type"] = {name: len(found_iocs[name]) for name in scan_plan.names() if name in found_iocs}
+    if not found_iocs:
+        _record_history(history, all_iocs)
+        stats["status"] = "empty"
+        return stats
+
+    reporter = model['reporter']
+    success_xlsx, msg_xlsx = reporter.create_xlsx_report(str(output_path), found_iocs, scan_plan, stats=run_stats)
+    print(msg_xlsx)
+    if not success_xlsx:
+        raise RuntimeError(msg_xlsx)
+
+    # Запросы не нужны в памяти целиком - пишем их в файл прямо из генератора
+    query_count = 0
+    def counted(pairs):
+        nonlocal query_count
+        for pair in pairs:
+            query_count += 1
+            yield pair
+    success_txt, msg_txt = reporter.create_query_file(txt_filepath, counted(reporter.iter_query_data(found_iocs, scan_plan)), scan_plan, stats=run_stats)
+    stats["queries"] = query_count
+    print(msg_txt)
+    if not success_txt:
+        raise RuntimeError(msg_txt)
+
+    # Машиночитаемые выгрузки для автоматической обработки (SOAR и т.п.)
+    for option, export in (("jsonl", reporter.create_jsonl_export), ("csv", reporter.create_csv_export)):
+        export_path = getattr(args, option, None)
+        if not export_path: continue
+        success, message = export(export_path, found_iocs, scan_plan, stats=run_stats)
+        print(message)
+        if not success:
+            raise RuntimeError(message)
+        stats[option] = str(export_path)
+    _record_history(history, all_iocs)
+    stats["xlsx"] = str(output_path)
+    stats["queries_txt"] = str(txt_filepath)
+    if run_stats is not None:
+        print("\n".join(run_stats.summary_lines()))
+        stats_path = output_path.with_name(f"{output_path.stem}_stats.json")
+        run_stats.write_json(stats_path)
+        stats["stats_json"] = str(stats_path)
+    return stats
+
+
+def _record_history(history, found_iocs):
+    if history is None or not found_iocs:
+        return
+    try:
+        history.record(found_iocs)
+    except sqlite3.Error as e:
+        print(f"Не удалось обновить историю индикаторов: {e}")
@@ -0,0 +1,256 @@
+import collections
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from src.controller.headless import collect_input_files
+from src.model.ioc_parser import IOCParser
+from src.model.text_input import is_text_input
+
+# Сколько последних длительностей запросов хранить для процентилей в /metrics
+LATENCY_WINDOW = 1000
+
+
+class AnalysisService:
+    """
+    Локальный HTTP-сервис анализа: держит "прогретыми" план сканирования,
+    скомпилированные шаблоны и кэш между запросами, поэтому другие утилиты
+    могут вызывать парсер без запуска интерфейса и повторной компиляции.
+
+        POST /analyze           - тело - файл .docx или текстовый (имя - в ?name=...
+                                  или заголовке X-Filename), либо JSON {"paths": [...]}
+                                  с путями к файлам и каталогам на этой машине;
+                                  ?queries=0 - без запросов
+        GET  /metrics           - счетчики запросов, задержки и пропускная способность
+        GET  /health            - проверка доступности
+
+    Одновременно выполняется не больше concurrency анализов: у каждого свой
+    IOCParser из пула (движок поиска не рассчитан на общий доступ из потоков),
+    остальные запросы ждут свободный парсер до queue_timeout секунд, затем
+    получают 503.
+    """
+    def __init__(self, model, host="127.0.0.1", port=8765, concurrency=2, queue_timeout=30, max_upload_mb=64):
+        self.model = model
+        self.queue_timeout = queue_timeout
+        self.max_upload = max_upload_mb * 1024 * 1024
+        parser = model['parser']
+        self._parsers = queue.Queue()
+        self._parsers.put(parser)
+        for _ in range(max(concurrency, 1) - 1):
+            self._parsers.put(IOCParser(**parser._worker_options()))
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._counters = collections.Counter()
+        self._requests = collections.Counter()  # по "метод путь"
+        self._statuses = collections.Counter()
+        self._in_flight = 0
+        self.server = ThreadingHTTPServer((host, port), _RequestHandler)
+        self.server.daemon_threads = True
+        self.server.service = self
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        # Прогреваем шаблоны всех парсеров пула до первого запроса
+        scan_plan = self.model['config'].get_scan_plan()
+        for parser in list(self._parsers.queue): parser._get_engine(scan_plan)
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # --- Анализ ---
+
+    def analyze(self, body, content_type, params):
+        """
+        Возвращает (код ответа, словарь ответа) для POST /analyze.
+        """
+        if content_type.split(";")[0].strip() == "application/json":
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError as e:
+                return 400, {"error": f"Некорректный JSON: {e}"}
+            paths = request.get("paths")
+            if not isinstance(paths, list) or not paths:
+                return 400, {"error": "Ожидается {\"paths\": [путь, ...]}"}
+            filepaths = collect_input_files(paths)
+            missing = [path for path in filepaths if not Path(path).is_file()]
+            if missing:
+                return 404, {"error": f"Файлы не найдены: {', '.join(missing)}"}
+            return self._run(filepaths, {}, request.get("queries", True))
+
+        name = Path(params.get("name", [""])[0] or "upload.docx").name
+        if Path(name).suffix.lower() != ".docx" and not is_text_input(name):
+            return 415, {"error": f"Неподдерживаемый тип файла: {name}"}
+        if not body:
+            return 400, {"error": "Пустое тело запроса"}
+        fd, temp_path = tempfile.mkstemp(suffix=Path(name).suffix)
+        try:
+            with os.fdopen(fd, 'wb') as f: f.write(body)
+            return self._run([temp_path], {temp_path: name}, params.get("queries", ["1"])[0] != "0")
+        finally:
+            os.unlink(temp_path)
+
+    def _run(self, filepaths, display_names, with_queries):
+        try:
+            parser = self._parsers.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            with self._lock: self._counters["rejected"] += 1
+            return 503, {"error": "Сервис занят, повторите запрос позже"}
+        try:
+            scan_plan = self.model['config'].get_scan_plan()
+            found_iocs = parser.extract_all_iocs(filepaths, scan_plan)
+            skipped = dict(parser.skipped_types)
+        finally:
+            self._parsers.put(parser)
+
+        indicators = {}
+        for name, column in found_iocs.items():
+            indicators[name] = [
+                {"raw": raw, "ioc": ioc, "sources": [display_names.get(path, path) for path in sources]}
+                for raw, ioc, sources in zip(column.raw, column.normalized, column.sources)
+            ]
+        response = {
+            "files": len(filepaths),
+            "indicators": indicators,
+            "counts": {name: len(values) for name, values in indicators.items()},
+            "skipped_types": skipped,
+        }
+        if with_queries:
+            response["queries"] = self.model['reporter'].generate_query_data(found_iocs, scan_plan)
+        with self._lock:
+            self._counters["files"] += len(filepaths)
+            self._counters["indicators"] += sum(response["counts"].values())
+        return 200, response
+
+    # --- Метрики ---
+
+    def request_started(self):
+        with self._lock: self._in_flight += 1
+
+    def request_finished(self, route, status, seconds, received):
+        with self._lock:
+            self._in_flight -= 1
+            self._requests[route] += 1
+            self._statuses[str(status)] += 1
+            self._counters["bytes_in"] += received
+            if route.startswith("POST "): self._latencies.append(seconds)
+
+    def metrics(self):
+        """
+        Снимок счетчиков: число запросов по маршрутам и кодам ответа, задержки
+        анализа (по последним LATENCY_WINDOW запросам) и пропускная способность
+        с момента запуска.
+        """
+        with self._lock:
+            uptime = time.time() - self._started
+            latencies = sorted(self._latencies)
+            total = sum(self._requests.values())
+
+            def percentile(share):
+                return round(latencies[min(len(latencies) - 1, int(share * len(latencies)))], 4) if latencies else None
+
+            return {
+                "uptime_sec": round(uptime, 1),
+                "in_flight": self._in_flight,
+                "requests_total": total,
+                "requests": dict(self._requests),
+                "responses": dict(self._statuses),
+                "rejected": self._counters["rejected"],
+                "files_total": self._counters["files"],
+                "indicators_total": self._counters["indicators"],
+                "bytes_in_total": self._counters["bytes_in"],
+                "analyze_latency_sec": {
+                    "count": len(latencies),
+                    "avg": round(sum(latencies) / len(latencies), 4) if latencies else None,
+                    "p50": percentile(0.5), "p95": percentile(0.95),
+                    "max": round(latencies[-1], 4) if latencies else None,
+                },
+                "throughput": {
+                    "requests_per_sec": round(total / uptime, 3) if uptime else 0,
+                    "files_per_sec": round(self._counters["files"] / uptime, 3) if uptime else 0,
+                },
+            }
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "IOCParser"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method):
+        service = self.server.service
+        url = urlsplit(self.path)
+        route = f"{method} {url.path}"
+        started, received = time.perf_counter(), 0
+        service.request_started()
+        status = 500
+        try:
+            if route == "GET /health":
+                status, payload = 200, {"status": "ok"}
+            elif route == "GET /metrics":
+                status, payload = 200, service.metrics()
+            elif route == "POST /analyze":
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Тело неизвестной длины не дочитать - соединение закрывается
+                    self.close_connection = True
+                    status, payload = 400, {"error": "Некорректный заголовок Content-Length"}
+                elif length > service.max_upload:
+                    # Тело дочитывается блоками без сохранения, чтобы клиент получил ответ, а не обрыв
+                    self._discard(length)
+                    self.close_connection = True
+                    status, payload = 413, {"error": f"Файл больше {service.max_upload // (1024 * 1024)} МБ"}
+                else:
+                    body = self.rfile.read(length) if length else b""
+                    received = len(body)
+                    params = parse_qs(url.query)
+                    if "X-Filename" in self.headers and "name" not in params:
+                        params["name"] = [self.headers["X-Filename"]]
+                    status, payload = service.analyze(body, self.headers.get("Content-Type", ""), params)
+            else:
+                route = f"{method} (other)"
+                status, payload = 404, {"error": f"Неизвестный адрес: {url.path}"}
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        finally:
+            service.request_finished(route, status, time.perf_counter() - started, received)
+        self._send_json(status, payload)
+
+    def _discard(self, length):
+        while length > 0:
+            chunk = self.rfile.read(min(length, 64 * 1024))
+            if not chunk: break
+            length -= len(chunk)
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Журнал запросов - в stderr, как и прочие служебные сообщения
+        print(f"{self.address_string()} - {format % args}", file=sys.stderr)
@@ -0,0 +1,196 @@
+import contextlib
+import json
+import sys
+import time
+from pathlib import Path
+
+from src.model.analysis_cache import content_hash, plan_hash
+
+# Файл, измененный позже этого числа секунд назад, считается еще копируемым
+SETTLE_SECONDS = 2
+
+
+class FolderWatcher:
+    """
+    Режим наблюдения за каталогом: периодически ищет новые и измененные .docx
+    (сначала по времени изменения и размеру, затем по хешу содержимого),
+    разбирает только их и дописывает новые индикаторы в текущие XLSX
+    и _queries.txt, не пересоздавая отчеты.
+
+    Между циклами хранятся находки до очистки по каждому файлу, поэтому
+    очистка DNS/MD5 учитывает и прежние файлы; находки измененного файла
+    заменяются новыми, а строки, уже попавшие в отчет, не удаляются.
+    Состояние сохраняется в <отчет>_watch.json рядом с отчетом, чтобы после
+    перезапуска уже обработанные файлы не разбирались повторно.
+    """
+    def __init__(self, model, directory, xlsx_path, workers=1, interval=10):
+        self.model = model
+        self.directory = Path(directory)
+        self.xlsx_path = Path(xlsx_path)
+        self.txt_path = self.xlsx_path.with_name(f"{self.xlsx_path.stem}_queries.txt")
+        self.state_path = self.xlsx_path.with_name(f"{self.xlsx_path.stem}_watch.json")
+        self.workers = workers
+        self.interval = interval
+        self.scan_plan = model['config'].get_scan_plan()
+        self.files = {}     # {путь: {"mtime", "size", "hash"}}
+        self.raw = {}       # {путь: {тип IOC: [находки до очистки]}}
+        self.reported = {}  # {тип IOC: множество значений, уже записанных в отчет XLSX}
+        self.queried = {}   # {тип IOC: множество значений, уже попавших в файл запросов}
+        self._load_state()
+
+    def _load_state(self):
+        try:
+            state = json.loads(self.state_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.reported = {name: set(values) for name, values in state.get("reported", {}).items()}
+        # В состоянии старого формата оба отчета дописывались вместе
+        self.queried = {name: set(values) for name, values in state.get("queried", state.get("reported", {})).items()}
+        if state.get("plan") != plan_hash(self.scan_plan.signature):
+            # Шаблоны изменились - файлы нужно разобрать заново; записанное в отчет не дублируется
+            print("Типы IOC изменились с прошлого запуска, файлы будут разобраны заново.")
+            return
+        self.files = state.get("files", {})
+        if "raw_by_file" in state:
+            self.raw = state["raw_by_file"]
+            return
+        # Состояние старого формата: {тип IOC: {находка: файлы}} или {тип IOC: [находки]} без файлов
+        for name, values in state.get("raw", {}).items():
+            for value in values:
+                for path in (values[value] if isinstance(values, dict) else None) or [""]:
+                    self.raw.setdefault(path, {}).setdefault(name, []).append(value)
+
+    def _save_state(self):
+        state = {
+            "plan": plan_hash(self.scan_plan.signature),
+            "files": self.files,
+            "raw_by_file": self.raw,
+            "reported": {name: sorted(values) for name, values in self.reported.items()},
+            "queried": {name: sorted(values) for name, values in self.queried.items()},
+        }
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state, ensure_ascii=False), encoding='utf-8')
+        tmp_path.replace(self.state_path)
+
+    def find_changes(self):
+        """
+        Возвращает {путь: отметка} новых и измененных файлов; отметки запоминаются
+        в process() только после успешной обработки. Файлы, у которых изменилось
+        только время, но не содержимое, пропускаются.
+        """
+        changed, now = {}, time.time()
+        for path in sorted(self.directory.glob("*.docx")):
+            if path.name.startswith("~$"): continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            key = str(path)
+            known = self.files.get(key)
+            if known and known["mtime"] == stat.st_mtime and known["size"] == stat.st_size: continue
+            if now - stat.st_mtime < SETTLE_SECONDS: continue
+            try:
+                digest = content_hash(path.read_bytes())
+            except OSError:
+                continue
+            record = {"mtime": stat.st_mtime, "size": stat.st_size, "hash": digest}
+            if known and known["hash"] == digest:
+                self.files[key] = record
+            else:
+                changed[key] = record
+        return changed
+
+    def process(self, changed):
+        """
+        Разбирает файлы и дописывает в отчеты только ранее не встречавшиеся индикаторы.
+        changed - результат find_changes(). Возвращает статистику цикла.
+        """
+        parser, reporter = self.model['parser'], self.model['reporter']
+        filepaths = list(changed)
+        batch = parser.extract_all_iocs(filepaths, self.scan_plan, workers=self.workers, raw=True)
+        # Находки прежней версии измененного файла заменяются новыми
+        for path in filepaths: self.raw.pop(path, None)
+        for name, found in batch.items():
+            for value, paths in found.items():
+                for path in paths: self.raw.setdefault(path, {}).setdefault(name, []).append(value)
+        sources = {}
+        for path, finds in sorted(self.raw.items()):
+            for name, values in finds.items():
+                type_sources = sources.setdefault(name, {})
+                # Пустой путь - находки из состояния старого формата без файлов
+                for value in values: type_sources[value] = type_sources.get(value, ()) + ((path,) if path else ())
+        merged = {name: sorted(found, key=str) for name, found in sources.items()}
+        cleaned = parser.clean_finds(merged, sources)
+
+        # Отчеты дописываются и запоминаются по отдельности, а состояние сохраняется
+        # и при ошибке: если файл запросов записать не удалось, в следующем цикле
+        # строки XLSX не продублируются
+        new_iocs = self._unreported(cleaned, self.reported)
+        stats = {"files": len(filepaths), "new_indicators": sum(len(v) for v in new_iocs.values()),
+                 "skipped_types": list(parser.skipped_types)}
+        try:
+            if new_iocs:
+                success, message = reporter.append_xlsx_report(str(self.xlsx_path), new_iocs, self.scan_plan)
+                print(message)
+                if not success: raise RuntimeError(message)
+                self._remember(self.reported, new_iocs)
+                stats["by_type"] = {name: len(values) for name, values in new_iocs.items()}
+            new_queries = self._unreported(cleaned, self.queried)
+            if new_queries:
+                query_data = reporter.generate_query_data(new_queries, self.scan_plan)
+                success, message = reporter.create_query_file(self.txt_path, query_data, self.scan_plan, append=True)
+                print(message)
+                if not success: raise RuntimeError(message)
+                self._remember(self.queried, new_queries)
+            self.files.update(changed)
+        finally:
+            self._save_state()
+        return stats
+
+    @staticmethod
+    def _unreported(cleaned, reported):
+        """
+        {тип IOC: IOCColumn} только со значениями, которых еще нет в reported.
+        """
+        new_iocs = {}
+        for name, column in cleaned.items():
+            known = reported.get(name, ())
+            fresh = [i for i, value in enumerate(column.raw) if value not in known]
+            if fresh: new_iocs[name] = column.select(fresh)
+        return new_iocs
+
+    @staticmethod
+    def _remember(reported, new_iocs):
+        for name, values in new_iocs.items():
+            reported.setdefault(name, set()).update(values)
+
+    def run(self, stop_event=None):
+        """
+        Цикл наблюдения до KeyboardInterrupt или установки stop_event.
+        После каждого цикла с изменениями в stdout пишется строка JSON со статистикой.
+        """
+        print(f"Наблюдение за {self.directory} (каждые {self.interval} с), отчет: {self.xlsx_path}", file=sys.stderr)
+        stdout = sys.stdout
+        while stop_event is None or not stop_event.is_set():
+            # Служебные сообщения - в stderr, в stdout только строки JSON
+            with contextlib.redirect_stdout(sys.stderr):
+                stats = self._cycle()
+            if stats is not None:
+                print(json.dumps(stats, ensure_ascii=False), file=stdout, flush=True)
+            if stop_event is not None:
+                stop_event.wait(self.interval)
+            else:
+                time.sleep(self.interval)
+
+    def _cycle(self):
+        changed = self.find_changes()
+        if not changed:
+            return None
+        started = time.perf_counter()
+        try:
+            stats = self.process(changed)
+        except Exception as e:
+            # Например, отчет открыт в Excel; файлы будут обработаны в следующем цикле
+            stats = {"status": "error", "error": str(e), "files": len(changed)}
+        stats["elapsed_sec"] = round(time.perf_counter() - started, 3)
+        return stats
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+# Меняется, когда меняется формат записей или семантика поиска,
+# чтобы старые результаты не подмешивались к новым
+CACHE_VERSION = 1
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def plan_hash(signature):
+    """
+    Хеш набора включенных шаблонов (см. ScanEngine.signature).
+    """
+    payload = json.dumps([CACHE_VERSION, signature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Дисковый кэш результатов разбора в SQLite, адресуемый содержимым файла.
+    Хранит извлеченный текст (по хешу содержимого) и найденные значения
+    (по хешу содержимого и хешу набора шаблонов), поэтому правка регулярных
+    выражений приводит только к повторному поиску, без повторного чтения .docx.
+    Общий объем ограничен max_bytes, лишнее вытесняется по давности использования.
+    """
+    def __init__(self, path, max_bytes):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Соединение не переносится в другие процессы - там оно откроется заново
+        return {"path": self.path, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["max_bytes"])
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS texts (content_hash TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS matches (content_hash TEXT NOT NULL, plan_hash TEXT NOT NULL, data BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (content_hash, plan_hash))")
+            conn.execute("CREATE INDEX IF NOT EXISTS texts_last_used ON texts (last_used)")
+            conn.execute("CREATE INDEX IF NOT EXISTS matches_last_used ON matches (last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _get(self, table, where, params):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(f"SELECT data FROM {table} WHERE {where}", params).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"UPDATE {table} SET last_used = ? WHERE {where}", (time.time(), *params))
+            conn.commit()
+            return zlib.decompress(row[0])
+
+    def _put(self, table, columns, params, payload):
+        blob = zlib.compress(payload)
+        with self._lock:
+            conn = self._connect()
+            placeholders = ", ".join("?" * (len(columns) + 3))
+            conn.execute(f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}, data, size, last_used) VALUES ({placeholders})",
+                         (*params, blob, len(blob), time.time()))
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT (SELECT COALESCE(SUM(size), 0) FROM texts) + (SELECT COALESCE(SUM(size), 0) FROM matches)").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        oldest = conn.execute("SELECT 'texts', rowid, size, last_used FROM texts "
+                              "UNION ALL SELECT 'matches', rowid, size, last_used FROM matches ORDER BY last_used")
+        for table, rowid, size, _ in oldest.fetchall():
+            if total <= self.max_bytes: break
+            conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (rowid,))
+            total -= size
+
+    def get_text(self, file_hash):
+        data = self._get("texts", "content_hash = ?", (file_hash,))
+        return None if data is None else data.decode('utf-8')
+
+    def put_text(self, file_hash, text):
+        self._put("texts", ("content_hash",), (file_hash,), text.encode('utf-8'))
+
+    def get_matches(self, file_hash, scan_hash):
+        """
+        Возвращает {тип IOC: множество значений} или None при промахе.
+        """
+        data = self._get("matches", "content_hash = ? AND plan_hash = ?", (file_hash, scan_hash))
+        if data is None:
+            return None
+        # JSON не различает списки и кортежи; кортежи дает re.findall с несколькими группами
+        return {name: {tuple(v) if isinstance(v, list) else v for v in values}
+                for name, values in json.loads(data).items()}
+
+    def put_matches(self, file_hash, scan_hash, finds):
+        payload = json.dumps({name: list(values) for name, values in finds.items()}, ensure_ascii=False)
+        self._put("matches", ("content_hash", "plan_hash"), (file_hash, scan_hash), payload.encode('utf-8'))
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM texts")
+            conn.execute("DELETE FROM matches")
+            conn.commit()
+            conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -2,6 +2,9 @@ import json
 import sys
 from pathlib import Path
 
+from src.model.regex_guard import check_ioc_types
+from src.model.scan_plan import ScanPlan
+
 def get_base_path():
     """
     Определяет базовый путь для файлов (конфига),
@@ -16,25 +19,98 @@ def get_base_path():
 
 # Определяем путь к файлу конфигурации
 CONFIG_FILE = get_base_path() / "config.txt"
+# Кэш результатов разбора файлов хранится рядом с конфигом
+CACHE_FILE = get_base_path() / "cache.sqlite3"
+# История найденных индикаторов (для отбора новых с прошлых запусков)
+HISTORY_FILE = get_base_path() / "ioc_history.sqlite3"
+
+# Общие параметры работы приложения (раздел "settings" конфига).
+# Отсутствующие в файле ключи берутся отсюда.
+DEFAULT_SETTINGS = {
+    "workers": 1,  # Число процессов для разбора файлов: 1 - последовательно, 0 - по числу ядер
+    "cache_enabled": True,  # Кэшировать извлеченный текст и найденные IOC между запусками
+    "cache_max_mb": 512,  # Предельный размер файла кэша
+    "history_enabled": True,  # Запоминать найденные индикаторы между запусками (ioc_history.sqlite3)
+    "history_new_only": False,  # По умолчанию включать в отчеты только индикаторы, не встречавшиеся раньше
+    # Бюджет времени одного регулярного выражения на один файл, с: поиск идет в отдельном
+    # процессе, и тип IOC, превысивший бюджет, пропускается (0 - без ограничения)
+    "regex_scan_budget_s": 30,
+    # Проверка шаблонов при сохранении настроек на образцах "тяжелого" текста:
+    # дольше warn - предупреждение, дольше limit - сохранение запрещено
+    "regex_profile_warn_ms": 200,
+    "regex_profile_limit_ms": 2000,
+    # Текстовые входные файлы (.txt, .log, .csv, .eml) читаются фрагментами:
+    # размер фрагмента, предельное перекрытие фрагментов (символов) и кодировка
+    "text_chunk_mb": 16,
+    "text_overlap_chars": 4096,
+    "text_encoding": "utf-8",
+    # Локальный HTTP-сервис (main.py --serve): одновременных анализов, ожидание
+    # свободного парсера до ответа 503, с, и предельный размер загружаемого файла
+    "server_concurrency": 2,
+    "server_queue_timeout_s": 30,
+    "server_max_upload_mb": 64,
+    "instrumentation": False,  # Замерять время по файлам, шаблонам и этапам; сводка в лог и <отчет>_stats.json
+    "lazy_settings_editors": False,  # Создавать поля настроек IOC только при разворачивании блока
+    "log_max_lines": 5000,  # Сколько последних строк лога держать в окне
+    "log_file": "",  # Файл лога рядом с конфигом (например, "ioc_parser.log"); пусто - не писать
+    "log_file_max_kb": 1024,  # Размер файла лога, после которого он ротируется
+    "log_file_backups": 3,  # Сколько старых файлов лога хранить
+    # Лимиты на один запрос для каждой системы (0 - без ограничения):
+    # более длинные запросы делятся на несколько примерно равных частей
+    "query_limits": {
+        "MP10": {"max_terms": 500, "max_chars": 30000},
+        "NAD": {"max_terms": 500, "max_chars": 30000}
+    }
+}
 
 class ConfigManager:
     def __init__(self):
+        self._scan_plan = None
         self.config_data = self.load()
+        self._refresh_scan_plan()
     def load(self):
         try:
             with open(CONFIG_FILE, 'r', encoding='utf-8') as f: return json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
             return self._create_default()
     def save(self):
+        self._refresh_scan_plan()
         try:
             with open(CONFIG_FILE, 'w', encoding='utf-8') as f: json.dump(self.config_data, f, indent=4, ensure_ascii=False)
         except IOError as e: print(f"Ошибка при сохранении файла конфигурации: {e}")
     def get_ioc_types(self):
         return self.config_data.get("ioc_types", {})
+    def get_setting(self, key):
+        return self.config_data.get("settings", {}).get(key, DEFAULT_SETTINGS.get(key))
+    def get_scan_plan(self):
+        """
+        Возвращает скомпилированный план сканирования для текущих типов IOC.
+        """
+        self._refresh_scan_plan()
+        return self._scan_plan
+    def _refresh_scan_plan(self):
+        # План пересобирается только если типы IOC действительно изменились
+        if self._scan_plan is None or not self._scan_plan.matches_config(self.get_ioc_types()):
+            self._scan_plan = ScanPlan(self.get_ioc_types())
     def update_ioc_types(self, new_ioc_types_data):
         self.config_data["ioc_types"] = new_ioc_types_data
+        self._refresh_scan_plan()
+    @staticmethod
+    def validate_ioc_types(ioc_types_data):
+        """
+        Возвращает {имя типа: ошибка} для некомпилируемых регулярных выражений.
+        """
+        return ScanPlan.validate(ioc_types_data)
+    def check_regex_cost(self, ioc_types_data):
+        """
+        Замеряет новые и измененные шаблоны на образцах "тяжелого" текста.
+        Возвращает (blocked, slow) - см. regex_guard.check_ioc_types.
+        """
+        return check_ioc_types(ioc_types_data, self.get_setting("regex_profile_warn_ms") / 1000,
+                               self.get_setting("regex_profile_limit_ms") / 1000, previous=self.get_ioc_types())
     def _create_default(self):
         default_config = {
+            "settings": dict(DEFAULT_SETTINGS),
             "ioc_types": {
                 "IP": {"enabled": True, "regex": "\\b(?:\\d{1,3}(?:\\[\\.\\]|\\.)){3}\\d{1,3}\\b", "report_template": {"Тип Индикатора": "IP-адрес", "Статус Активности NTA": "", "Статус Активности SIEM (MP)": ""}, "query_templates": {"MP10": ["src.ip = \"{ioc}\"", "dst.ip = \"{ioc}\""], "NAD": ["src.ip == \"{ioc}\"", "dst.ip == \"{ioc}\"", "host.ip == \"{ioc}\""]}},
                 "DNS": {"enabled": True, "regex": "\\b(?=.*[a-zA-Z])[\\w.-]+\\[\\.\\][\\w.-]+\\b", "report_template": {"Тип Индикатора": "Домен", "Статус Активности NTA": "", "Статус Активности SIEM (MP)": "---------------"}, "query_templates": {"MP10": ["event_src.fqdn = \"{ioc}\""], "NAD": ["src.dns ~ \"{ioc}\""]}},
@@ -0,0 +1,28 @@
+class ContainmentIndex:
+    """
+    Индекс для проверок вида "строка входит в одну из строк набора".
+    Для каждой запрошенной длины один раз строится множество всех подстрок
+    этой длины, после чего каждая проверка - один поиск в множестве
+    вместо перебора всего набора.
+    """
+    def __init__(self, strings):
+        self._strings = set(strings)
+        self._windows = {}
+
+    def _windows_of_length(self, length):
+        windows = self._windows.get(length)
+        if windows is None:
+            windows = set()
+            for s in self._strings:
+                for start in range(len(s) - length + 1):
+                    windows.add(s[start:start + length])
+            self._windows[length] = windows
+        return windows
+
+    def contains(self, value):
+        """
+        True, если value является подстрокой хотя бы одной строки индекса.
+        """
+        if not value:
+            return bool(self._strings)
+        return value in self._windows_of_length(len(value))
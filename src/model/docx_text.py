@@ -0,0 +1,70 @@
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+# Пространства имен WordprocessingML, которые нужны для разбора текста
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_NS = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+_P = W_NS + "p"
+_T = W_NS + "t"
+_TAB = W_NS + "tab"
+_PTAB = W_NS + "ptab"
+_BR = W_NS + "br"
+_CR = W_NS + "cr"
+_NO_BREAK_HYPHEN = W_NS + "noBreakHyphen"
+_FALLBACK = MC_NS + "Fallback"
+
+# Символы, которыми python-docx заменяет специальные элементы внутри run
+_SPECIAL_CHARS = {_TAB: "\t", _PTAB: "\t", _BR: "\n", _CR: "\n", _NO_BREAK_HYPHEN: "-"}
+
+MAIN_PART = "word/document.xml"
+# Дополнительные части документа: колонтитулы и сноски
+_EXTRA_PARTS = re.compile(r"^word/(header\d*|footer\d*|footnotes|endnotes)\.xml$")
+
+
+def _iter_part_paragraphs(stream):
+    """
+    Потоково разбирает одну XML-часть документа и выдает текст каждого абзаца.
+    Абзацы внутри ячеек таблиц выдаются в порядке документа, поэтому
+    объединенная ячейка (gridSpan/vMerge) попадает в результат ровно один раз.
+    """
+    stack = []          # Абзацы могут быть вложенными (надписи внутри run)
+    fallback_depth = 0  # Содержимое mc:Fallback дублирует mc:Choice - пропускаем
+    for event, elem in iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == _FALLBACK:
+                fallback_depth += 1
+            elif tag == _P and not fallback_depth:
+                stack.append([])
+            continue
+
+        if tag == _FALLBACK:
+            fallback_depth -= 1
+            elem.clear()
+        elif fallback_depth or not stack:
+            continue
+        elif tag == _T:
+            if elem.text: stack[-1].append(elem.text)
+        elif tag in _SPECIAL_CHARS:
+            stack[-1].append(_SPECIAL_CHARS[tag])
+        elif tag == _P:
+            yield "".join(stack.pop())
+            elem.clear()
+
+
+def iter_docx_text(filepath):
+    """
+    Лениво выдает текст абзацев .docx-файла, читая XML прямо из zip-архива
+    без построения объектной модели python-docx.
+    Сначала основной текст, затем колонтитулы и сноски.
+    Пустые абзацы пропускаются.
+    """
+    with zipfile.ZipFile(filepath) as archive:
+        names = archive.namelist()
+        parts = [MAIN_PART] + sorted(name for name in names if _EXTRA_PARTS.match(name))
+        for part in parts:
+            with archive.open(part) as stream:
+                for text in _iter_part_paragraphs(stream):
+                    if text: yield text
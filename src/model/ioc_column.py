@@ -0,0 +1,83 @@
+def normalize_ioc(value):
+    """
+    Убирает "обезвреживание" точек: 1[.]2[.]3[.]4 -> 1.2.3.4.
+    Если замен нет, возвращается тот же объект строки, без копии.
+    """
+    return value.replace('[.]', '.')
+
+
+class IOCColumn:
+    """
+    Найденные индикаторы одного типа в столбцовом виде: параллельные списки
+    исходных значений (как в тексте бюллетеня), нормализованных значений и
+    файлов-источников, упорядоченные по исходному значению.
+    Нормализация выполняется один раз при разборе; очистка, запросы, отчет
+    и история берут готовые значения вместо повторных replace('[.]', '.').
+    Как последовательность ведет себя как список исходных значений, поэтому
+    код, которому достаточно {тип IOC: список строк}, работает без изменений.
+    """
+    __slots__ = ("type", "raw", "normalized", "sources")
+
+    def __init__(self, ioc_type, raw, normalized=None, sources=None):
+        """
+        raw - отсортированный список исходных значений;
+        sources - параллельный список кортежей путей к файлам, где значение найдено.
+        """
+        self.type = ioc_type
+        self.raw = raw
+        self.normalized = normalized if normalized is not None else [normalize_ioc(value) for value in raw]
+        self.sources = sources if sources is not None else [()] * len(raw)
+
+    @classmethod
+    def ensure(cls, ioc_type, values):
+        """
+        Возвращает values как IOCColumn: готовый столбец - как есть,
+        обычный список значений - отсортированным столбцом.
+        """
+        if isinstance(values, cls):
+            return values
+        return cls(ioc_type, sorted(values))
+
+    @classmethod
+    def from_sources(cls, ioc_type, raw, sources):
+        """
+        Столбец из отсортированных значений и словаря {значение: кортеж файлов}.
+        """
+        return cls(ioc_type, raw, sources=[sources.get(value, ()) for value in raw])
+
+    def select(self, indexes):
+        """
+        Новый столбец из строк с указанными номерами (в их порядке), без повторной нормализации.
+        """
+        return IOCColumn(self.type, [self.raw[i] for i in indexes], [self.normalized[i] for i in indexes],
+                         [self.sources[i] for i in indexes])
+
+    def source_map(self):
+        """
+        {исходное значение: кортеж путей к файлам, в которых оно найдено}.
+        """
+        return dict(zip(self.raw, self.sources))
+
+    def rows(self):
+        """
+        Пары (исходное значение, нормализованное) в порядке столбца.
+        """
+        return zip(self.raw, self.normalized)
+
+    def query_values(self):
+        """
+        Нормализованные значения в порядке сортировки - для подстановки в шаблоны запросов.
+        """
+        return sorted(self.normalized)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __getitem__(self, index):
+        return self.raw[index]
+
+    def __repr__(self):
+        return f"IOCColumn({self.type!r}, {len(self.raw)} значений)"
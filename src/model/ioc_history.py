@@ -0,0 +1,127 @@
+import sqlite3
+import threading
+import time
+
+from src.model.ioc_column import IOCColumn, normalize_ioc
+
+# Сколько значений проверяется одним запросом (лимит параметров SQLite - 999 в старых сборках)
+LOOKUP_BATCH = 900
+# Типы IOC (имена из конфига по умолчанию), значения которых не зависят от регистра;
+# у URI, имен файлов и пользовательских типов регистр значим
+CASE_INSENSITIVE_TYPES = frozenset({"IP", "DNS", "SHA256", "SHA1", "MD5", "Registry"})
+
+
+def _fold_case(ioc_type, normalized):
+    if ioc_type == "Email":
+        # Регистр не важен только в домене; локальная часть по RFC 5321 может его различать
+        local, at, domain = normalized.rpartition('@')
+        return f"{local}{at}{domain.lower()}"
+    return normalized.lower() if ioc_type in CASE_INSENSITIVE_TYPES else normalized
+
+
+def history_key(ioc_type, value):
+    """
+    Нормализованное значение индикатора для истории: без "обезвреживания"
+    точек, чтобы 1[.]2[.]3[.]4 и 1.2.3.4 считались одним IOC, и без учета
+    регистра для типов из CASE_INSENSITIVE_TYPES (хеши, домены) и домена почты.
+    """
+    return _fold_case(ioc_type, normalize_ioc(str(value)))
+
+
+class IOCHistory:
+    """
+    История найденных индикаторов в SQLite: для каждой пары (тип IOC,
+    нормализованное значение) хранятся время первой и последней встречи,
+    файл, в котором индикатор встретился впервые, и число прогонов с ним.
+    Первичный ключ (type, value) в таблице WITHOUT ROWID одновременно служит
+    индексом, поэтому проверка "встречался ли" остается быстрой и на миллионах записей.
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS iocs (type TEXT NOT NULL, value TEXT NOT NULL, first_seen REAL NOT NULL, "
+                         "last_seen REAL NOT NULL, source TEXT NOT NULL, runs INTEGER NOT NULL, PRIMARY KEY (type, value)) WITHOUT ROWID")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def known(self, ioc_type, keys):
+        """
+        Возвращает множество ключей (см. history_key) из keys, которые уже есть в истории.
+        """
+        keys = list(set(keys))
+        found = set()
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(keys), LOOKUP_BATCH):
+                batch = keys[start:start + LOOKUP_BATCH]
+                rows = conn.execute(f"SELECT value FROM iocs WHERE type = ? AND value IN ({', '.join('?' * len(batch))})", (ioc_type, *batch))
+                found.update(row[0] for row in rows)
+        return found
+
+    def filter_new(self, found_iocs):
+        """
+        Оставляет в found_iocs только индикаторы, которых нет в истории:
+        возвращает {тип IOC: IOCColumn}. Типы, в которых ничего не осталось, убираются.
+        """
+        new_iocs = {}
+        for name, values in found_iocs.items():
+            column = IOCColumn.ensure(name, values)
+            keys = [_fold_case(name, value) for value in column.normalized]
+            known = self.known(name, keys)
+            fresh = [i for i, key in enumerate(keys) if key not in known]
+            if fresh: new_iocs[name] = column.select(fresh)
+        return new_iocs
+
+    def record(self, found_iocs):
+        """
+        Добавляет индикаторы прогона одной транзакцией: новые - с временем
+        первой встречи и первым файлом-источником (из IOCColumn.sources),
+        у известных обновляется время последней встречи и счетчик прогонов.
+        """
+        now, rows = time.time(), {}
+        for name, values in found_iocs.items():
+            column = IOCColumn.ensure(name, values)
+            for normalized, files in zip(column.normalized, column.sources):
+                rows.setdefault((name, _fold_case(name, normalized)), str(files[0]) if files else "")
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT INTO iocs (type, value, first_seen, last_seen, source, runs) VALUES (?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT (type, value) DO UPDATE SET last_seen = excluded.last_seen, runs = runs + 1",
+                ((name, key, now, now, source) for (name, key), source in rows.items())
+            )
+            conn.commit()
+        return len(rows)
+
+    def get(self, ioc_type, value):
+        """
+        Запись истории для индикатора: {"first_seen", "last_seen", "source", "runs"} или None.
+        """
+        with self._lock:
+            row = self._connect().execute("SELECT first_seen, last_seen, source, runs FROM iocs WHERE type = ? AND value = ?",
+                                          (ioc_type, history_key(ioc_type, value))).fetchone()
+        return None if row is None else dict(zip(("first_seen", "last_seen", "source", "runs"), row))
+
+    def count(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM iocs").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM iocs")
+            conn.commit()
+            conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,11 +1,87 @@
-import re
+import io
+import os
+import sqlite3
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from pathlib import Path
 from urllib.parse import urlparse
-from docx import Document
+from xml.etree.ElementTree import ParseError
+
+from src.model.analysis_cache import content_hash, plan_hash
+from src.model.containment_index import ContainmentIndex
+from src.model.docx_text import iter_docx_text
+from src.model.ioc_column import IOCColumn
+from src.model.regex_guard import GuardedScanner
+from src.model.run_stats import RunStats
+from src.model.scan_engine import ScanEngine
+from src.model.scan_plan import ScanPlan
+from src.model.text_input import is_text_input, iter_text_chunks
+
+class AnalysisCancelled(Exception):
+    """
+    Разбор файлов прерван по запросу пользователя.
+    """
+
 
 class IOCParser:
-    def _get_text_from_docx(self, filepath):
+    def __init__(self, cache=None, pattern_budget=0, text_chunk_size=16 * 1024 * 1024, text_overlap=4096, text_encoding="utf-8"):
+        """
+        cache - необязательный AnalysisCache для повторного использования
+        извлеченного текста и найденных значений между запусками.
+        pattern_budget - бюджет времени одного шаблона на один файл, с:
+        поиск идет в отдельном процессе (GuardedScanner), а тип IOC, чей шаблон
+        не уложился в бюджет, пропускается и попадает в skipped_types.
+        0 - без ограничения, поиск в текущем процессе.
+        text_chunk_size, text_overlap, text_encoding - разбор текстовых файлов
+        (логи, выгрузки почты) фрагментами: размер фрагмента в байтах, предельное
+        перекрытие фрагментов в символах для шаблонов неограниченной длины, кодировка.
+        """
+        self.cache = cache
+        self.pattern_budget = pattern_budget
+        self.text_chunk_size = text_chunk_size
+        self.text_overlap = text_overlap
+        self.text_encoding = text_encoding
+        self.skipped_types = {}  # {тип IOC: сообщение} за текущий прогон
+        self._engine = None
+        self._engine_signature = None
+        self._plan_hash = None
+        self._guard = None
+
+    def _get_engine(self, scan_plan):
+        """
+        Возвращает движок поиска для текущего набора шаблонов.
+        Шаблоны перекомпилируются только при изменении конфигурации.
+        """
+        signature = scan_plan.signature
+        if self._engine is None or signature != self._engine_signature:
+            self._engine = ScanEngine(scan_plan)
+            self._engine_signature = signature
+            self._plan_hash = plan_hash(signature)
+            if self._guard is not None: self._guard.close()
+            self._guard = GuardedScanner(scan_plan, self.pattern_budget, self.skipped_types) if self.pattern_budget else None
+        return self._engine
+
+    def _get_text_from_docx(self, filepath, source=None):
+        """
+        Извлекает текст .docx потоковым разбором XML. Если файл не удалось
+        разобрать напрямую, используется python-docx.
+        source - уже прочитанное содержимое файла (файловый объект), если есть.
+        """
+        try:
+            return '\n'.join(iter_docx_text(source or filepath))
+        except (zipfile.BadZipFile, KeyError, ParseError):
+            if source is not None: source.seek(0)
+            return self._get_text_from_docx_legacy(filepath, source)
+        except Exception as e:
+            print(f"Ошибка при чтении файла {filepath}: {e}"); return None
+
+    def _get_text_from_docx_legacy(self, filepath, source=None):
         try:
-            document = Document(filepath)
+            from docx import Document  # Тяжелый импорт - только если понадобился запасной путь
+            document = Document(source or filepath)
             full_text = []
             for para in document.paragraphs: full_text.append(para.text)
             for table in document.tables:
@@ -15,58 +91,248 @@ class IOCParser:
         except Exception as e:
             print(f"Ошибка при чтении файла {filepath}: {e}"); return None
 
-    def extract_all_iocs(self, filepaths, ioc_config):
+    def _scan_file(self, filepath, scan_plan, stats=None):
         """
-        Главный метод. Принимает СПИСОК путей к файлам и конфигурацию.
+        Извлекает текст одного файла и ищет в нем IOC.
+        Возвращает {тип IOC: множество значений} или None, если текст не получен.
+        stats - необязательный RunStats для замеров по файлу и шаблонам.
         """
-        all_texts = []
-        for path in filepaths:
-            text = self._get_text_from_docx(path)
-            if text:
-                all_texts.append(text)
-        
-        if not all_texts:
-            return {}
+        engine = self._get_engine(scan_plan)
+        record = stats.add_file(filepath) if stats is not None else None
+        if is_text_input(filepath):
+            # Текстовые файлы могут быть гигантскими - читаются фрагментами и без кэша
+            return self._scan_text_file(filepath, engine, stats, record)
+        if self.cache is not None:
+            try:
+                return self._scan_file_cached(filepath, engine, stats, record)
+            except sqlite3.Error as e:
+                print(f"Кэш недоступен, файл {filepath} обрабатывается без него: {e}")
+        text = self._read_text(filepath, None, record)
+        if not text:
+            return None
+        return self._scan_text(engine, text, stats, record, filepath)
 
-        content = '\n\n--- END OF FILE ---\n\n'.join(all_texts)
-        
-        raw_finds = {}
-        final_data = {}
-        all_enabled_types = {name: data for name, data in ioc_config.items() if data.get("enabled")}
+    def _read_text(self, filepath, source=None, record=None):
+        if record is None:
+            return self._get_text_from_docx(filepath, source)
+        started = time.perf_counter()
+        text = self._get_text_from_docx(filepath, source)
+        record["extract_s"] = time.perf_counter() - started
+        return text
 
-        for name, data in all_enabled_types.items():
-            try:
-                regex = data.get("regex", "")
-                if not regex: continue
-                if '(?P<value>' in regex:
-                    found = [match.group('value') for match in re.finditer(regex, content)]
+    def _scan_text(self, engine, text, stats=None, record=None, source=""):
+        if stats is None:
+            return {name: set(found) for name, found in self._run_scan(engine, text, None, source).items()}
+        started = time.perf_counter()
+        finds = {name: set(found) for name, found in self._run_scan(engine, text, stats, source).items()}
+        record.update(scan_s=time.perf_counter() - started, chars=len(text),
+                      indicators=sum(len(found) for found in finds.values()))
+        return finds
+
+    def _run_scan(self, engine, text, stats, source):
+        if self._guard is None:
+            return engine.scan(text, stats)
+        return self._guard.scan(text, stats, Path(source).name if source else "")
+
+    def _scan_text_file(self, filepath, engine, stats=None, record=None):
+        """
+        Ищет IOC в текстовом файле любого размера: файл отображается в память
+        (mmap) и сканируется фрагментами с перекрытием на максимальную длину
+        совпадения, найденное сразу добавляется в множества по типам.
+        Совпадение, заходящее в следующий фрагмент, учитывается в carry: там
+        поиск этого типа продолжается с его конца, как при разборе файла целиком.
+        Память ограничена размером фрагмента и числом уникальных значений.
+        """
+        started = time.perf_counter()
+        finds, chars, carry = {}, 0, {}
+        overlap = engine.max_overlap(self.text_overlap)
+        try:
+            for content, pos, limit in iter_text_chunks(filepath, self.text_chunk_size, overlap, self.text_encoding):
+                if self._guard is None:
+                    chunk_finds = engine.scan_chunk(content, pos, limit, stats, carry)
                 else:
-                    found = re.findall(regex, content)
-                if found: raw_finds[name] = list(set(found))
-            except re.error as e: print(f"Ошибка в регулярном выражении для {name}: {e}")
-        
-        uris = raw_finds.get('URI', [])
-        sha1s = raw_finds.get('SHA1', [])
-        sha256s = raw_finds.get('SHA256', [])
+                    chunk_finds = self._guard.scan(content, stats, Path(filepath).name, pos, limit, carry)
+                for name, found in chunk_finds.items():
+                    finds.setdefault(name, set()).update(found)
+                chars += limit - pos
+        except (OSError, ValueError, LookupError) as e:
+            print(f"Ошибка при чтении файла {filepath}: {e}"); return None
+        if record is not None:
+            record.update(scan_s=time.perf_counter() - started, chars=chars,
+                          indicators=sum(len(found) for found in finds.values()))
+        return finds
+
+    def _scan_file_cached(self, filepath, engine, stats=None, record=None):
+        """
+        То же, что _scan_file, но с кэшем: при совпадении содержимого файла
+        и набора шаблонов результат берется из кэша, при изменении только
+        шаблонов - повторно сканируется сохраненный текст.
+        """
+        try:
+            data = Path(filepath).read_bytes()
+        except OSError as e:
+            print(f"Ошибка при чтении файла {filepath}: {e}"); return None
+        file_hash = content_hash(data)
+
+        finds = self.cache.get_matches(file_hash, self._plan_hash)
+        if finds is not None:
+            if record is not None: record["cached"] = "matches"
+            return finds
+
+        text = self.cache.get_text(file_hash)
+        if text is None:
+            text = self._read_text(filepath, io.BytesIO(data), record)
+            if not text:
+                return None
+            self.cache.put_text(file_hash, text)
+        elif record is not None:
+            record["cached"] = "text"
+
+        finds = self._scan_text(engine, text, stats, record, filepath)
+        # Неполный результат (часть типов пропущена по бюджету) в кэш не попадает
+        if not self.skipped_types:
+            self.cache.put_matches(file_hash, self._plan_hash, finds)
+        return finds
+
+    def _scan_files(self, filepaths, scan_plan, workers, progress=None, cancel_event=None, stats=None):
+        """
+        Сканирует файлы последовательно или в пуле процессов и сразу сводит
+        результаты в {тип IOC: {значение: кортеж файлов, где оно найдено}};
+        находки отдельных файлов не накапливаются, поэтому память определяется
+        самым большим файлом и числом уникальных значений, а не всем пакетом.
+        Файлы в кортежах идут в порядке входного списка независимо от режима.
+        Возвращает сводку или None, если ни из одного файла не получен текст.
+        После каждого файла вызывается progress(готово, всего, путь) и проверяется
+        cancel_event: если он установлен, разбор прерывается с AnalysisCancelled.
+        Статистика процессов пула добавляется в stats по мере получения результатов.
+        """
+        if workers is None or workers <= 0:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(filepaths))
+        if workers > 1:
+            try:
+                pool = ProcessPoolExecutor(max_workers=workers)
+            except Exception as e:
+                print(f"Параллельный разбор недоступен, файлы будут обработаны последовательно: {e}")
+            else:
+                try:
+                    with pool:
+                        results = pool.map(_scan_file_worker, filepaths, repeat(scan_plan),
+                                           repeat(self._worker_options()), repeat(stats is not None))
+                        results = (self._merge_worker_result(stats, result) for result in results)
+                        return self._collect(zip(filepaths, results), len(filepaths), progress, cancel_event, pool)
+                except BrokenProcessPool as e:
+                    print(f"Пул процессов аварийно завершился, файлы будут обработаны последовательно: {e}")
+        results = ((path, self._scan_file(path, scan_plan, stats)) for path in filepaths)
+        return self._collect(results, len(filepaths), progress, cancel_event)
+
+    def _worker_options(self):
+        """
+        Параметры для создания такого же парсера в процессе пула.
+        """
+        return {"cache": self.cache, "pattern_budget": self.pattern_budget, "text_chunk_size": self.text_chunk_size,
+                "text_overlap": self.text_overlap, "text_encoding": self.text_encoding}
+
+    def _merge_worker_result(self, stats, result):
+        finds, worker_stats, skipped = result
+        if worker_stats is not None: stats.merge(worker_stats)
+        for name, message in skipped.items(): self.skipped_types.setdefault(name, message)
+        return finds
+
+    @staticmethod
+    def _collect(results, total, progress, cancel_event, pool=None):
+        merged, scanned = {}, False
+        for done, (path, finds) in enumerate(results, 1):
+            if finds is not None:
+                scanned = True
+                for name, found in finds.items():
+                    type_sources = merged.setdefault(name, {})
+                    for value in found: type_sources[value] = type_sources.get(value, ()) + (path,)
+            if progress is not None: progress(done, total, path)
+            if cancel_event is not None and cancel_event.is_set() and done < total:
+                if pool is not None: pool.shutdown(wait=False, cancel_futures=True)
+                raise AnalysisCancelled()
+        return merged if scanned else None
+
+    def extract_all_iocs(self, filepaths, scan_plan, workers=1, progress=None, cancel_event=None, stats=None, raw=False):
+        """
+        Главный метод. Принимает СПИСОК путей к файлам и план сканирования
+        (ScanPlan от ConfigManager; словарь типов IOC тоже допускается).
+        workers - число процессов для разбора файлов (1 - без пула, 0 или None - по числу ядер).
+        progress и cancel_event - см. _scan_files.
+        stats - необязательный RunStats: время по файлам, шаблонам и этапам разбора.
+        raw - вернуть объединенные находки без очистки в виде {тип IOC: {значение:
+        кортеж файлов}}, например чтобы накапливать их между прогонами и очищать
+        вместе с прежними (см. clean_finds).
+        Без raw возвращает {тип IOC: IOCColumn} с нормализованными значениями
+        и файлами, в которых найдено каждое значение.
+        """
+        scan_plan = ScanPlan.ensure(scan_plan)
+        filepaths = list(filepaths)
+        self.skipped_types.clear()
+        if stats is None:
+            sources = self._scan_files(filepaths, scan_plan, workers, progress, cancel_event)
+        else:
+            with stats.stage("scan_files") as record:
+                sources = self._scan_files(filepaths, scan_plan, workers, progress, cancel_event, stats)
+                record["items"] = len(filepaths)
+        for message in self.skipped_types.values(): print(message)
+        if not sources:
+            return {}
+        if raw:
+            return sources
+        merged = {name: sorted(type_sources, key=str) for name, type_sources in sources.items()}
+
+        if stats is None:
+            return self.clean_finds(merged, sources)
+        with stats.stage("merge_cleanup") as record:
+            final_data = self.clean_finds(merged, sources)
+            record["items"] = sum(len(found) for found in final_data.values())
+        return final_data
+
+    @staticmethod
+    def clean_finds(raw_finds, sources=None):
+        """
+        Превращает {тип IOC: отсортированный список} в {тип IOC: IOCColumn}
+        и убирает ложные срабатывания: домены из URI и числовые "домены",
+        а также MD5, которые являются частью найденных SHA1/SHA256.
+        sources - {тип IOC: {значение: кортеж файлов}} (см. _scan_files).
+        """
+        sources = sources or {}
+        columns = {name: IOCColumn.from_sources(name, found, sources.get(name, {})) for name, found in raw_finds.items()}
         
-        if 'DNS' in raw_finds:
-            uri_domains = {urlparse(uri.replace('[.]', '.')).netloc for uri in uris}
-            potential_dns = raw_finds['DNS']
+        if 'DNS' in columns:
+            uri_domains = {urlparse(uri).netloc for uri in columns['URI'].normalized} if 'URI' in columns else set()
+            dns = columns.pop('DNS')
             clean_dns = [
-                item for item in potential_dns 
-                if item.replace('[.]', '.') not in uri_domains 
-                and not all(part.isdigit() for part in item.replace('[.]', '.').split('.'))
+                i for i, item in enumerate(dns.normalized)
+                if item not in uri_domains
+                and not all(part.isdigit() for part in item.split('.'))
             ]
-            if clean_dns: final_data['DNS'] = clean_dns
+            if clean_dns: columns['DNS'] = dns.select(clean_dns)
         
-        if 'MD5' in raw_finds:
-            sha_set = set(sha1s) | set(sha256s)
-            potential_md5 = raw_finds['MD5']
-            clean_md5 = [h for h in potential_md5 if not any(h in s for s in sha_set)]
-            if clean_md5: final_data['MD5'] = clean_md5
-
-        for name, found_items in raw_finds.items():
-            if name not in ['DNS', 'MD5']:
-                final_data[name] = found_items
-                
-        return final_data
\ No newline at end of file
+        if 'MD5' in columns:
+            sha_index = ContainmentIndex(raw_finds.get('SHA1', []) + raw_finds.get('SHA256', []))
+            md5 = columns.pop('MD5')
+            clean_md5 = [i for i, h in enumerate(md5.raw) if not sha_index.contains(h)]
+            if clean_md5: columns['MD5'] = md5.select(clean_md5)
+
+        # Порядок типов - как во входном словаре
+        return {name: columns[name] for name in raw_finds if name in columns}
+
+
+# Парсер, используемый внутри процессов пула (по одному на процесс,
+# чтобы скомпилированные шаблоны переиспользовались между файлами)
+_worker_parser = None
+
+def _scan_file_worker(filepath, scan_plan, options, with_stats=False):
+    """
+    Возвращает (результат _scan_file, статистика файла в виде словаря или None,
+    пропущенные по бюджету типы IOC).
+    """
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = IOCParser(**options)
+    stats = RunStats() if with_stats else None
+    finds = _worker_parser._scan_file(filepath, scan_plan, stats)
+    return finds, stats.to_dict() if stats is not None else None, dict(_worker_parser.skipped_types)
@@ -0,0 +1,142 @@
+import re
+
+# Тексты встроенных шаблонов (как в конфиге по умолчанию), которые заменяются токенизатором
+HEX_SHAPES = {
+    r"\b[a-fA-F0-9]{32}\b": 32,  # MD5
+    r"\b[a-fA-F0-9]{40}\b": 40,  # SHA1
+    r"\b[a-fA-F0-9]{64}\b": 64,  # SHA256
+}
+IPV4_SHAPE = r"\b(?:\d{1,3}(?:\[\.\]|\.)){3}\d{1,3}\b"
+
+# Шестнадцатеричные последовательности не короче самого короткого хеша
+_HEX_RUN = re.compile(r"[0-9A-Fa-f]{%d,}" % min(HEX_SHAPES.values()))
+# Цепочки чисел через "." или "[.]" от границы слова; адреса выбираются из них в _dotted_quads
+_DOTTED_RUN = re.compile(r"\b\d+(?:(?:\[\.\]|\.)\d+)+")
+_SEPARATOR = re.compile(r"\[\.\]|\.")
+
+
+def _is_word(char):
+    # То же определение "символа слова", что у \b и \w в re для str
+    return char.isalnum() or char == '_'
+
+
+def _valid_octet(digits):
+    # Октет 0-255 из 1-3 цифр: трехзначный начинается с 0/1, 20-24 или 25[0-5]
+    if len(digits) < 3: return True
+    if len(digits) > 3: return False
+    first, second = digits[0], digits[1]
+    return first in '01' or (first == '2' and (second in '01234' or (second == '5' and digits[2] in '012345')))
+
+
+def _dotted_quads(content, run_start, run_end, end):
+    """
+    Выбирает из цепочки чисел content[run_start:run_end] адреса из четырех допустимых
+    октетов слева направо без перекрытий, как re.finditer со строгим шаблоном октета:
+    после неудачи кандидат сдвигается на следующий октет, поэтому в 300.1.2.3.4
+    находится 1.2.3.4. Выдает (позиция, конец, значение).
+    """
+    run = content[run_start:run_end]
+    octets = run.split('.') if '[' not in run else _SEPARATOR.split(run)
+    if len(octets) < 4: return
+    # Граница слова справа, как у \b в шаблоне; слева ее дает _DOTTED_RUN, внутри - разделители
+    right_ok = not (run_end < end and _is_word(content[run_end]))
+    last = len(octets) - 1
+    if last == 3 and right_ok and all(map(_valid_octet, octets)):
+        # Обычный случай: цепочка целиком и есть адрес
+        yield run_start, run_end, run
+        return
+    offsets, position = [], 0
+    for separator in _SEPARATOR.finditer(run):
+        offsets.append(position)
+        position = separator.end()
+    offsets.append(position)
+    i = 0
+    while i + 3 <= last:
+        if (i + 3 < last or right_ok) and all(map(_valid_octet, octets[i:i + 4])):
+            start, stop = offsets[i], offsets[i + 3] + len(octets[i + 3])
+            yield run_start + start, run_start + stop, run[start:stop]
+            i += 4
+        else:
+            i += 1
+
+
+class IOCTokenizer:
+    """
+    Быстрый разбор встроенных типов IOC фиксированной формы:
+    - MD5/SHA1/SHA256 - один проход находит все максимальные hex-последовательности,
+      ограниченные границами слова, и раскладывает их по длине; результат прохода
+      общий для всех трех типов, вместо трех полных проходов регулярными выражениями;
+    - IPv4 (в том числе с [.]) - из цепочек чисел через точки выбираются четверки
+      допустимых октетов (не больше 255), поэтому 999.1.1.1 в отчеты не попадает,
+      а в 300.1.2.3.4 находится 1.2.3.4.
+    Кандидаты (hex-последовательности и цепочки чисел) ищутся одним скомпилированным
+    шаблоном: посимвольный цикл на Python медленнее движка re.
+    Токенизатор подставляется только вместо шаблонов, текст которых совпадает
+    со встроенным (см. for_regex); измененные и пользовательские шаблоны ищутся как есть.
+    Для хешей результат совпадает с re.findall встроенного шаблона, для IPv4 - с re.findall
+    шаблона, в котором каждый октет ограничен значениями 0-255.
+    """
+    def __init__(self):
+        self._key = None   # (текст, начало, конец) последнего прохода по hex
+        self._runs = None  # {длина: [(позиция, значение), ...]}
+
+    def for_regex(self, regex):
+        """
+        Возвращает функцию (текст, начало, конец, limit=None) -> список значений
+        для встроенного шаблона или None, если шаблон нужно искать регулярным выражением.
+        limit - брать только совпадения, начинающиеся до этой позиции; тогда функция
+        возвращает (список значений, конец последнего из них или начало окна).
+        """
+        if regex in HEX_SHAPES:
+            length = HEX_SHAPES[regex]
+            def hex_values(content, start, end, limit=None):
+                runs = self.hex_tokens(content, start, end).get(length, ())
+                if limit is None:
+                    return [value for position, value in runs]
+                values = [(position, value) for position, value in runs if position < limit]
+                return [value for position, value in values], values[-1][0] + length if values else start
+            return hex_values
+        if regex == IPV4_SHAPE:
+            return self.ipv4_values
+        return None
+
+    def hex_tokens(self, content, start, end):
+        """
+        {длина: [(позиция, значение), ...]} для hex-последовательностей в окне [start, end),
+        перед и после которых нет символов слова. Повторный вызов для того же окна
+        того же текста (следующий тип хеша) берет готовый результат.
+        """
+        key = self._key
+        if key is None or key[0] is not content or key[1] != start or key[2] != end:
+            runs = {}
+            for match in _HEX_RUN.finditer(content, start, end):
+                run_start, run_end = match.span()
+                # Граница слова, как у \b: слева смотрим и за начало окна, справа конец окна - конец текста
+                if run_start and _is_word(content[run_start - 1]): continue
+                if run_end < end and _is_word(content[run_end]): continue
+                runs.setdefault(run_end - run_start, []).append((run_start, match.group()))
+            self._key, self._runs = (content, start, end), runs
+        return self._runs
+
+    @staticmethod
+    def ipv4_values(content, start, end, limit=None):
+        values, last_end, seen = set(), start, set()
+        for match in _DOTTED_RUN.finditer(content, start, end):
+            run_start, run_end = match.span()
+            if limit is None:
+                # Повторы цепочки (с символом после нее, от которого зависит граница) разбираем один раз
+                key = content[run_start:min(run_end + 1, end)]
+                if key in seen: continue
+                seen.add(key)
+            elif run_start >= limit: break
+            for position, quad_end, value in _dotted_quads(content, run_start, run_end, end):
+                if limit is not None and position >= limit: break
+                values.add(value)
+                last_end = quad_end
+        return list(values) if limit is None else (list(values), last_end)
+
+    def clear(self):
+        """
+        Отпускает текст последнего прохода.
+        """
+        self._key = self._runs = None
@@ -0,0 +1,219 @@
+import multiprocessing
+import re
+import time
+
+from src.model.scan_engine import ScanEngine
+
+# Сколько ждать запуска дочернего процесса, с
+STARTUP_TIMEOUT = 60
+
+
+def sample_corpus(size=5000):
+    """
+    Образцы текста для оценки стоимости шаблонов: типичный фрагмент бюллетеня
+    и строки, на которых чаще всего "взрывается" возврат (backtracking):
+    длинные повторы без завершающего символа, которого ждет шаблон.
+    Возвращает список пар (название, текст).
+    """
+    bulletin = "\n".join([
+        "Вредоносный домен evil-update[.]com использовался как сервер управления, адрес 185[.]22[.]13[.]7.",
+        "Загрузчик обращался к hxxps[:]//cdn-files[.]ru/gate.php?id=42 и hxxp[:]//10[.]0[.]0[.]1/a/b.exe.",
+        "Письма отправлялись с адреса invoice@mail-service[.]net, вложение \"Счет_на_оплату.doc.js\".",
+        "MD5 0123456789abcdef0123456789abcdef, SHA1 0123456789abcdef0123456789abcdef01234567,",
+        "SHA256 0123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef.",
+        "Автозапуск: HKLM\\Software\\Microsoft\\Windows\\CurrentVersion\\Run\\Updater, HKCU\\Software\\Classes\\x.",
+    ])
+    samples = [("бюллетень", (bulletin + "\n") * max(1, size // len(bulletin)))]
+    for label, unit, tail in (
+        ("буквы", "a", "!"), ("цифры", "1", "!"), ("точки", ".", "!"), ("[.]", "a[.]", "!"),
+        ("hex", "f", "g"), ("пробелы", " ", "!"), ("слова", "ab ", "!"), ("дефисы", "a-", "!"),
+        ("@", "a@", "!"), ("кавычка", "\"a", ""), ("обратный слеш", "\\", "!"), ("реестр", "HKLM\\a", ""),
+        ("URI", "a[:]//a", "!"), ("строки", "a\n", "!"),
+    ):
+        samples.append((label, unit * (size // len(unit)) + tail))
+    return samples
+
+
+def _start_process(target, *args):
+    """
+    Запускает target(*args, conn) в дочернем процессе и ждет от него сообщения о готовности.
+    Возвращает (процесс, соединение с ним).
+    """
+    conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=target, args=args + (child_conn,), daemon=True)
+    process.start()
+    child_conn.close()
+    try:
+        if not conn.poll(STARTUP_TIMEOUT):
+            raise RuntimeError("дочерний процесс не запустился")
+        conn.recv()
+    except (EOFError, RuntimeError):
+        conn.close(); _stop_process(process)
+        raise
+    return process, conn
+
+
+def _stop_process(process):
+    if process.is_alive():
+        process.kill()
+    process.join()
+
+
+def _profile_worker(items, size, conn):
+    samples = sample_corpus(size)
+    conn.send(("ready",))
+    for name, regex in items:
+        try:
+            pattern = re.compile(regex)
+        except re.error as e:
+            conn.send((name, None, f"ошибка компиляции: {e}")); continue
+        worst, worst_label = 0.0, ""
+        for label, text in samples:
+            started = time.perf_counter()
+            for _ in pattern.finditer(text): pass
+            elapsed = time.perf_counter() - started
+            if elapsed > worst: worst, worst_label = elapsed, label
+        conn.send((name, worst, worst_label))
+
+
+def profile_patterns(patterns, limit, size=5000):
+    """
+    Замеряет худшее время каждого шаблона на образцах sample_corpus.
+    patterns - {имя: регулярное выражение}. Шаблоны проверяются в отдельном
+    процессе; если шаблон не уложился в limit секунд, процесс убивается,
+    а проверка остальных продолжается в новом.
+    Возвращает {имя: (секунды или None, если шаблон прерван, образец или ошибка)}.
+    """
+    pending, results = list(patterns.items()), {}
+    while pending:
+        process, conn = _start_process(_profile_worker, pending, size)
+        try:
+            for name, _ in pending:
+                if not conn.poll(limit):
+                    results[name] = (None, f"дольше {limit:g} с")
+                    break
+                received, seconds, detail = conn.recv()
+                results[received] = (seconds, detail)
+        except EOFError:
+            # Процесс аварийно завершился на текущем шаблоне
+            name = next(name for name, _ in pending if name not in results)
+            results[name] = (None, "процесс проверки аварийно завершился")
+        finally:
+            conn.close()
+            _stop_process(process)
+        pending = [(name, regex) for name, regex in pending if name not in results]
+    return results
+
+
+def check_ioc_types(ioc_types, warn, limit, previous=None):
+    """
+    Проверяет стоимость регулярных выражений включенных типов IOC.
+    previous - прежний словарь типов: шаблоны, которые в нем не менялись, не проверяются.
+    Возвращает (blocked, slow) - словари {имя: описание}: blocked - шаблоны,
+    прерванные по limit секунд или не скомпилированные, slow - медленнее warn секунд.
+    """
+    previous = previous or {}
+    changed = {
+        name: data.get("regex") for name, data in ioc_types.items()
+        if data.get("enabled", True) and data.get("regex") and previous.get(name, {}).get("regex") != data.get("regex")
+    }
+    blocked, slow = {}, {}
+    for name, (seconds, detail) in profile_patterns(changed, limit).items():
+        if seconds is None:
+            blocked[name] = detail
+        elif seconds > warn:
+            slow[name] = f"{seconds:.2f} с на образце \"{detail}\""
+    return blocked, slow
+
+
+def _guard_worker(scan_plan, conn):
+    engine = ScanEngine(scan_plan)
+    conn.send(("ready",))
+    while True:
+        message = conn.recv()
+        if message is None: return
+        text, names, pos, limit, carry = message
+        for entry in engine.entries:
+            if entry.name not in names: continue
+            conn.send(("start", entry.name))
+            resume = pos + carry.get(entry.name, 0) if carry is not None else None
+            found, scanned, last_end = entry.find(text, pos, limit, resume)
+            conn.send(("found", entry.name, list(found), scanned, max(last_end - limit, 0) if limit is not None else 0))
+        engine.tokenizer.clear()
+        conn.send(("end",))
+
+
+class GuardedScanner:
+    """
+    Поиск по плану сканирования в отдельном процессе с бюджетом времени
+    на каждый шаблон. Если шаблон не укладывается в budget секунд (например,
+    из-за катастрофического возврата), процесс убивается, тип IOC попадает
+    в skipped и до конца работы сканера больше не запускается, а поиск
+    остальных типов продолжается в новом процессе.
+    """
+    def __init__(self, scan_plan, budget, skipped=None):
+        self.scan_plan = scan_plan
+        self.budget = budget
+        self.skipped = skipped if skipped is not None else {}  # {тип IOC: сообщение}
+        self._names = [entry.name for entry in scan_plan.enabled() if entry.pattern is not None]
+        self._process = self._conn = None
+
+    def close(self):
+        if self._process is None: return
+        try:
+            self._conn.send(None)
+            self._process.join(1)
+        except OSError:
+            pass
+        self._conn.close()
+        _stop_process(self._process)
+        self._process = self._conn = None
+
+    def scan(self, content, stats=None, source="", pos=0, limit=None, carry=None):
+        """
+        Возвращает {тип IOC: список уникальных значений}, как ScanEngine.scan,
+        без типов, пропущенных из-за превышения бюджета. При заданном limit
+        ищутся только совпадения, начинающиеся в [pos, limit); carry - как
+        в ScanEngine.scan_chunk.
+        """
+        raw_finds, done = {}, set()
+        while True:
+            names = [name for name in self._names if name not in done and name not in self.skipped]
+            if not names: return raw_finds
+            if self._process is None:
+                self._process, self._conn = _start_process(_guard_worker, self.scan_plan)
+            self._conn.send((content, names, pos, limit, carry))
+            current = self._collect(raw_finds, done, stats, carry)
+            if current is None: return raw_finds
+            self.skipped[current] = (f"Тип {current} пропущен: поиск по шаблону занял больше {self.budget:g} с"
+                                     f"{f' (файл {source})' if source else ''}. Проверьте регулярное выражение.")
+            self.close()
+
+    def _collect(self, raw_finds, done, stats, carry=None):
+        """
+        Принимает результаты одного прохода. Возвращает имя шаблона,
+        превысившего бюджет, или None, если проход завершился.
+        """
+        current, started = None, None
+        while True:
+            try:
+                ready = self._conn.poll(self.budget if current is not None else STARTUP_TIMEOUT)
+                message = self._conn.recv() if ready else None
+            except EOFError:
+                # Процесс упал (например, не хватило памяти) - виноват текущий шаблон
+                if current is None: raise RuntimeError("процесс поиска аварийно завершился")
+                return current
+            if message is None:
+                if current is None: raise RuntimeError("процесс поиска не отвечает")
+                return current
+            if message[0] == "end":
+                return None
+            if message[0] == "start":
+                current, started = message[1], time.perf_counter()
+                continue
+            _, name, found, scanned, consumed = message
+            if carry is not None: carry[name] = consumed
+            if stats is not None: stats.add_pattern(name, time.perf_counter() - started, len(found), scanned)
+            if found: raw_finds[name] = found
+            done.add(name)
+            current = None
@@ -1,81 +1,410 @@
+import json
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Border, Side, Font, Alignment
+from itertools import chain
+from json.encoder import encode_basestring
+from math import ceil
+from pathlib import Path
+from string import Formatter
+
+from src.model.ioc_column import IOCColumn
+from src.model.scan_plan import ScanPlan
+
+REPORT_HEADERS = ["№", "Дата\nОтчёта", "Статус\nАктивности\nNTA", "Статус\nАктивности\nSIEM (Tools)", "Статус\nАктивности\nSIEM (MP)", "Тип\nИндикатора", "Индикатор", "IOC", "Бюллетень", "Тип события"]
+REPORT_EVENT_TYPE = "Фишинговая рассылка электронной почты. Вредоносные вложения"
+# Столбцы машиночитаемой выгрузки (CSV) до столбцов запросов по системам
+EXPORT_FIELDS = ["type", "type_label", "raw", "ioc", "nta", "siem_mp", "sources"]
+# Уровень сжатия .gz-выгрузок: минимальный почти вдвое быстрее уровня 6 при размере больше на ~15%
+EXPORT_GZIP_LEVEL = 1
+# Сколько строк выгрузки копится перед записью в файл
+EXPORT_BATCH = 1000
+
+def balanced_bounds(lengths, joiner_length, max_terms=0, max_chars=0):
+    """
+    Делит условия с длинами lengths на наименьшее число соседних частей примерно
+    одинакового размера так, чтобы в каждой было не больше max_terms условий
+    и не больше max_chars символов после объединения разделителем длины joiner_length.
+    Нулевой лимит означает "без ограничения". Условие длиннее max_chars
+    попадает в отдельную часть целиком.
+    Возвращает границы частей [0, ..., n] (пустой список, если условий нет).
+    """
+    n = len(lengths)
+    if not n: return []
+    prefix = [0]
+    for length in lengths: prefix.append(prefix[-1] + length)
+
+    def chunk_length(start, end):
+        return prefix[end] - prefix[start] + joiner_length * (end - start - 1)
+
+    chunks = 1
+    if max_terms: chunks = max(chunks, ceil(n / max_terms))
+    if max_chars: chunks = max(chunks, ceil(chunk_length(0, n) / max_chars))
+    chunks = min(chunks, n)
+    while True:
+        bounds = [i * n // chunks for i in range(chunks + 1)]
+        longest = max(chunk_length(bounds[i], bounds[i + 1]) for i in range(chunks))
+        if not max_chars or longest <= max_chars or chunks >= n: return bounds
+        # Части получились неравными по длине - увеличиваем их число пропорционально перебору
+        chunks = min(n, max(chunks + 1, ceil(chunks * longest / max_chars)))
+
+
+def split_balanced(parts, joiner, max_terms=0, max_chars=0):
+    """
+    Лениво делит список условий на части по balanced_bounds и выдает
+    каждую часть, объединенную через joiner.
+    """
+    bounds = balanced_bounds([len(part) for part in parts], len(joiner), max_terms, max_chars)
+    for start, end in zip(bounds, bounds[1:]):
+        yield joiner.join(parts[start:end])
+
+
+def _term_length(template):
+    """
+    Функция ioc -> длина template.format(ioc=ioc). Для обычных шаблонов с полями {ioc}
+    длина считается без построения строки.
+    """
+    fields = [(name, spec, conversion) for _, name, spec, conversion in Formatter().parse(template) if name is not None]
+    if any(field != ("ioc", "", None) for field in fields):
+        return lambda ioc: len(template.format(ioc=ioc))
+    base, count = len(template.format(ioc="")), len(fields)
+    return lambda ioc: base + count * len(ioc)
+
 
 class ReportGenerator:
-    def generate_query_data(self, found_iocs, ioc_config):
-        query_groups = {}
-        ordered_ioc_names = ioc_config.keys()
+    def __init__(self, query_limits=None):
+        """
+        query_limits - {система: {"max_terms": N, "max_chars": M}}; запросы длиннее
+        лимитов делятся на несколько частей (см. split_balanced).
+        """
+        self.query_limits = query_limits or {}
 
-        for ioc_type in ordered_ioc_names:
-            indicators = found_iocs.get(ioc_type, [])
-            if not indicators: continue
-            
-            query_groups[ioc_type] = []
-            templates = ioc_config.get(ioc_type, {}).get("query_templates", {})
-            if not templates: continue
-                
-            cleaned_list = sorted([ind.replace('[.]', '.') for ind in indicators])
-            for system, query_list in templates.items():
+    def iter_query_data(self, found_iocs, scan_plan):
+        """
+        Лениво выдает пары (тип IOC, запрос) в порядке плана, систем и шаблонов.
+        found_iocs - {тип IOC: IOCColumn или список значений}.
+        Запрос - словарь {"system", "query", "part", "parts"}, где part/parts -
+        номер части и число частей, если запрос пришлось разбить по лимитам системы.
+        """
+        for entry in ScanPlan.ensure(scan_plan):
+            indicators = found_iocs.get(entry.name, [])
+            if not indicators or not entry.query_templates: continue
+
+            cleaned_list = IOCColumn.ensure(entry.name, indicators).query_values()
+            for system, query_list in entry.query_templates.items():
                 if not query_list: continue
                 joiner = " OR " if system == "MP10" else " || "
+                limits = self.query_limits.get(system, {})
                 for template in query_list:
-                    parts = [template.format(ioc=ioc) for ioc in cleaned_list]
-                    query_groups[ioc_type].append({"system": system, "query": joiner.join(parts)})
+                    # Число частей нужно заранее ("k из n"): считаем его по длинам условий,
+                    # а сами части собираем по одной при выдаче
+                    term_length = _term_length(template)
+                    bounds = balanced_bounds([term_length(ioc) for ioc in cleaned_list], len(joiner), limits.get("max_terms", 0), limits.get("max_chars", 0))
+                    for number, (start, end) in enumerate(zip(bounds, bounds[1:]), 1):
+                        query = joiner.join(template.format(ioc=ioc) for ioc in cleaned_list[start:end])
+                        yield entry.name, {"system": system, "query": query, "part": number, "parts": len(bounds) - 1}
+
+    def generate_query_data(self, found_iocs, scan_plan, stats=None):
+        if stats is not None:
+            with stats.stage("queries") as record:
+                query_groups = self.generate_query_data(found_iocs, scan_plan)
+                record["items"] = sum(len(items) for items in query_groups.values())
+            return query_groups
+        query_groups = {name: [] for name in ScanPlan.ensure(scan_plan).names() if found_iocs.get(name)}
+        for ioc_type, item in self.iter_query_data(found_iocs, scan_plan):
+            query_groups[ioc_type].append(item)
         return query_groups
 
-    def create_query_file(self, filepath, query_data, ioc_config):
+    def create_query_file(self, filepath, query_data, scan_plan, stats=None, append=False):
+        """
+        Пишет файл запросов. query_data - словарь из generate_query_data или
+        поток пар из iter_query_data (тогда файл пишется без накопления запросов).
+        stats - необязательный RunStats для замера этапа "txt".
+        append - дописать запросы в конец существующего файла.
+        """
+        if isinstance(query_data, dict):
+            groups, names = query_data, ScanPlan.ensure(scan_plan).names()
+            query_data = ((name, item) for name in names for item in groups.get(name, []))
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                for name in ioc_config.keys():
-                    items = query_data.get(name, [])
-                    if not items: continue
-                    f.write(f"--- {{{name}}} ---\n\n")
-                    system_groups = {}
-                    for item in items:
-                        if item['system'] not in system_groups: system_groups[item['system']] = []
-                        system_groups[item['system']].append(item['query'])
-                    for system, queries in system_groups.items():
-                        f.write(f"Для {system}\n")
-                        for query in queries: f.write(f"{query}\n")
-                        f.write("\n")
+            mode = 'a' if append else 'w'
+            if stats is None:
+                self._write_query_file(filepath, query_data, mode)
+            else:
+                with stats.stage("txt") as record:
+                    record["items"] = self._write_query_file(filepath, query_data, mode)
             return True, f"Файл с запросами успешно сохранен: {filepath}"
         except Exception as e:
             return False, f"Ошибка при сохранении файла с запросами: {e}"
 
-    def create_xlsx_report(self, filepath, found_iocs, ioc_config):
+    @staticmethod
+    def _write_query_file(filepath, query_data, mode='w'):
+        """
+        Пишет пары (тип IOC, запрос) в файл; возвращает число записанных запросов.
+        """
+        written = 0
+        with open(filepath, mode, encoding='utf-8') as f:
+            current_name = current_system = None
+            for name, item in query_data:
+                if name != current_name:
+                    if current_name is not None: f.write("\n")
+                    f.write(f"--- {{{name}}} ---\n\n")
+                    current_name, current_system = name, None
+                if item['system'] != current_system:
+                    if current_system is not None: f.write("\n")
+                    f.write(f"Для {item['system']}\n")
+                    current_system = item['system']
+                f.write(f"{item['query']}\n")
+                written += 1
+            if current_name is not None: f.write("\n")
+        return written
+
+    def _iter_report_rows(self, found_iocs, scan_plan, start=1):
+        """
+        Лениво выдает строки данных отчета (без заголовка) в порядке плана.
+        start - номер первой строки в столбце "№".
+        В столбце "Бюллетень" - имена файлов, в которых найден индикатор.
+        """
+        names = {}
+        def bulletins(sources):
+            for path in sources:
+                if path not in names: names[path] = Path(path).name
+            return ", ".join([names[path] for path in sources])
+
+        row_counter = start
+        for entry in scan_plan:
+            ioc_type = entry.name
+            indicators = found_iocs.get(ioc_type, [])
+            if not indicators: continue
+            template = entry.report_template
+            nta, siem_mp = template.get("Статус Активности NTA", ""), template.get("Статус Активности SIEM (MP)", "")
+            type_label = template.get("Тип Индикатора", ioc_type)
+            column = IOCColumn.ensure(ioc_type, indicators)
+            for indicator, ioc, sources in zip(column.raw, column.normalized, column.sources):
+                yield [row_counter, "", nta, "---------------", siem_mp, type_label, indicator, ioc, bulletins(sources), REPORT_EVENT_TYPE]
+                row_counter += 1
+
+    @staticmethod
+    def _column_widths(rows):
+        """
+        Ширина столбцов как у Excel-автоподбора: самая длинная строка значения + 5.
+        """
+        widths = [0] * len(REPORT_HEADERS)
+        for row in rows:
+            for i, value in enumerate(row):
+                if not value: continue
+                text = str(value)
+                length = max(len(line) for line in text.split('\n')) if '\n' in text else len(text)
+                if length > widths[i]: widths[i] = length
+        return [width + 5 for width in widths]
+
+    @staticmethod
+    def _register_report_styles(wb):
+        """
+        Общие именованные стили отчета: создаются один раз на книгу,
+        ячейки ссылаются на них по имени.
+        """
+        from openpyxl.styles import NamedStyle, PatternFill, Border, Side, Font, Alignment
+        grey_fill=PatternFill(start_color="D3D3D3",end_color="D3D3D3",fill_type="solid"); bold_font=Font(bold=True)
+        thin_border_side=Side(border_style="thin",color="000000"); thin_border=Border(left=thin_border_side,right=thin_border_side,top=thin_border_side,bottom=thin_border_side)
+        wb.add_named_style(NamedStyle(name="ioc_header", fill=grey_fill, font=bold_font, border=thin_border, alignment=Alignment(wrap_text=True, vertical='center', horizontal='center')))
+        wb.add_named_style(NamedStyle(name="ioc_number", fill=grey_fill, font=bold_font, border=thin_border, alignment=Alignment(horizontal='center', vertical='center')))
+        wb.add_named_style(NamedStyle(name="ioc_cell", font=Font(name="Calibri", size=11), border=thin_border))
+
+    def create_xlsx_report(self, filepath, found_iocs, scan_plan, stats=None):
+        """
+        Пишет отчет Excel потоково (режим write_only): строки формируются
+        генератором и сразу уходят в файл, поэтому память не растет с числом строк.
+        Ширины столбцов считаются отдельным проходом по тем же значениям,
+        так как в потоковом режиме их нужно задать до первой строки.
+        stats - необязательный RunStats для замера этапа "xlsx".
+        """
         try:
-            wb = Workbook(); ws = wb.active; ws.title = "Индикаторы компрометации"
-            grey_fill=PatternFill(start_color="D3D3D3",end_color="D3D3D3",fill_type="solid"); bold_font=Font(bold=True)
-            thin_border_side=Side(border_style="thin",color="000000"); thin_border=Border(left=thin_border_side,right=thin_border_side,top=thin_border_side,bottom=thin_border_side)
-            wrap_alignment = Alignment(wrap_text=True, vertical='center', horizontal='center')
-            headers = ["№", "Дата\nОтчёта", "Статус\nАктивности\nNTA", "Статус\nАктивности\nSIEM (Tools)", "Статус\nАктивности\nSIEM (MP)", "Тип\nИндикатора", "Индикатор", "IOC", "Бюллетень", "Тип события"]
-            ws.append(headers); ws.row_dimensions[1].height = 60
-            
-            row_counter = 1
-            for ioc_type in ioc_config.keys():
-                indicators = found_iocs.get(ioc_type, [])
-                if not indicators: continue
-                template = ioc_config.get(ioc_type, {}).get("report_template", {})
-                for indicator in sorted(indicators):
-                    ws.append([row_counter, "", template.get("Статус Активности NTA", ""), "---------------", template.get("Статус Активности SIEM (MP)", ""), template.get("Тип Индикатора", ioc_type), indicator, indicator.replace('[.]', '.'), "", "Фишинговая рассылка электронной почты. Вредоносные вложения"])
-                    row_counter += 1
-            
-            for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=len(headers)):
-                for cell in row: cell.border = thin_border
-            for cell in ws[1]: cell.fill = grey_fill; cell.font = bold_font; cell.alignment = wrap_alignment
-            for row_idx in range(2, ws.max_row + 1):
-                cell = ws.cell(row=row_idx, column=1); cell.fill = grey_fill; cell.font = bold_font; cell.alignment = Alignment(horizontal='center', vertical='center')
-            for col in ws.columns:
-                max_length = 0
-                for cell in col:
-                    if cell.value:
-                        lines = str(cell.value).split('\n')
-                        cell_max_len = max(len(line) for line in lines)
-                        if cell_max_len > max_length: max_length = cell_max_len
-                ws.column_dimensions[col[0].column_letter].width = max_length + 5
-            
-            wb.save(filepath)
+            if stats is None:
+                self._write_xlsx_report(filepath, found_iocs, scan_plan)
+            else:
+                with stats.stage("xlsx") as record:
+                    record["items"] = self._write_xlsx_report(filepath, found_iocs, scan_plan)
             return True, f"Отчет Excel успешно сохранен: {filepath}"
         except Exception as e:
-            return False, f"Ошибка при сохранении отчета Excel: {e}"
\ No newline at end of file
+            return False, f"Ошибка при сохранении отчета Excel: {e}"
+
+    def _write_xlsx_report(self, filepath, found_iocs, scan_plan):
+        """
+        Возвращает число записанных строк данных.
+        """
+        # openpyxl импортируется только когда действительно нужен отчет
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
+        scan_plan = ScanPlan.ensure(scan_plan)
+        wb = Workbook(write_only=True); ws = wb.create_sheet("Индикаторы компрометации")
+        self._register_report_styles(wb)
+
+        widths = self._column_widths(chain([REPORT_HEADERS], self._iter_report_rows(found_iocs, scan_plan)))
+        for col_idx, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+        ws.row_dimensions[1].height = 60
+
+        def styled_cells(first_style, other_style):
+            cells = [WriteOnlyCell(ws) for _ in REPORT_HEADERS]
+            for i, cell in enumerate(cells): cell.style = first_style if i == 0 else other_style
+            return cells
+
+        # Строка пишется в файл сразу при append, поэтому один набор
+        # стилизованных ячеек переиспользуется для всех строк данных
+        header_cells, row_cells = styled_cells("ioc_header", "ioc_header"), styled_cells("ioc_number", "ioc_cell")
+        for cell, value in zip(header_cells, REPORT_HEADERS): cell.value = value
+        ws.append(header_cells)
+        written = 0
+        for row in self._iter_report_rows(found_iocs, scan_plan):
+            for cell, value in zip(row_cells, row): cell.value = value
+            ws.append(row_cells)
+            written += 1
+
+        wb.save(filepath)
+        return written
+
+    def append_xlsx_report(self, filepath, found_iocs, scan_plan):
+        """
+        Дописывает строки новых индикаторов в конец существующего отчета,
+        продолжая нумерацию; прежние строки не пересчитываются. Столбцы
+        расширяются, только если новые значения длиннее. Если отчета еще нет,
+        он создается как в create_xlsx_report.
+        """
+        if not Path(filepath).exists():
+            return self.create_xlsx_report(filepath, found_iocs, scan_plan)
+        try:
+            from openpyxl import load_workbook
+            from openpyxl.utils import get_column_letter
+            scan_plan = ScanPlan.ensure(scan_plan)
+            wb = load_workbook(filepath); ws = wb.active
+            # Первая строка - заголовок, поэтому номер следующей строки данных равен max_row
+            rows = list(self._iter_report_rows(found_iocs, scan_plan, start=ws.max_row))
+            if not rows:
+                return True, "Новых строк для отчета Excel нет"
+            for col_idx, width in enumerate(self._column_widths(rows), 1):
+                dimension = ws.column_dimensions[get_column_letter(col_idx)]
+                if width > (dimension.width or 0): dimension.width = width
+            for row in rows:
+                ws.append(row)
+                for i, cell in enumerate(ws[ws.max_row]): cell.style = "ioc_number" if i == 0 else "ioc_cell"
+            wb.save(filepath)
+            return True, f"В отчет Excel добавлено строк: {len(rows)}"
+        except Exception as e:
+            return False, f"Ошибка при дополнении отчета Excel: {e}"
+
+    @staticmethod
+    def _export_systems(scan_plan):
+        """
+        Системы запросов в порядке первого появления в плане.
+        """
+        return list(dict.fromkeys(system for entry in scan_plan for system in entry.query_templates))
+
+    def _iter_export_columns(self, found_iocs, scan_plan):
+        """
+        Для каждого типа с находками в порядке плана: (IOCColumn, общие поля
+        записи из шаблона отчета, [(система, шаблоны запросов), ...]).
+        """
+        for entry in ScanPlan.ensure(scan_plan):
+            indicators = found_iocs.get(entry.name)
+            if not indicators: continue
+            template = entry.report_template
+            base = {"type": entry.name, "type_label": template.get("Тип Индикатора", entry.name),
+                    "nta": template.get("Статус Активности NTA", ""), "siem_mp": template.get("Статус Активности SIEM (MP)", "")}
+            systems = [(system, templates) for system, templates in entry.query_templates.items() if templates]
+            yield IOCColumn.ensure(entry.name, indicators), base, systems
+
+    def iter_export_records(self, found_iocs, scan_plan):
+        """
+        Лениво выдает записи выгрузки по одной на индикатор в порядке плана:
+        тип, поля шаблона отчета, исходное и нормализованное значение,
+        файлы-источники и запросы по одному индикатору для каждой системы.
+        """
+        for column, base, systems in self._iter_export_columns(found_iocs, scan_plan):
+            for raw, ioc, sources in zip(column.raw, column.normalized, column.sources):
+                record = dict(base, raw=raw, ioc=ioc, sources=list(sources))
+                record["queries"] = {system: [query.format(ioc=ioc) for query in templates] for system, templates in systems}
+                yield record
+
+    @staticmethod
+    def _open_export(filepath):
+        """
+        Открывает файл выгрузки на запись; путь с расширением .gz - со сжатием gzip.
+        """
+        if str(filepath).endswith(".gz"):
+            import gzip
+            return gzip.open(filepath, 'wt', encoding='utf-8', newline='', compresslevel=EXPORT_GZIP_LEVEL)
+        return open(filepath, 'w', encoding='utf-8', newline='')
+
+    def create_jsonl_export(self, filepath, found_iocs, scan_plan, stats=None):
+        """
+        Пишет выгрузку JSON Lines (одна запись iter_export_records на строку)
+        потоково, пачками по EXPORT_BATCH строк. Путь *.gz - со сжатием.
+        stats - необязательный RunStats для замера этапа "jsonl".
+        """
+        try:
+            if stats is None:
+                self._write_jsonl(filepath, found_iocs, scan_plan)
+            else:
+                with stats.stage("jsonl") as record:
+                    record["items"] = self._write_jsonl(filepath, found_iocs, scan_plan)
+            return True, f"Выгрузка JSONL успешно сохранена: {filepath}"
+        except Exception as e:
+            return False, f"Ошибка при сохранении выгрузки JSONL: {e}"
+
+    def _write_jsonl(self, filepath, found_iocs, scan_plan):
+        """
+        Строки собираются из заранее закодированных общих полей типа: на каждый
+        индикатор кодируются только его значения и запросы. Результат совпадает
+        с json.dumps(запись, ensure_ascii=False).
+        """
+        written, batch = 0, []
+        with self._open_export(filepath) as f:
+            for column, base, systems in self._iter_export_columns(found_iocs, scan_plan):
+                head = json.dumps(base, ensure_ascii=False)[:-1] + ', "raw": '
+                systems = [(encode_basestring(system) + ": [", templates) for system, templates in systems]
+                for raw, ioc, sources in zip(column.raw, column.normalized, column.sources):
+                    queries = ", ".join(key + ", ".join([encode_basestring(query.format(ioc=ioc)) for query in templates]) + "]"
+                                        for key, templates in systems)
+                    batch.append(f'{head}{encode_basestring(raw)}, "ioc": {encode_basestring(ioc)}, '
+                                 f'"sources": [{", ".join(map(encode_basestring, sources))}], "queries": {{{queries}}}}}\n')
+                    if len(batch) >= EXPORT_BATCH:
+                        f.write("".join(batch)); written += len(batch); batch.clear()
+            f.write("".join(batch)); written += len(batch)
+        return written
+
+    def create_csv_export(self, filepath, found_iocs, scan_plan, stats=None):
+        """
+        Пишет выгрузку CSV потоково: столбцы EXPORT_FIELDS и по столбцу
+        запросов на систему (queries_<система>, запросы через перевод строки).
+        Источники разделяются "; ". Путь *.gz - со сжатием.
+        stats - необязательный RunStats для замера этапа "csv".
+        """
+        try:
+            if stats is None:
+                self._write_csv(filepath, found_iocs, scan_plan)
+            else:
+                with stats.stage("csv") as record:
+                    record["items"] = self._write_csv(filepath, found_iocs, scan_plan)
+            return True, f"Выгрузка CSV успешно сохранена: {filepath}"
+        except Exception as e:
+            return False, f"Ошибка при сохранении выгрузки CSV: {e}"
+
+    def _write_csv(self, filepath, found_iocs, scan_plan):
+        import csv
+        scan_plan = ScanPlan.ensure(scan_plan)
+        all_systems = self._export_systems(scan_plan)
+        written, batch = 0, []
+        with self._open_export(filepath) as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_FIELDS + [f"queries_{system}" for system in all_systems])
+            for column, base, systems in self._iter_export_columns(found_iocs, scan_plan):
+                by_system = dict(systems)
+                templates = [by_system.get(system, ()) for system in all_systems]
+                head = [base["type"], base["type_label"]]
+                tail = [base["nta"], base["siem_mp"]]
+                for raw, ioc, sources in zip(column.raw, column.normalized, column.sources):
+                    batch.append(head + [raw, ioc] + tail + ["; ".join(sources)] +
+                                 ["\n".join([query.format(ioc=ioc) for query in queries]) for queries in templates])
+                    if len(batch) >= EXPORT_BATCH:
+                        writer.writerows(batch); written += len(batch); batch.clear()
+            writer.writerows(batch); written += len(batch)
+        return written
\ No newline at end of file
@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class RunStats:
+    """
+    Статистика одного прогона анализа: время и объемы по файлам, по шаблонам
+    типов IOC и по этапам отчета. Собирается только если объект передан
+    в IOCParser/ReportGenerator (параметр stats); без него код замеров не выполняется.
+    Все значения - простые словари и числа, поэтому статистику из процессов
+    пула можно вернуть через to_dict() и добавить в общую через merge().
+    """
+    def __init__(self):
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self.files = []
+        self.patterns = {}
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Замеряет этап отчета. Внутри блока можно указать число обработанных
+        элементов: record["items"] = N. Повторные этапы с тем же именем суммируются.
+        """
+        record = {"seconds": 0.0, "items": 0}
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - started
+            self._add_stage(name, record)
+
+    def _add_stage(self, name, record):
+        total = self.stages.setdefault(name, {"seconds": 0.0, "items": 0})
+        total["seconds"] += record["seconds"]
+        total["items"] += record["items"]
+
+    def add_file(self, filepath):
+        """
+        Заводит запись о файле и возвращает ее для заполнения по ходу разбора.
+        """
+        try:
+            size = os.path.getsize(filepath)
+        except OSError:
+            size = 0
+        record = {"file": str(filepath), "bytes": size, "extract_s": 0.0, "scan_s": 0.0,
+                  "chars": 0, "indicators": 0, "cached": ""}
+        self.files.append(record)
+        return record
+
+    def add_pattern(self, name, seconds, matches, chars):
+        total = self.patterns.setdefault(name, {"seconds": 0.0, "matches": 0, "chars": 0, "calls": 0})
+        total["seconds"] += seconds
+        total["matches"] += matches
+        total["chars"] += chars
+        total["calls"] += 1
+
+    def to_dict(self):
+        return {
+            "started": self.started,
+            "totals": {
+                "files": len(self.files),
+                "bytes": sum(f["bytes"] for f in self.files),
+                "chars_scanned": sum(p["chars"] for p in self.patterns.values()),
+            },
+            "stages": self.stages,
+            "patterns": self.patterns,
+            "files": self.files,
+        }
+
+    def merge(self, data):
+        """
+        Добавляет статистику, полученную через to_dict() (например, из процесса пула).
+        """
+        self.files.extend(data["files"])
+        for name, values in data["patterns"].items():
+            total = self.patterns.setdefault(name, {"seconds": 0.0, "matches": 0, "chars": 0, "calls": 0})
+            for key, value in values.items(): total[key] += value
+        for name, record in data["stages"].items():
+            self._add_stage(name, record)
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def summary_lines(self, top_files=5):
+        """
+        Сводная таблица для лога: этапы, шаблоны по убыванию времени и самые медленные файлы.
+        """
+        lines = [f"{'Этап':<22}{'сек':>10}{'элементов':>12}"]
+        for name, record in self.stages.items():
+            lines.append(f"{name:<22}{record['seconds']:>10.3f}{record['items']:>12}")
+        if self.patterns:
+            lines.append(f"{'Шаблон':<22}{'сек':>10}{'совпадений':>12}{'символов':>14}")
+            for name, record in sorted(self.patterns.items(), key=lambda item: -item[1]["seconds"]):
+                lines.append(f"{name:<22}{record['seconds']:>10.3f}{record['matches']:>12}{record['chars']:>14}")
+        if self.files:
+            lines.append(f"{'Самые медленные файлы':<22}{'текст, с':>10}{'поиск, с':>12}{'символов':>14}")
+            for record in sorted(self.files, key=lambda f: -(f["extract_s"] + f["scan_s"]))[:top_files]:
+                name = os.path.basename(record["file"])
+                lines.append(f"{name[:21]:<22}{record['extract_s']:>10.3f}{record['scan_s']:>12.3f}{record['chars']:>14}")
+        return lines
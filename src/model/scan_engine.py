@@ -0,0 +1,302 @@
+import re
+import time
+
+from src.model.ioc_tokenizer import IOCTokenizer
+
+try:
+    # Python 3.11+: внутренний парсер регулярных выражений переехал в пакет re
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # pragma: no cover - старые версии Python
+    import sre_parse
+    import sre_constants
+
+_NEWLINE = ord('\n')
+
+# Категории символьных классов, в которые входит перевод строки
+_NEWLINE_CATEGORIES = {
+    sre_constants.CATEGORY_NOT_DIGIT,
+    sre_constants.CATEGORY_SPACE,
+    sre_constants.CATEGORY_NOT_WORD,
+    sre_constants.CATEGORY_LINEBREAK,
+}
+
+# Якоря, которые ведут себя одинаково на границе строки и на границе окна поиска
+_LINE_SAFE_AT = {
+    sre_constants.AT_BOUNDARY,
+    sre_constants.AT_NON_BOUNDARY,
+}
+
+
+def _class_has_newline(items):
+    """
+    Проверяет, входит ли '\\n' в символьный класс [...] из разобранного шаблона.
+    """
+    negate = False
+    contains = False
+    for op, av in items:
+        if op is sre_constants.NEGATE:
+            negate = True
+        elif op is sre_constants.LITERAL:
+            contains = contains or av == _NEWLINE
+        elif op is sre_constants.RANGE:
+            contains = contains or av[0] <= _NEWLINE <= av[1]
+        elif op is sre_constants.CATEGORY:
+            contains = contains or av in _NEWLINE_CATEGORIES
+        else:
+            return True  # Неизвестный элемент - считаем, что перевод строки возможен
+    return contains != negate
+
+
+def _can_cross_newline(subpattern, flags):
+    """
+    Возвращает True, если шаблон может захватить или "подсмотреть" символ '\\n'.
+    Анализ консервативный: всё незнакомое считается пересекающим строку.
+    """
+    for op, av in subpattern:
+        if op is sre_constants.LITERAL:
+            if av == _NEWLINE: return True
+        elif op is sre_constants.NOT_LITERAL:
+            if av != _NEWLINE: return True
+        elif op is sre_constants.ANY:
+            if flags & re.DOTALL: return True
+        elif op is sre_constants.IN:
+            if _class_has_newline(av): return True
+        elif op is sre_constants.AT:
+            if av in _LINE_SAFE_AT: continue
+            if av in (sre_constants.AT_BEGINNING, sre_constants.AT_END) and flags & re.MULTILINE: continue
+            return True
+        elif op is sre_constants.BRANCH:
+            if any(_can_cross_newline(branch, flags) for branch in av[1]): return True
+        elif op is sre_constants.SUBPATTERN:
+            group, add_flags, del_flags, body = av
+            if _can_cross_newline(body, (flags | add_flags) & ~del_flags): return True
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            if _can_cross_newline(av[2], flags): return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _can_cross_newline(av[1], flags): return True
+        elif op is sre_constants.GROUPREF:
+            continue  # Содержимое группы уже проверено там, где она объявлена
+        else:
+            return True
+    return False
+
+
+def _required_literals(subpattern, flags):
+    """
+    Собирает литеральные подстроки, которые обязательно входят в любое совпадение.
+    Учитываются только последовательности верхнего уровня, обязательные группы
+    и повторения с минимумом >= 1; ветвления и проверки пропускаются.
+    """
+    literals = []
+    run = []
+
+    def flush():
+        if run: literals.append(''.join(run))
+        run.clear()
+
+    for op, av in subpattern:
+        if op is sre_constants.LITERAL:
+            char = chr(av)
+            # При IGNORECASE годятся только символы без регистра (цифры, знаки)
+            if flags & re.IGNORECASE and char.lower() != char.upper():
+                flush()
+            else:
+                run.append(char)
+            continue
+        flush()
+        if op is sre_constants.SUBPATTERN:
+            group, add_flags, del_flags, body = av
+            literals.extend(_required_literals(body, (flags | add_flags) & ~del_flags))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            literals.extend(_required_literals(av[2], flags))
+    flush()
+    return literals
+
+
+class ScanEntry:
+    """
+    Один тип IOC, подготовленный к поиску: скомпилированный шаблон из плана,
+    режим извлечения и результаты статического анализа шаблона.
+    Для встроенных шаблонов хешей и IPv4 поиск выполняет IOCTokenizer.
+    """
+    __slots__ = ("name", "pattern", "use_value_group", "literals", "line_local", "max_width", "tokens")
+
+    def __init__(self, plan_entry, tokenizer=None):
+        self.name = plan_entry.name
+        self.pattern = plan_entry.pattern
+        self.use_value_group = plan_entry.use_value_group
+        self.tokens = tokenizer.for_regex(plan_entry.regex) if tokenizer is not None else None
+        try:
+            parsed = sre_parse.parse(self.pattern.pattern)
+            flags = self.pattern.flags
+            self.literals = [lit for lit in _required_literals(parsed, flags) if lit]
+            self.line_local = not _can_cross_newline(parsed, flags)
+            self.max_width = parsed.getwidth()[1]
+        except Exception:
+            # Анализ - только оптимизация; при любой неожиданности ищем по всему тексту
+            self.literals = []
+            self.line_local = False
+            self.max_width = sre_constants.MAXREPEAT
+
+    def extract(self, content, start, end):
+        """
+        Возвращает найденные значения в окне [start, end) с той же семантикой,
+        что и re.finditer(...).group('value') / re.findall(...).
+        """
+        if self.tokens is not None:
+            return self.tokens(content, start, end)
+        if self.use_value_group:
+            return [match.group('value') for match in self.pattern.finditer(content, start, end)]
+        return self.pattern.findall(content, start, end)
+
+    def extract_starting(self, content, start, end, limit):
+        """
+        Как extract, но только для совпадений, начинающихся до позиции limit
+        (совпадения, начавшиеся позже, найдет следующий фрагмент текста).
+        Возвращает (список значений, конец последнего совпадения или start).
+        """
+        if self.tokens is not None:
+            return self.tokens(content, start, end, limit)
+        values, last_end = [], start
+        groups = self.pattern.groups
+        for match in self.pattern.finditer(content, start, end):
+            if match.start() >= limit: break
+            if self.use_value_group: values.append(match.group('value'))
+            elif groups == 0: values.append(match.group())
+            elif groups == 1: values.append(match.group(1) or '')
+            else: values.append(match.groups(''))
+            last_end = match.end()
+        return values, last_end
+
+    def find(self, content, pos=0, limit=None, resume=None):
+        """
+        Ищет значения во всем тексте или, если задан limit, только совпадения,
+        начинающиеся в [pos, limit). resume - позиция (не раньше pos), до которой
+        текст уже поглощен совпадением предыдущего фрагмента: поиск продолжается
+        с нее, как продолжил бы re.finditer по всему файлу.
+        Возвращает (множество значений, просмотрено символов, конец последнего
+        совпадения, начавшегося до limit, но не раньше resume).
+        """
+        found, scanned = set(), 0
+        if limit is not None and resume is not None: pos = max(pos, resume)
+        last_end = pos
+        for start, end in self.windows(content):
+            if limit is None:
+                scanned += end - start
+                found.update(self.extract(content, start, end))
+                continue
+            if end <= pos: continue
+            if start >= limit: break
+            start = max(start, pos)
+            scanned += end - start
+            values, window_end = self.extract_starting(content, start, end, limit)
+            found.update(values)
+            last_end = max(last_end, window_end)
+        return found, scanned, last_end
+
+    def windows(self, content):
+        """
+        Возвращает участки текста, где может находиться совпадение.
+        Если в тексте нет обязательного литерала, шаблон вообще не запускается.
+        Для шаблонов, не выходящих за пределы строки, сканируются только строки
+        с самым редким обязательным литералом.
+        """
+        if not self.literals:
+            return [(0, len(content))]
+        if not all(lit in content for lit in self.literals):
+            return []
+        if not self.line_local:
+            return [(0, len(content))]
+        anchor = min(self.literals, key=content.count)
+        return self._lines_with(content, anchor)
+
+    @staticmethod
+    def _lines_with(content, anchor):
+        find, rfind, length = content.find, content.rfind, len(content)
+        pos = 0
+        while True:
+            index = find(anchor, pos)
+            if index < 0: return
+            start = rfind('\n', 0, index) + 1
+            end = find('\n', index)
+            if end < 0: end = length
+            yield start, end
+            pos = end + 1
+
+
+class ScanEngine:
+    """
+    Движок поиска IOC по плану сканирования (ScanPlan). Прогоняет по тексту
+    только те шаблоны, чьи обязательные литералы ("якоря") в тексте есть,
+    причем строко-локальные шаблоны запускаются лишь на строках с якорем.
+    Результат совпадает с поочередным re.findall/re.finditer по всему тексту.
+    """
+    def __init__(self, plan):
+        self.entries = []
+        # Общий для всех типов: один проход по hex-последовательностям на MD5, SHA1 и SHA256
+        self.tokenizer = IOCTokenizer()
+        for plan_entry in plan.enabled():
+            if plan_entry.pattern is None:
+                print(f"Ошибка в регулярном выражении для {plan_entry.name}: {plan.errors.get(plan_entry.name)}")
+                continue
+            self.entries.append(ScanEntry(plan_entry, self.tokenizer))
+
+    def scan(self, content, stats=None):
+        """
+        Возвращает словарь {тип IOC: список уникальных найденных значений}.
+        stats - необязательный RunStats для замера времени каждого шаблона.
+        """
+        if stats is not None:
+            return self._scan_timed(content, stats)
+        raw_finds = {}
+        for entry in self.entries:
+            found = set()
+            for start, end in entry.windows(content):
+                found.update(entry.extract(content, start, end))
+            if found: raw_finds[entry.name] = list(found)
+        self.tokenizer.clear()
+        return raw_finds
+
+    def max_overlap(self, cap):
+        """
+        Сколько символов должны перекрываться соседние фрагменты текста, чтобы
+        не разрезать ни одно совпадение: максимальная длина совпадения среди
+        шаблонов, для шаблонов неограниченной длины - не больше cap.
+        """
+        return min(max((entry.max_width for entry in self.entries), default=0), cap)
+
+    def scan_chunk(self, content, pos, limit, stats=None, carry=None):
+        """
+        Ищет совпадения, начинающиеся в [pos, limit). Текст до pos нужен
+        только как контекст (\\b, ретроспективные проверки), текст после limit -
+        как перекрытие, чтобы совпадения у правой границы не обрезались.
+        carry - {тип IOC: сколько символов от pos уже поглотило совпадение
+        предыдущего фрагмента}; обновляется для следующего фрагмента, чтобы
+        его поиск не начинался с середины такого совпадения (см. ScanEntry.find).
+        Возвращает {тип IOC: множество значений}.
+        """
+        raw_finds = {}
+        for entry in self.entries:
+            started = time.perf_counter() if stats is not None else 0
+            resume = pos + carry.get(entry.name, 0) if carry is not None else None
+            found, scanned, last_end = entry.find(content, pos, limit, resume)
+            if carry is not None: carry[entry.name] = max(last_end - limit, 0)
+            if stats is not None: stats.add_pattern(entry.name, time.perf_counter() - started, len(found), scanned)
+            if found: raw_finds[entry.name] = found
+        self.tokenizer.clear()
+        return raw_finds
+
+    def _scan_timed(self, content, stats):
+        """
+        То же, что scan, но с замером времени, числа совпадений и объема
+        просмотренного текста для каждого шаблона.
+        """
+        raw_finds = {}
+        for entry in self.entries:
+            started = time.perf_counter()
+            found, scanned, _ = entry.find(content)
+            stats.add_pattern(entry.name, time.perf_counter() - started, len(found), scanned)
+            if found: raw_finds[entry.name] = list(found)
+        self.tokenizer.clear()
+        return raw_finds
\ No newline at end of file
@@ -0,0 +1,97 @@
+import json
+import re
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+
+class PlanEntry(NamedTuple):
+    """
+    Один тип IOC в плане сканирования. Поля только для чтения.
+    """
+    name: str
+    enabled: bool
+    regex: str
+    pattern: Optional[re.Pattern]  # None, если шаблон пуст или не компилируется
+    use_value_group: bool          # True - берем группу (?P<value>...), иначе результат re.findall
+    report_template: MappingProxyType
+    query_templates: MappingProxyType  # {система: кортеж шаблонов}
+    priority: int
+
+
+class ScanPlan:
+    """
+    Неизменяемый "план сканирования": типы IOC в порядке конфига
+    с заранее скомпилированными регулярными выражениями и шаблонами
+    запросов и отчета. Строится ConfigManager при загрузке и изменении
+    конфигурации и используется парсером и генератором отчетов.
+    """
+    def __init__(self, ioc_types):
+        # Снимок исходных данных: по нему план сравнивается с новой конфигурацией
+        # и пересоздается в дочерних процессах (скомпилированные шаблоны не передаются)
+        # Сравнение идет по тексту JSON, чтобы учитывался и порядок ключей (порядок типов в отчетах)
+        self._source_json = json.dumps(ioc_types, ensure_ascii=False)
+        self._source = json.loads(self._source_json)
+        self.errors = {}
+        entries = []
+        for name, data in self._source.items():
+            regex = data.get("regex", "")
+            pattern = None
+            if regex:
+                try:
+                    pattern = re.compile(regex)
+                except re.error as e:
+                    self.errors[name] = str(e)
+            entries.append(PlanEntry(
+                name=name,
+                enabled=bool(data.get("enabled")),
+                regex=regex,
+                pattern=pattern,
+                use_value_group='(?P<value>' in regex,
+                report_template=MappingProxyType(dict(data.get("report_template", {}))),
+                query_templates=MappingProxyType({system: tuple(templates) for system, templates in data.get("query_templates", {}).items()}),
+                priority=data.get("priority", 999),
+            ))
+        self.entries = tuple(entries)
+        self._by_name = {entry.name: entry for entry in self.entries}
+        self.signature = tuple((entry.name, entry.regex) for entry in self.entries if entry.enabled)
+
+    def __reduce__(self):
+        return (ScanPlan, (self._source,))
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def names(self):
+        return [entry.name for entry in self.entries]
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def enabled(self):
+        """
+        Включенные типы с непустым шаблоном (в том числе с ошибкой компиляции).
+        """
+        return [entry for entry in self.entries if entry.enabled and entry.regex]
+
+    def matches_config(self, ioc_types):
+        return self._source_json == json.dumps(ioc_types, ensure_ascii=False)
+
+    @classmethod
+    def ensure(cls, ioc_config):
+        """
+        Принимает план или словарь типов IOC и всегда возвращает план.
+        """
+        return ioc_config if isinstance(ioc_config, cls) else cls(ioc_config)
+
+    @staticmethod
+    def validate(ioc_types):
+        """
+        Возвращает {имя типа: текст ошибки} для шаблонов, которые не компилируются.
+        """
+        return ScanPlan(ioc_types).errors
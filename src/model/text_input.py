@@ -0,0 +1,75 @@
+import codecs
+import mmap
+import os
+from functools import lru_cache
+from pathlib import Path
+
+# Расширения файлов, которые разбираются как обычный текст (выгрузки логов, почты)
+TEXT_SUFFIXES = {".txt", ".log", ".csv", ".eml"}
+# Сколько байт перед фрагментом передается как контекст для \b и ретроспективных проверок
+CONTEXT_BYTES = 256
+
+
+def is_text_input(filepath):
+    return Path(filepath).suffix.lower() in TEXT_SUFFIXES
+
+
+def _char_boundary(data, index):
+    """
+    Сдвигает позицию влево на начало символа UTF-8 (пропускает байты продолжения).
+    """
+    while index > 0 and data[index] & 0xC0 == 0x80:
+        index -= 1
+    return index
+
+
+@lru_cache(maxsize=None)
+def _chunk_mode(encoding):
+    """
+    Как резать файл на фрагменты по байтам: "utf-8" - по границам символов UTF-8,
+    "byte" - однобайтовая ASCII-совместимая кодировка (cp1251, koi8-r, latin-1),
+    None - по байтам резать нельзя (UTF-16/32, многобайтовые кодировки).
+    """
+    name = codecs.lookup(encoding).name
+    if name in ("utf-8", "utf-8-sig"): return "utf-8"
+    # Кодировки с переключением состояния escape-последовательностями
+    if name.startswith(("iso2022", "hz", "utf-7")): return None
+    if "\n".encode(encoding) == b"\n" and len(bytes(range(256)).decode(encoding, 'replace')) == 256: return "byte"
+    return None
+
+
+def iter_text_chunks(filepath, chunk_size, overlap, encoding="utf-8"):
+    """
+    Читает текстовый файл через mmap фрагментами примерно по chunk_size байт,
+    не загружая его целиком. Фрагменты режутся по переводу строки (если в
+    пределах фрагмента он есть). Выдает тройки (текст, pos, limit): искать
+    нужно совпадения, начинающиеся в [pos, limit); до pos - контекст предыдущего
+    фрагмента, после limit - перекрытие не меньше overlap символов со следующим.
+    Файл в кодировке, которую нельзя резать по байтам (см. _chunk_mode),
+    декодируется целиком и выдается одним фрагментом.
+    """
+    mode = _chunk_mode(encoding)
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size: return
+        if mode is None:
+            text = f.read().decode(encoding, 'replace')
+            if text: yield text, 0, len(text)
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # В UTF-8 символ занимает до 4 байт
+            overlap_bytes = overlap * 4
+            start = 0
+            while start < size:
+                end = min(start + chunk_size, size)
+                if end < size:
+                    newline = data.rfind(b'\n', start, end)
+                    if newline >= start:
+                        end = newline + 1
+                    elif mode == "utf-8" and _char_boundary(data, end) > start:
+                        end = _char_boundary(data, end)
+                prefix = data[max(0, start - CONTEXT_BYTES):start].decode(encoding, 'replace')
+                core = data[start:end].decode(encoding, 'replace')
+                tail = data[end:min(end + overlap_bytes, size)].decode(encoding, 'replace')
+                yield prefix + core + tail, len(prefix), len(prefix) + len(core)
+                start = end
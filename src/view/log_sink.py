@@ -0,0 +1,57 @@
+import collections
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+
+class LogSink:
+    """
+    Потокобезопасный кольцевой буфер сообщений лога.
+    Писать в него можно из любого потока (write стоит одну операцию с deque),
+    а интерфейс периодически забирает накопившиеся строки пачкой (drain).
+    Если интерфейс не успевает, самые старые строки вытесняются - их число
+    считается в dropped и сообщается строкой в начале следующей пачки. При заданном log_path сообщения дублируются
+    в файл с ротацией по размеру.
+    """
+    def __init__(self, capacity=5000, log_path=None, max_bytes=1024 * 1024, backups=3):
+        self._lines = collections.deque(maxlen=max(int(capacity), 1))
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self._file_logger = None
+        if log_path:
+            # Отдельный логгер вне дерева logging, чтобы не зависеть от глобальной настройки
+            handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%Y-%m-%d %H:%M:%S"))
+            self._file_logger = logging.Logger("ioc_parser.log_sink")
+            self._file_logger.addHandler(handler)
+
+    @staticmethod
+    def _format(message):
+        return f"[{datetime.now().strftime('%H:%M:%S')}] {message}"
+
+    def write(self, message):
+        line = self._format(message)
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen: self.dropped += 1
+            self._lines.append(line)
+        if self._file_logger is not None:
+            self._file_logger.info(message)
+
+    def drain(self, limit=None):
+        """
+        Забирает из буфера до limit строк (все, если limit не задан).
+        Если с прошлого раза строки вытеснялись, первой идет строка с их числом,
+        а счетчик dropped обнуляется.
+        """
+        with self._lock:
+            count = len(self._lines) if limit is None else min(limit, len(self._lines))
+            lines = [self._lines.popleft() for _ in range(count)]
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            lines.insert(0, self._format(f"... пропущено строк лога: {dropped} (вывод не успевал за сообщениями)"))
+        return lines
+
+    def close(self):
+        if self._file_logger is not None:
+            for handler in self._file_logger.handlers: handler.close()
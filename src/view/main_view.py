@@ -1,18 +1,19 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 
-# Импортируем классы для каждой из наших будущих вкладок
+# Вкладки "Настройка IOC" и "Результаты запросов" импортируются и создаются
+# при первом открытии (см. get_tab), главная - сразу
 from src.view.tabs.main_tab import MainTab
-from src.view.tabs.settings_tab import SettingsTab
-from src.view.tabs.results_tab import ResultsTab
 
 class MainView(ttk.Window):
     """
     Главное окно приложения.
     Наследуется от ttkbootstrap.Window для применения современных тем.
-    Создает и управляет основными вкладками интерфейса.
+    Создает и управляет основными вкладками интерфейса. Содержимое вкладок,
+    кроме главной, строится при первом выборе вкладки или первом обращении
+    к ней (settings_tab, results_tab), чтобы окно появлялось сразу.
     """
-    def __init__(self, theme='flatly'):
+    def __init__(self, theme='flatly', lazy_settings=False, log_sink=None, log_max_lines=5000):
         # Инициализируем окно с выбранной темой
         super().__init__(themename=theme)
 
@@ -25,21 +26,71 @@ class MainView(ttk.Window):
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(expand=True, fill=BOTH, padx=10, pady=10)
 
-        # --- Создание экземпляров каждой вкладки ---
-        # Мы передаем self.notebook в каждую вкладку, чтобы она знала, где ей размещаться
-        self.main_tab = MainTab(self.notebook)
-        self.settings_tab = SettingsTab(self.notebook)
-        self.results_tab = ResultsTab(self.notebook)
-
-        # --- Добавление вкладок в Notebook ---
+        # --- Создание главной вкладки ---
+        # log_sink - общий буфер сообщений лога (см. LogSink), log_max_lines - лимит строк в окне лога
+        self.main_tab = MainTab(self.notebook, log_sink=log_sink, log_max_lines=log_max_lines)
         self.notebook.add(self.main_tab, text="Главная")
-        self.notebook.add(self.settings_tab, text="Настройка IOC")
-        self.notebook.add(self.results_tab, text="Результаты запросов")
+
+        # --- Отложенные вкладки: пустая рамка-заглушка сейчас, содержимое - при первом открытии ---
+        # lazy_settings - создавать поля настроек IOC только при разворачивании блока
+        self._tab_factories = {
+            "settings": lambda parent: self._import_tab("settings_tab", "SettingsTab")(parent, lazy=lazy_settings),
+            "results": lambda parent: self._import_tab("results_tab", "ResultsTab")(parent),
+        }
+        self._tab_hosts, self._tabs, self._tab_callbacks = {}, {}, {}
+        for name, text in (("settings", "Настройка IOC"), ("results", "Результаты запросов")):
+            host = ttk.Frame(self.notebook)
+            self.notebook.add(host, text=text)
+            self._tab_hosts[name] = host
+            self._tab_callbacks[name] = []
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+
+    @staticmethod
+    def _import_tab(module_name, class_name):
+        module = __import__(f"src.view.tabs.{module_name}", fromlist=[class_name])
+        return getattr(module, class_name)
+
+    def on_tab_built(self, name, callback):
+        """
+        Регистрирует callback(вкладка), вызываемый сразу после создания вкладки name
+        (или немедленно, если она уже создана) - например, чтобы контроллер привязал события.
+        """
+        if name in self._tabs:
+            callback(self._tabs[name])
+        else:
+            self._tab_callbacks[name].append(callback)
+
+    def get_tab(self, name):
+        """
+        Возвращает вкладку name, при необходимости создавая ее содержимое.
+        """
+        tab = self._tabs.get(name)
+        if tab is None:
+            tab = self._tab_factories[name](self._tab_hosts[name])
+            tab.pack(fill=BOTH, expand=True)
+            self._tabs[name] = tab
+            for callback in self._tab_callbacks.pop(name): callback(tab)
+        return tab
+
+    @property
+    def settings_tab(self):
+        return self.get_tab("settings")
+
+    @property
+    def results_tab(self):
+        return self.get_tab("results")
+
+    def _on_tab_changed(self, event):
+        selected = self.notebook.select()
+        for name, host in self._tab_hosts.items():
+            if str(host) == selected and name not in self._tabs:
+                self.get_tab(name)
 
     def log(self, message):
         """
         Прокси-метод для удобного доступа к логу из контроллера.
-        Перенаправляет вызов в соответствующий метод на главной вкладке.
+        Сообщение попадает в буфер LogSink и выводится на главной вкладке по таймеру,
+        поэтому метод дешевый и его можно вызывать из фоновых потоков.
         """
         self.main_tab.log(message)
 
@@ -47,4 +98,4 @@ class MainView(ttk.Window):
         """
         Метод для программного переключения на вкладку с результатами.
         """
-        self.notebook.select(self.results_tab)
\ No newline at end of file
+        self.notebook.select(self._tab_hosts["results"])
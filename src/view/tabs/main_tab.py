@@ -1,15 +1,24 @@
 import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from datetime import datetime
+
+from src.view.log_sink import LogSink
+
+# Период вывода накопившихся сообщений лога, мс, и максимум строк за один раз
+LOG_DRAIN_MS = 100
+LOG_DRAIN_BATCH = 500
 
 class MainTab(ttk.Frame):
     """
     Класс для вкладки "Главная".
     Отвечает за выбор НЕСКОЛЬКИХ файлов, запуск анализа и отображение логов.
+    Сообщения лога копятся в LogSink и выводятся пачками по таймеру;
+    в виджете хранится не больше log_max_lines последних строк.
     """
-    def __init__(self, parent):
+    def __init__(self, parent, log_sink=None, log_max_lines=5000):
         super().__init__(parent, padding="10")
+        self.log_sink = log_sink if log_sink is not None else LogSink(log_max_lines)
+        self.log_max_lines = log_max_lines
 
         # --- 1. Секция выбора файлов ---
         file_frame = ttk.LabelFrame(self, text="1. Файлы для анализа")
@@ -38,8 +47,28 @@ class MainTab(ttk.Frame):
         action_frame = ttk.LabelFrame(self, text="2. Запуск анализа")
         action_frame.pack(fill=X, padx=5, pady=5)
         
-        self.run_button = ttk.Button(action_frame, text="Сформировать отчеты", bootstyle=SUCCESS)
-        self.run_button.pack(pady=10)
+        run_frame = ttk.Frame(action_frame)
+        run_frame.pack(fill=X)
+        
+        self.run_button = ttk.Button(run_frame, text="Сформировать отчеты", bootstyle=SUCCESS)
+        self.run_button.pack(side=LEFT, expand=True, pady=10)
+        
+        self.cancel_button = ttk.Button(run_frame, text="Отмена", bootstyle=WARNING, state="disabled")
+        self.cancel_button.pack(side=LEFT, padx=10, pady=10)
+        
+        self.clear_cache_button = ttk.Button(run_frame, text="Очистить кэш", bootstyle=(SECONDARY, OUTLINE))
+        self.clear_cache_button.pack(side=RIGHT, padx=10, pady=10)
+
+        # Отчеты только по индикаторам, которых не было в прошлых запусках (см. IOCHistory)
+        self.new_only_var = tk.BooleanVar(value=False)
+        self.new_only_check = ttk.Checkbutton(run_frame, text="Только новые индикаторы", variable=self.new_only_var)
+        self.new_only_check.pack(side=RIGHT, padx=10, pady=10)
+        
+        # Прогресс фонового анализа
+        self.progress_bar = ttk.Progressbar(action_frame, mode='determinate', bootstyle=SUCCESS)
+        self.progress_bar.pack(fill=X, padx=10)
+        self.progress_label = ttk.Label(action_frame, text="")
+        self.progress_label.pack(fill=X, padx=10, pady=(2, 5))
         
         # --- 3. Секция логов ---
         log_frame = ttk.LabelFrame(self, text="Лог выполнения")
@@ -47,10 +76,36 @@ class MainTab(ttk.Frame):
         
         self.log_text = tk.Text(log_frame, height=10, wrap='word', font=("Courier New", 9))
         self.log_text.pack(fill=BOTH, expand=True, padx=5, pady=5)
+        self.after(LOG_DRAIN_MS, self._drain_log)
+
+    def set_running(self, running):
+        """
+        Переключает кнопки запуска/отмены на время фонового анализа.
+        """
+        self.run_button.config(state="disabled" if running else "normal")
+        self.cancel_button.config(state="normal" if running else "disabled")
+        if running:
+            self.set_progress(0, 1, "")
+
+    def set_progress(self, done, total, stage):
+        self.progress_bar.config(maximum=max(total, 1), value=done)
+        self.progress_label.config(text=stage)
 
     def log(self, message):
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        full_message = f"[{timestamp}] {message}\n"
-        self.log_text.insert(END, full_message)
-        self.log_text.see(END)
-        self.update_idletasks()
\ No newline at end of file
+        """
+        Ставит сообщение в очередь вывода; безопасно вызывать из любого потока.
+        """
+        self.log_sink.write(message)
+
+    def _drain_log(self):
+        """
+        Выводит накопившиеся сообщения одной вставкой и обрезает лог до лимита строк.
+        """
+        lines = self.log_sink.drain(LOG_DRAIN_BATCH)
+        if lines:
+            self.log_text.insert(END, "\n".join(lines) + "\n")
+            excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - self.log_max_lines
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_text.see(END)
+        self.after(LOG_DRAIN_MS, self._drain_log)
\ No newline at end of file
@@ -1,76 +1,123 @@
-import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 
+# Сколько символов запроса показывать в таблице; полный текст в виджеты не попадает
+QUERY_PREVIEW_CHARS = 150
+ALL_ITEMS = "Все"
+CHECK_MARK = "✔"
+
 class ResultsTab(ttk.Frame):
     """
     Класс для вкладки "Результаты запросов".
-    Отображает интерактивную таблицу со сгенерированными запросами.
+    Отображает сгенерированные запросы в таблице Treeview. Полные тексты запросов
+    хранятся только в модели вкладки (self.rows), в таблице - короткое превью,
+    поэтому даже тысячи запросов не создают тысяч виджетов.
     """
     def __init__(self, parent):
         super().__init__(parent, padding="10")
-        
-        # --- Прокручиваемая область для результатов ---
-        canvas = tk.Canvas(self)
-        scrollbar = ttk.Scrollbar(self, orient="vertical", command=canvas.yview)
-        self.scrollable_frame = ttk.Frame(canvas)
-
-        self.scrollable_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side=LEFT, fill=BOTH, expand=True)
+
+        # --- Панель фильтров и действий ---
+        toolbar = ttk.Frame(self)
+        toolbar.pack(side=TOP, fill=X, pady=(0, 5))
+
+        ttk.Label(toolbar, text="Тип:").pack(side=LEFT)
+        self.type_filter = ttk.Combobox(toolbar, state="readonly", width=15, values=[ALL_ITEMS])
+        self.type_filter.set(ALL_ITEMS)
+        self.type_filter.pack(side=LEFT, padx=(5, 15))
+
+        ttk.Label(toolbar, text="Система:").pack(side=LEFT)
+        self.system_filter = ttk.Combobox(toolbar, state="readonly", width=10, values=[ALL_ITEMS])
+        self.system_filter.set(ALL_ITEMS)
+        self.system_filter.pack(side=LEFT, padx=(5, 15))
+
+        self.copy_checked_button = ttk.Button(toolbar, text="Копировать все отмеченные", bootstyle=SUCCESS)
+        self.copy_checked_button.pack(side=RIGHT)
+
+        self.copy_selected_button = ttk.Button(toolbar, text="Копировать выбранные")
+        self.copy_selected_button.pack(side=RIGHT, padx=10)
+
+        # --- Таблица запросов ---
+        table_frame = ttk.Frame(self)
+        table_frame.pack(side=TOP, fill=BOTH, expand=True)
+
+        columns = ("name", "system", "query", "length", "done")
+        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", selectmode="extended")
+        for column, text, width, stretch in (("name", "Имя", 100, False), ("system", "Система", 100, False),
+                                             ("query", "Запрос", 600, True), ("length", "Длина", 80, False),
+                                             ("done", "Выполнено", 90, False)):
+            self.tree.heading(column, text=text)
+            self.tree.column(column, width=width, stretch=stretch, anchor=W if column == "query" else CENTER)
+
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=LEFT, fill=BOTH, expand=True)
         scrollbar.pack(side=RIGHT, fill=Y)
 
-        # Переменные для хранения виджетов, к которым нужен доступ
-        self.copy_buttons = []
-        self.checkbox_vars = []
+        self.type_filter.bind("<<ComboboxSelected>>", lambda e: self._apply_filters())
+        self.system_filter.bind("<<ComboboxSelected>>", lambda e: self._apply_filters())
+        # Щелчок по колонке "Выполнено" переключает отметку строки
+        self.tree.bind("<Button-1>", self._on_click)
 
-    def populate_results(self, query_data, ioc_config):
+        # Модель вкладки: список строк-словарей, iid строки в таблице - ее индекс
+        self.rows = []
+
+    def populate_results(self, query_data, scan_plan):
         """
-        Очищает и заново строит таблицу с результатами.
+        Заполняет модель запросами и перестраивает таблицу с учетом фильтров.
         """
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        
-        self.copy_buttons.clear()
-        self.checkbox_vars.clear()
-
-        # Заголовки таблицы
-        headers = ["Имя", "Система", "Инфо", "-", "Выполнено"]
-        for i, header in enumerate(headers):
-            ttk.Label(self.scrollable_frame, text=header, font=('Helvetica', 10, 'bold')).grid(row=0, column=i, sticky='w', padx=5, pady=5)
-        self.scrollable_frame.grid_columnconfigure(2, weight=1)
-        
-        row_idx = 1
-        sorted_keys = sorted(query_data.keys(), key=lambda k: ioc_config.get(k, {}).get("priority", 999))
-
+        self.rows = []
+        sorted_keys = sorted(query_data.keys(), key=lambda k: scan_plan.get(k).priority if k in scan_plan else 999)
         for name in sorted_keys:
-            items = query_data.get(name, [])
-            if not items:
-                continue
-
-            # Объединенная ячейка с названием IOC
-            name_label = ttk.Label(self.scrollable_frame, text=name, font=('Helvetica', 10, 'bold'))
-            name_label.grid(row=row_idx, column=0, rowspan=len(items), sticky='ns', padx=5, pady=5)
-            
-            for i, item in enumerate(items):
-                ttk.Label(self.scrollable_frame, text=item['system']).grid(row=row_idx + i, column=1, sticky='w', padx=5)
-                
-                info_entry = ttk.Entry(self.scrollable_frame, width=100)
-                info_entry.insert(0, item['query'])
-                info_entry.config(state='readonly')
-                info_entry.grid(row=row_idx + i, column=2, sticky='ew', padx=5, pady=2)
-                
-                checkbox_var = tk.BooleanVar(value=True)
-                
-                copy_button = ttk.Button(self.scrollable_frame, text="Копировать")
-                # Здесь мы сохраняем entry и checkbox_var для использования в контроллере
-                self.copy_buttons.append((copy_button, info_entry, checkbox_var))
-                copy_button.grid(row=row_idx + i, column=3, padx=5)
-                
-                ttk.Checkbutton(self.scrollable_frame, variable=checkbox_var).grid(row=row_idx + i, column=4, padx=5)
-            
-            row_idx += len(items)
-            ttk.Separator(self.scrollable_frame, orient='horizontal').grid(row=row_idx, column=0, columnspan=5, sticky='ew', pady=10)
-            row_idx += 1
\ No newline at end of file
+            for item in query_data.get(name, []):
+                system_text = item['system'] if item.get('parts', 1) == 1 else f"{item['system']} ({item['part']}/{item['parts']})"
+                self.rows.append({"name": name, "system": item['system'], "system_text": system_text,
+                                  "query": item['query'], "checked": True})
+
+        self.type_filter.config(values=[ALL_ITEMS] + list(dict.fromkeys(row["name"] for row in self.rows)))
+        self.system_filter.config(values=[ALL_ITEMS] + sorted({row["system"] for row in self.rows}))
+        self.type_filter.set(ALL_ITEMS)
+        self.system_filter.set(ALL_ITEMS)
+        self._apply_filters()
+
+    def _apply_filters(self):
+        """
+        Показывает в таблице только строки, подходящие под фильтры типа и системы.
+        """
+        self.tree.delete(*self.tree.get_children())
+        type_value, system_value = self.type_filter.get(), self.system_filter.get()
+        for index, row in enumerate(self.rows):
+            if type_value != ALL_ITEMS and row["name"] != type_value: continue
+            if system_value != ALL_ITEMS and row["system"] != system_value: continue
+            query = row["query"]
+            preview = query if len(query) <= QUERY_PREVIEW_CHARS else query[:QUERY_PREVIEW_CHARS] + "…"
+            self.tree.insert("", END, iid=str(index), values=(row["name"], row["system_text"], preview, len(query), self._mark(row)))
+
+    @staticmethod
+    def _mark(row):
+        return CHECK_MARK if row["checked"] else ""
+
+    def _on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != "cell": return
+        if self.tree.identify_column(event.x) != "#5": return
+        iid = self.tree.identify_row(event.y)
+        if iid:
+            self.set_checked([int(iid)], not self.rows[int(iid)]["checked"])
+
+    def set_checked(self, indexes, checked):
+        for index in indexes:
+            row = self.rows[index]
+            row["checked"] = checked
+            if self.tree.exists(str(index)):
+                self.tree.set(str(index), "done", self._mark(row))
+
+    def get_selected_indexes(self):
+        return [int(iid) for iid in self.tree.selection()]
+
+    def get_checked_indexes(self):
+        """
+        Отмеченные строки среди видимых с учетом фильтров.
+        """
+        return [int(iid) for iid in self.tree.get_children() if self.rows[int(iid)]["checked"]]
+
+    def get_queries(self, indexes):
+        return [self.rows[index]["query"] for index in indexes]
@@ -1,3 +1,4 @@
+import copy
 import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
@@ -5,10 +6,14 @@ from ttkbootstrap.constants import *
 class SettingsTab(ttk.Frame):
     """
     Класс для вкладки "Настройка IOC".
-    Динамически создает виджеты для управления каждым типом IOC с возможностью сортировки.
+    Для каждого типа IOC держит один постоянный блок виджетов: при сортировке,
+    добавлении и удалении типов меняются только затронутые блоки, остальные
+    не пересоздаются. В ленивом режиме (lazy=True) поля редактирования блока
+    создаются только при первом разворачивании.
     """
-    def __init__(self, parent):
+    def __init__(self, parent, lazy=False):
         super().__init__(parent, padding="10")
+        self.lazy = lazy
         
         top_button_frame = ttk.Frame(self)
         top_button_frame.pack(side=TOP, fill=X, pady=5)
@@ -30,81 +35,180 @@ class SettingsTab(ttk.Frame):
         canvas.pack(side=LEFT, fill=BOTH, expand=True)
         scrollbar.pack(side=RIGHT, fill=Y)
 
+        # Блоки по имени IOC: {"frame", "data", "enabled", "move_up", "move_down", "toggle", "body"}
+        self.blocks = {}
+        # Порядок блоков на экране
+        self.order = []
+        # Поля редактирования уже построенных блоков (по имени IOC)
         self.ioc_widgets = {}
-        # Списки для кнопок сортировки, которые будет использовать контроллер
-        self.move_up_buttons = []
-        self.move_down_buttons = []
 
     def populate_settings(self, ioc_config_dict):
         """
-        Очищает и заново строит все виджеты настроек на основе словаря конфига.
+        Приводит вкладку в соответствие со словарем конфига: создает блоки
+        новых типов, удаляет блоки исчезнувших и расставляет все в порядке словаря.
+        Блоки существующих типов не пересоздаются. Возвращает имена новых блоков,
+        чтобы контроллер привязал к ним свои обработчики.
         """
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        self.ioc_widgets = {}
-        self.move_up_buttons.clear()
-        self.move_down_buttons.clear()
-        
-        # Теперь порядок блоков определяется порядком элементов в словаре
-        for name, data in ioc_config_dict.items():
-            self._add_ioc_widget(name, data)
+        for name in [name for name in self.order if name not in ioc_config_dict]:
+            self.remove_block(name)
+        added = []
+        for index, (name, data) in enumerate(ioc_config_dict.items()):
+            if name not in self.blocks:
+                self.add_block(name, data, index)
+                added.append(name)
+            elif self.order.index(name) != index:
+                self.move_block(name, index)
+        return added
 
-    def _add_ioc_widget(self, name, data):
+    def add_block(self, name, data, index=None):
         """
-        Создает блок виджетов для одного типа IOC, включая кнопки сортировки.
+        Создает блок одного типа IOC и ставит его на позицию index (по умолчанию - в конец).
         """
         frame = ttk.LabelFrame(self.scrollable_frame, text=name, padding=10)
-        frame.pack(fill=X, padx=5, pady=5, expand=True)
-        
-        widgets = {}
+        block = {"frame": frame, "data": copy.deepcopy(data), "body": None}
         
         # --- Панель управления (Вкл/Выкл и стрелки) ---
         control_frame = ttk.Frame(frame)
-        control_frame.grid(row=0, column=0, columnspan=2, sticky='ew', pady=5)
+        control_frame.grid(row=0, column=0, sticky='ew', pady=5)
 
-        widgets["enabled"] = tk.BooleanVar(value=data.get("enabled", True))
-        ttk.Checkbutton(control_frame, text="Включено", variable=widgets["enabled"]).pack(side=LEFT)
+        block["enabled"] = tk.BooleanVar(value=data.get("enabled", True))
+        ttk.Checkbutton(control_frame, text="Включено", variable=block["enabled"]).pack(side=LEFT)
         
-        # --- Кнопки-стрелки для сортировки ---
+        # --- Кнопки-стрелки для сортировки (команды назначает контроллер) ---
         sort_frame = ttk.Frame(control_frame)
         sort_frame.pack(side=RIGHT)
 
-        move_up_btn = ttk.Button(sort_frame, text="▲", width=3)
-        move_up_btn.pack(side=LEFT, padx=(0, 2))
-        self.move_up_buttons.append((move_up_btn, name)) # Сохраняем кнопку и имя IOC
+        block["move_up"] = ttk.Button(sort_frame, text="▲", width=3)
+        block["move_up"].pack(side=LEFT, padx=(0, 2))
+
+        block["move_down"] = ttk.Button(sort_frame, text="▼", width=3)
+        block["move_down"].pack(side=LEFT)
+
+        block["toggle"] = None
+        if self.lazy:
+            block["toggle"] = ttk.Button(sort_frame, text="▸", width=3, bootstyle=SECONDARY,
+                                         command=lambda n=name: self.toggle_block(n))
+            block["toggle"].pack(side=LEFT, padx=(2, 0))
+        
+        frame.grid_columnconfigure(0, weight=1)
+        self.blocks[name] = block
+        if not self.lazy:
+            self._build_editors(name)
+
+        if index is None or index >= len(self.order):
+            frame.pack(fill=X, padx=5, pady=5, expand=True)
+            self.order.append(name)
+        else:
+            frame.pack(fill=X, padx=5, pady=5, expand=True, before=self.blocks[self.order[index]]["frame"])
+            self.order.insert(index, name)
+
+    def remove_block(self, name):
+        block = self.blocks.pop(name, None)
+        if block is None: return
+        block["frame"].destroy()
+        self.order.remove(name)
+        self.ioc_widgets.pop(name, None)
+
+    def move_block(self, name, index):
+        """
+        Переставляет один блок на позицию index, меняя только порядок упаковки.
+        """
+        self.order.remove(name)
+        self.order.insert(index, name)
+        frame = self.blocks[name]["frame"]
+        if index + 1 < len(self.order):
+            frame.pack_configure(before=self.blocks[self.order[index + 1]]["frame"])
+        elif index > 0:
+            frame.pack_configure(after=self.blocks[self.order[index - 1]]["frame"])
+
+    def toggle_block(self, name):
+        """
+        Разворачивает или сворачивает блок; поля создаются при первом разворачивании.
+        """
+        block = self.blocks[name]
+        if block["body"] is None:
+            self._build_editors(name)
+        elif block["body"].winfo_manager():
+            block["body"].grid_remove()
+        else:
+            block["body"].grid()
+        if block["toggle"] is not None:
+            block["toggle"].config(text="▾" if block["body"].winfo_manager() else "▸")
 
-        move_down_btn = ttk.Button(sort_frame, text="▼", width=3)
-        move_down_btn.pack(side=LEFT)
-        self.move_down_buttons.append((move_down_btn, name)) # Сохраняем кнопку и имя IOC
+    def _build_editors(self, name):
+        """
+        Создает поля редактирования блока по сохраненным данным типа IOC.
+        """
+        block = self.blocks[name]
+        data = block["data"]
+        body = ttk.Frame(block["frame"])
+        body.grid(row=1, column=0, sticky='ew')
+        block["body"] = body
+        widgets = {}
         
-        # --- Остальные поля ---
-        ttk.Label(frame, text="Регулярное выражение:").grid(row=1, column=0, sticky='w')
+        ttk.Label(body, text="Регулярное выражение:").grid(row=1, column=0, sticky='w')
         widgets["regex"] = tk.StringVar(value=data.get("regex", "")); 
-        ttk.Entry(frame, textvariable=widgets["regex"], width=80).grid(row=1, column=1, sticky='ew', pady=2)
+        ttk.Entry(body, textvariable=widgets["regex"], width=80).grid(row=1, column=1, sticky='ew', pady=2)
         
         rt = data.get("report_template", {})
-        ttk.Label(frame, text="Тип в отчете:").grid(row=2, column=0, sticky='w')
+        ttk.Label(body, text="Тип в отчете:").grid(row=2, column=0, sticky='w')
         widgets["type"] = tk.StringVar(value=rt.get("Тип Индикатора", "")); 
-        ttk.Entry(frame, textvariable=widgets["type"]).grid(row=2, column=1, sticky='ew', pady=2)
+        ttk.Entry(body, textvariable=widgets["type"]).grid(row=2, column=1, sticky='ew', pady=2)
         
-        ttk.Label(frame, text="Статус NTA:").grid(row=3, column=0, sticky='w')
+        ttk.Label(body, text="Статус NTA:").grid(row=3, column=0, sticky='w')
         widgets["nta"] = tk.StringVar(value=rt.get("Статус Активности NTA", "")); 
-        ttk.Entry(frame, textvariable=widgets["nta"]).grid(row=3, column=1, sticky='ew', pady=2)
+        ttk.Entry(body, textvariable=widgets["nta"]).grid(row=3, column=1, sticky='ew', pady=2)
         
-        ttk.Label(frame, text="Статус SIEM (MP):").grid(row=4, column=0, sticky='w')
+        ttk.Label(body, text="Статус SIEM (MP):").grid(row=4, column=0, sticky='w')
         widgets["siem_mp"] = tk.StringVar(value=rt.get("Статус Активности SIEM (MP)", "")); 
-        ttk.Entry(frame, textvariable=widgets["siem_mp"]).grid(row=4, column=1, sticky='ew', pady=2)
+        ttk.Entry(body, textvariable=widgets["siem_mp"]).grid(row=4, column=1, sticky='ew', pady=2)
         
         qt = data.get("query_templates", {"MP10": [], "NAD": []})
-        ttk.Label(frame, text="Шаблоны MP10:").grid(row=5, column=0, sticky='nw', pady=5)
-        widgets["mp10_queries"] = tk.Text(frame, height=3, width=80, font=("Courier New", 9))
+        ttk.Label(body, text="Шаблоны MP10:").grid(row=5, column=0, sticky='nw', pady=5)
+        widgets["mp10_queries"] = tk.Text(body, height=3, width=80, font=("Courier New", 9))
         widgets["mp10_queries"].grid(row=5, column=1, sticky='ew', pady=2)
         widgets["mp10_queries"].insert("1.0", "\n".join(qt.get("MP10", [])))
         
-        ttk.Label(frame, text="Шаблоны NAD:").grid(row=6, column=0, sticky='nw', pady=5)
-        widgets["nad_queries"] = tk.Text(frame, height=3, width=80, font=("Courier New", 9))
+        ttk.Label(body, text="Шаблоны NAD:").grid(row=6, column=0, sticky='nw', pady=5)
+        widgets["nad_queries"] = tk.Text(body, height=3, width=80, font=("Courier New", 9))
         widgets["nad_queries"].grid(row=6, column=1, sticky='ew', pady=2)
         widgets["nad_queries"].insert("1.0", "\n".join(qt.get("NAD", [])))
         
-        frame.grid_columnconfigure(1, weight=1)
-        self.ioc_widgets[name] = widgets
\ No newline at end of file
+        body.grid_columnconfigure(1, weight=1)
+        self.ioc_widgets[name] = widgets
+
+    def get_ioc_data(self, name):
+        """
+        Данные типа IOC в формате конфига: из полей блока, если они построены,
+        иначе - сохраненные при создании блока (с текущим флагом "Включено").
+        """
+        block = self.blocks[name]
+        data = copy.deepcopy(block["data"])
+        data["enabled"] = block["enabled"].get()
+        widgets = self.ioc_widgets.get(name)
+        if widgets is None:
+            return data
+        data["regex"] = widgets["regex"].get()
+        data["report_template"] = {
+            "Тип Индикатора": widgets["type"].get(),
+            "Статус Активности NTA": widgets["nta"].get(),
+            "Статус Активности SIEM (MP)": widgets["siem_mp"].get()
+        }
+        data["query_templates"] = {
+            "MP10": [line for line in widgets["mp10_queries"].get("1.0", "end-1c").strip().split('\n') if line],
+            "NAD": [line for line in widgets["nad_queries"].get("1.0", "end-1c").strip().split('\n') if line]
+        }
+        return data
+
+    def get_all_ioc_data(self):
+        """
+        Все типы IOC в порядке блоков на экране.
+        """
+        return {name: self.get_ioc_data(name) for name in self.order}
+
+    def mark_saved(self, ioc_config_dict):
+        """
+        Запоминает сохраненные данные как исходные для блоков (без перестройки виджетов).
+        """
+        for name, data in ioc_config_dict.items():
+            if name in self.blocks: self.blocks[name]["data"] = copy.deepcopy(data)
@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Тесты запускаются из корня проекта: python -m pytest
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.model import config_manager
+
+
+@pytest.fixture
+def default_config(tmp_path, monkeypatch):
+    """
+    ConfigManager с конфигурацией по умолчанию во временном каталоге.
+    """
+    monkeypatch.setattr(config_manager, "CONFIG_FILE", tmp_path / "config.txt")
+    return config_manager.ConfigManager()
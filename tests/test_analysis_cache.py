@@ -0,0 +1,88 @@
+import os
+
+import pytest
+from docx import Document
+
+from src.model.analysis_cache import AnalysisCache, plan_hash
+from src.model.ioc_parser import IOCParser
+from src.model.run_stats import RunStats
+from src.model.scan_plan import ScanPlan
+
+MD5 = "0123456789abcdef0123456789abcdef"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = AnalysisCache(tmp_path / "cache.sqlite3", max_bytes=10 * 1024 * 1024)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def bulletin(tmp_path):
+    path = tmp_path / "b.docx"
+    document = Document()
+    document.add_paragraph(f"Хеш {MD5}, адрес 10[.]0[.]0[.]1")
+    document.save(path)
+    return str(path)
+
+
+def plan(md5_regex=r"\b[a-fA-F0-9]{32}\b"):
+    return ScanPlan({"MD5": {"enabled": True, "regex": md5_regex},
+                     "IP": {"enabled": True, "regex": r"\b(?:\d{1,3}(?:\[\.\]|\.)){3}\d{1,3}\b"}})
+
+
+def run(parser, path, scan_plan):
+    stats = RunStats()
+    found = parser.extract_all_iocs([path], scan_plan, stats=stats)
+    return {name: list(column) for name, column in found.items()}, stats.files[0]["cached"]
+
+
+def test_hit_and_miss(cache, bulletin):
+    parser = IOCParser(cache)
+    expected = {"MD5": [MD5], "IP": ["10[.]0[.]0[.]1"]}
+    assert run(parser, bulletin, plan()) == (expected, "")
+    assert run(parser, bulletin, plan()) == (expected, "matches")
+
+
+def test_plan_change_rescans_stored_text(cache, bulletin):
+    parser = IOCParser(cache)
+    expected = {"MD5": [MD5], "IP": ["10[.]0[.]0[.]1"]}
+    run(parser, bulletin, plan())
+    # Изменился шаблон - повторный поиск по сохраненному тексту, без чтения .docx
+    assert run(parser, bulletin, plan(r"\b[a-f0-9]{32}\b")) == (expected, "text")
+    assert run(parser, bulletin, plan(r"\b[a-f0-9]{32}\b")) == (expected, "matches")
+    # Прежний набор шаблонов по-прежнему берется из кэша
+    assert run(parser, bulletin, plan()) == (expected, "matches")
+
+
+def test_changed_file_is_rescanned(cache, bulletin):
+    parser = IOCParser(cache)
+    run(parser, bulletin, plan())
+    document = Document()
+    document.add_paragraph("адрес 192[.]168[.]0[.]1")
+    document.save(bulletin)
+    assert run(parser, bulletin, plan()) == ({"IP": ["192[.]168[.]0[.]1"]}, "")
+
+
+def test_matches_roundtrip_and_clear(cache):
+    scan_hash = plan_hash(plan().signature)
+    finds = {"MD5": {MD5}, "pairs": {("a", "1")}}
+    cache.put_matches("file", scan_hash, finds)
+    assert cache.get_matches("file", scan_hash) == finds
+    assert cache.get_matches("file", plan_hash(plan("x").signature)) is None
+    cache.clear()
+    assert cache.get_matches("file", scan_hash) is None
+
+
+def test_eviction_keeps_size_limit(tmp_path):
+    cache = AnalysisCache(tmp_path / "small.sqlite3", max_bytes=2000)
+    try:
+        # Случайные данные почти не сжимаются: каждая запись ~1000 байт
+        texts = [os.urandom(500).hex() for _ in range(20)]
+        for i, text in enumerate(texts):
+            cache.put_text(f"file{i}", text)
+        assert cache.get_text("file0") is None
+        assert cache.get_text("file19") == texts[19]
+    finally:
+        cache.close()
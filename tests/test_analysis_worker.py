@@ -0,0 +1,64 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+from src.controller.analysis_worker import AnalysisWorker
+from src.controller.app_controller import AppController
+from src.model.ioc_parser import IOCParser
+from src.model.report_generator import ReportGenerator
+
+
+def make_worker(default_config, tmp_path, count=3):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"feed{i}.txt"
+        path.write_text(f"адрес 10[.]0[.]0[.]{i + 1}\n", encoding="utf-8")
+        paths.append(str(path))
+    model = {"config": default_config, "parser": IOCParser(), "reporter": ReportGenerator()}
+    return AnalysisWorker(model, paths, default_config.get_scan_plan(), 1,
+                          str(tmp_path / "report.xlsx"), tmp_path / "report_queries.txt")
+
+
+def drain(worker):
+    worker.join(60)
+    events = []
+    while not worker.events.empty(): events.append(worker.events.get_nowait())
+    return events
+
+
+def test_progress_events_in_order(default_config, tmp_path):
+    worker = make_worker(default_config, tmp_path)
+    worker.start()
+    events = drain(worker)
+    progress = [event[1] for event in events if event[0] == "progress"]
+    assert progress == sorted(progress)
+    assert progress[0] == 0 and progress[-1] == worker.total_steps
+    files = [event[1] for event in events if event[0] == "progress" and event[3].startswith("Разбор файлов: ")]
+    assert files == [1, 2, 3]
+    assert events[-1][0] == "done" and events[-1][1]["success"]
+    assert Path(worker.xlsx_path).exists()
+
+
+def test_cancel_between_files(default_config, tmp_path):
+    worker = make_worker(default_config, tmp_path)
+    on_file_scanned = worker._on_file_scanned
+
+    def cancel_after_first(done, total, path):
+        on_file_scanned(done, total, path)
+        if done == 1: worker.cancel()
+
+    worker._on_file_scanned = cancel_after_first
+    worker.start()
+    events = drain(worker)
+    assert events[-1] == ("cancelled", None)
+    assert [event[1] for event in events if event[0] == "progress"] == [0, 1]
+    assert not Path(worker.xlsx_path).exists()
+
+
+def test_second_run_is_refused():
+    messages = []
+    controller = AppController.__new__(AppController)
+    controller._analysis = SimpleNamespace(is_alive=lambda: True)
+    # Без main_tab: любое обращение к списку файлов упало бы
+    controller.view = SimpleNamespace(log=messages.append)
+    controller._handle_run_analysis()
+    assert messages == ["Анализ уже выполняется. Дождитесь завершения или нажмите \"Отмена\"."]
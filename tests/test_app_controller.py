@@ -0,0 +1,22 @@
+from types import SimpleNamespace
+
+from src.controller.app_controller import AppController
+
+
+def controller_for(config):
+    # Без окна: контроллер с моделью и заглушкой вкладки настроек
+    moves = []
+    controller = AppController.__new__(AppController)
+    controller.model = {"config": config}
+    controller.view = SimpleNamespace(settings_tab=SimpleNamespace(move_block=lambda name, index: moves.append((name, index))))
+    return controller, moves
+
+
+def test_move_ioc_reorders_scan_plan(default_config):
+    controller, moves = controller_for(default_config)
+    assert default_config.get_scan_plan().names()[:3] == ["IP", "DNS", "URI"]
+    controller._handle_move_ioc("DNS", direction=-1)
+    assert moves == [("DNS", 0)]
+    assert default_config.get_scan_plan().names()[:3] == ["DNS", "IP", "URI"]
+    controller._handle_move_ioc("DNS", direction=-1)
+    assert moves == [("DNS", 0)]
@@ -0,0 +1,27 @@
+import random
+
+from src.model.containment_index import ContainmentIndex
+from src.model.ioc_parser import IOCParser
+
+
+def test_contains_matches_substring_check():
+    rng = random.Random(4)
+    strings = ["".join(rng.choice("abc") for _ in range(rng.randint(0, 12))) for _ in range(40)]
+    index = ContainmentIndex(strings)
+    for _ in range(500):
+        value = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 14)))
+        assert index.contains(value) == any(value in s for s in strings), value
+
+
+def test_empty_index():
+    index = ContainmentIndex([])
+    assert not index.contains("")
+    assert not index.contains("a")
+
+
+def test_clean_finds_drops_md5_inside_sha():
+    sha256 = "0123456789abcdef" * 4
+    md5_inside, md5_alone = sha256[8:40], "f" * 32
+    cleaned = IOCParser.clean_finds({"SHA256": [sha256], "MD5": sorted([md5_inside, md5_alone])})
+    assert list(cleaned["MD5"]) == [md5_alone]
+    assert list(cleaned["SHA256"]) == [sha256]
@@ -0,0 +1,62 @@
+import io
+import zipfile
+
+from src.model.docx_text import iter_docx_text
+
+NAMESPACES = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+              'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"')
+
+
+def paragraph(text):
+    return f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" if text else "<w:p/>"
+
+
+def cell(text, props=""):
+    return f"<w:tc><w:tcPr>{props}</w:tcPr>{paragraph(text)}</w:tc>"
+
+
+def part(root, body):
+    return f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:{root} {NAMESPACES}>{body}</w:{root}>'
+
+
+def docx(body, **extra_parts):
+    # Минимальный .docx в памяти: python-docx и файлы-образцы не нужны
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", part("document", f"<w:body>{body}</w:body>"))
+        for name, xml in extra_parts.items():
+            archive.writestr(f"word/{name}.xml", xml)
+    buffer.seek(0)
+    return buffer
+
+
+def test_merged_cells_once():
+    grid_span, merge_start, merge_continue = '<w:gridSpan w:val="2"/>', '<w:vMerge w:val="restart"/>', "<w:vMerge/>"
+    table = ("<w:tbl>"
+             f"<w:tr>{cell('gridspan 1.2.3.4', grid_span)}</w:tr>"
+             f"<w:tr>{cell('vmerge evil[.]com', merge_start)}{cell('x')}</w:tr>"
+             f"<w:tr>{cell('', merge_continue)}{cell('y')}</w:tr>"
+             "</w:tbl>")
+    assert list(iter_docx_text(docx(paragraph("до") + table + paragraph("после")))) == \
+        ["до", "gridspan 1.2.3.4", "vmerge evil[.]com", "x", "y", "после"]
+
+
+def test_headers_footers_and_notes_included():
+    source = docx(paragraph("тело"),
+                  header1=part("hdr", paragraph("верхний")), footer2=part("ftr", paragraph("нижний")),
+                  footnotes=part("footnotes", f"<w:footnote>{paragraph('сноска')}</w:footnote>"),
+                  styles=part("styles", paragraph("не текст документа")))
+    assert list(iter_docx_text(source)) == ["тело", "нижний", "сноска", "верхний"]
+
+
+def test_fallback_skipped():
+    textbox = ("<w:p><w:r><mc:AlternateContent>"
+               f"<mc:Choice Requires=\"wps\"><w:txbxContent>{paragraph('в надписи')}</w:txbxContent></mc:Choice>"
+               f"<mc:Fallback><w:txbxContent>{paragraph('в надписи')}</w:txbxContent></mc:Fallback>"
+               "</mc:AlternateContent></w:r><w:r><w:t>вокруг</w:t></w:r></w:p>")
+    assert list(iter_docx_text(docx(textbox))) == ["в надписи", "вокруг"]
+
+
+def test_special_run_elements():
+    body = "<w:p><w:r><w:t>a</w:t><w:tab/><w:t>b</w:t><w:br/><w:t>c</w:t><w:noBreakHyphen/><w:t>d</w:t></w:r></w:p>"
+    assert list(iter_docx_text(docx(body))) == ["a\tb\nc-d"]
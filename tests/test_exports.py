@@ -0,0 +1,73 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from src.model import report_generator
+from src.model.ioc_column import IOCColumn
+from src.model.report_generator import EXPORT_FIELDS, ReportGenerator
+
+PLAN = {
+    "File": {"enabled": True, "regex": "x", "report_template": {"Тип Индикатора": "Файл \"exe\"", "Статус Активности NTA": "\\ok"},
+             "query_templates": {"MP10": ['object.name CONTAINS "{ioc}"'], "NAD": ['files.filename ~ "{ioc}"', "raw \\ {ioc}"]}},
+    "IP": {"enabled": True, "regex": "y", "report_template": {"Тип Индикатора": "IP-адрес"},
+           "query_templates": {"MP10": ['src.ip = "{ioc}"'], "Пусто": []}},
+}
+FOUND = {
+    "File": IOCColumn.from_sources("File", ['a"b.exe', "c:\\temp\\файл.exe", "tab\tnew\nline.doc", "emoji 😀.js"],
+                                   {'a"b.exe': ("бюллетень 1.docx", "b;2.docx"), "c:\\temp\\файл.exe": ("x.docx",)}),
+    "IP": ["1[.]2[.]3[.]4", "10.0.0.1"],
+}
+
+
+def read(path):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+@pytest.fixture(params=["", ".gz"])
+def suffix(request):
+    return request.param
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    # Несколько пачек даже на маленьком наборе
+    monkeypatch.setattr(report_generator, "EXPORT_BATCH", 2)
+
+
+def test_jsonl_lines_match_json_dumps(tmp_path, suffix):
+    reporter = ReportGenerator()
+    path = tmp_path / f"export.jsonl{suffix}"
+    assert reporter.create_jsonl_export(path, FOUND, PLAN)[0]
+    lines = read(path).split("\n")
+    assert lines.pop() == ""
+    records = list(reporter.iter_export_records(FOUND, PLAN))
+    assert len(lines) == len(records) == 6
+    for line, record in zip(lines, records):
+        assert json.loads(line) == record
+        assert line == json.dumps(record, ensure_ascii=False)
+
+
+def test_csv_rows_match_records(tmp_path, suffix):
+    reporter = ReportGenerator()
+    path = tmp_path / f"export.csv{suffix}"
+    assert reporter.create_csv_export(path, FOUND, PLAN)[0]
+    rows = list(csv.reader(io.StringIO(read(path), newline="")))
+    header, rows = rows[0], rows[1:]
+    assert header == EXPORT_FIELDS + ["queries_MP10", "queries_NAD", "queries_Пусто"]
+    records = list(reporter.iter_export_records(FOUND, PLAN))
+    assert len(rows) == len(records)
+    for row, record in zip(rows, records):
+        expected = [record[field] for field in EXPORT_FIELDS[:-1]] + ["; ".join(record["sources"])]
+        expected += ["\n".join(record["queries"].get(system, [])) for system in ["MP10", "NAD", "Пусто"]]
+        assert row == expected
+
+
+def test_empty_export(tmp_path):
+    path = tmp_path / "empty.jsonl"
+    assert ReportGenerator().create_jsonl_export(path, {}, PLAN)[0]
+    assert read(path) == ""
@@ -0,0 +1,10 @@
+from src.controller.headless import collect_input_files
+
+
+def test_directory_includes_docx_and_text_inputs(tmp_path):
+    for name in ["b.docx", "a.LOG", "c.txt", "d.csv", "e.eml", "~$b.docx", "f.xlsx", "g.pdf"]:
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "sub.txt").mkdir()
+    extra = tmp_path / "extra.txt"
+    found = collect_input_files([str(tmp_path), str(extra), str(tmp_path / "c.txt")])
+    assert found == [str(tmp_path / name) for name in ["a.LOG", "b.docx", "c.txt", "d.csv", "e.eml", "extra.txt"]]
@@ -0,0 +1,46 @@
+import pytest
+
+from src.model.ioc_column import IOCColumn
+from src.model.ioc_history import IOCHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = IOCHistory(tmp_path / "history.sqlite3")
+    yield history
+    history.close()
+
+
+def column(ioc_type, values, source="a.docx"):
+    return IOCColumn.from_sources(ioc_type, values, {value: (source,) for value in values})
+
+
+def test_defanged_and_case_insensitive_types(history):
+    history.record({"IP": column("IP", ["1[.]2[.]3[.]4"]), "MD5": column("MD5", ["ABCDEF0123456789ABCDEF0123456789"]),
+                    "DNS": column("DNS", ["Evil[.]COM"])})
+    new = history.filter_new({"IP": ["1.2.3.4"], "MD5": ["abcdef0123456789abcdef0123456789"], "DNS": ["evil[.]com", "good[.]com"]})
+    assert {name: list(values) for name, values in new.items()} == {"DNS": ["good[.]com"]}
+    assert history.get("DNS", "EVIL.com")["source"] == "a.docx"
+
+
+def test_uri_and_file_keep_case(history):
+    history.record({"URI": column("URI", ["hxxp[:]//a[.]ru/payload.exe"]), "File": column("File", ["payload.exe"])})
+    new = history.filter_new({"URI": ["hxxp[:]//a[.]ru/Payload.exe", "hxxp[:]//a[.]ru/payload.exe"],
+                              "File": ["Payload.exe", "payload.exe"]})
+    assert {name: list(values) for name, values in new.items()} == {"URI": ["hxxp[:]//a[.]ru/Payload.exe"], "File": ["Payload.exe"]}
+    assert history.get("File", "PAYLOAD.EXE") is None
+
+
+def test_email_folds_only_domain(history):
+    history.record({"Email": column("Email", ["User@Mail[.]RU"])})
+    new = history.filter_new({"Email": ["User@mail[.]ru", "user@mail[.]ru"]})
+    assert {name: list(values) for name, values in new.items()} == {"Email": ["user@mail[.]ru"]}
+    assert history.get("Email", "User@MAIL.ru")["source"] == "a.docx"
+
+
+def test_record_counts_runs(history):
+    history.record({"IP": column("IP", ["1.2.3.4"])})
+    history.record({"IP": column("IP", ["1[.]2[.]3[.]4"], "b.docx")})
+    record = history.get("IP", "1.2.3.4")
+    assert (record["runs"], record["source"]) == (2, "a.docx")
+    assert history.count() == 1
@@ -0,0 +1,90 @@
+import random
+import re
+
+import pytest
+
+from src.model.ioc_tokenizer import HEX_SHAPES, IPV4_SHAPE, IOCTokenizer
+
+# Эталон для IPv4: встроенный шаблон, в котором каждый октет ограничен 0-255
+OCTET = r"(?:25[0-5]|2[0-4]\d|[01]?\d?\d)"
+STRICT_IPV4 = r"\b(?:%s(?:\[\.\]|\.)){3}%s\b" % (OCTET, OCTET)
+DOTTED_PIECES = ["0", "1", "9", "25", "255", "256", "300", "001", "1234", "٣", "2٥5", ".", ".", "[.]", "..", "a", "_", " ", "-"]
+
+PIECES = ["a", "F", "0", "9", "g", "_", "я", "1", ".", "[.]", " ", "\n", "-", "256", "255", "1.2.3.4", "300.1.1.1"]
+
+
+def random_text(seed):
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(2000):
+        if rng.random() < 0.1:
+            parts.append("".join(rng.choice("0123456789abcdefABCDEF") for _ in range(rng.choice([31, 32, 33, 40, 64]))))
+        else:
+            parts.append(rng.choice(PIECES))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("regex", list(HEX_SHAPES))
+def test_hex_matches_regex(seed, regex):
+    text = random_text(seed)
+    tokens = IOCTokenizer().for_regex(regex)
+    assert sorted(tokens(text, 0, len(text))) == sorted(re.findall(regex, text))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_hex_window_and_limit(seed):
+    text = random_text(seed)
+    regex = r"\b[a-fA-F0-9]{32}\b"
+    tokens = IOCTokenizer().for_regex(regex)
+    start, end = len(text) // 4, len(text) * 3 // 4
+    limit = len(text) // 2
+    expected = [m.group() for m in re.finditer(regex, text[:end]) if start <= m.start() < limit]
+    values, last_end = tokens(text, start, end, limit)
+    assert sorted(values) == sorted(expected)
+    assert last_end == max((m.end() for m in re.finditer(regex, text[:end]) if start <= m.start() < limit), default=start)
+
+
+def dotted_text(seed):
+    rng = random.Random(seed)
+    return "".join(rng.choice(DOTTED_PIECES) for _ in range(3000))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_ipv4_matches_strict_regex(seed):
+    tokens = IOCTokenizer().for_regex(IPV4_SHAPE)
+    for text in (random_text(seed), dotted_text(seed)):
+        assert sorted(tokens(text, 0, len(text))) == sorted(set(re.findall(STRICT_IPV4, text)))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ipv4_window_and_limit(seed):
+    text = dotted_text(100 + seed)
+    tokens = IOCTokenizer().for_regex(IPV4_SHAPE)
+    start, end = len(text) // 4, len(text) * 3 // 4
+    limit = len(text) // 2
+    matches = [m for m in re.compile(STRICT_IPV4).finditer(text, start, end) if m.start() < limit]
+    values, last_end = tokens(text, start, end, limit)
+    assert sorted(values) == sorted({m.group() for m in matches})
+    assert last_end == max((m.end() for m in matches), default=start)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1.2.3.4 255.255.255.255 256.1.1.1 10[.]0[.]0[.]999 8[.]8[.]8[.]8", ["1.2.3.4", "255.255.255.255", "8[.]8[.]8[.]8"]),
+    ("300.1.2.3.4", ["1.2.3.4"]),
+    ("1.2.3.4.5.6.7.8.9", ["1.2.3.4", "5.6.7.8"]),
+    ("1234.1.2.3.4", ["1.2.3.4"]),
+    ("a1.2.3.4 1.2.3.4a 5.6.7.8_", []),
+    ("1..2.3.4.5 001.010.100.199", ["2.3.4.5", "001.010.100.199"]),
+])
+def test_ipv4_dotted_runs(text, expected):
+    assert sorted(IOCTokenizer.ipv4_values(text, 0, len(text))) == sorted(expected)
+
+
+def test_ipv4_repeated_run_at_window_end():
+    # Та же цепочка в середине окна отброшена границей слова, а в конце окна - нет
+    assert IOCTokenizer.ipv4_values("1.2.3.4x 1.2.3.4x", 0, 16) == ["1.2.3.4"]
+
+
+def test_custom_regex_is_not_tokenized():
+    assert IOCTokenizer().for_regex(r"\b[a-f0-9]{32}\b") is None
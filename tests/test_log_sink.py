@@ -0,0 +1,15 @@
+from src.view.log_sink import LogSink
+
+
+def test_drain_reports_dropped_lines():
+    sink = LogSink(capacity=3)
+    for i in range(5): sink.write(f"строка {i}")
+    lines = sink.drain()
+    assert "пропущено строк лога: 2" in lines[0]
+    assert [line.split("] ", 1)[1] for line in lines[1:]] == ["строка 2", "строка 3", "строка 4"]
+    assert sink.dropped == 0
+
+    # Счетчик сброшен: следующая пачка без уведомления
+    sink.write("строка 5")
+    assert [line.split("] ", 1)[1] for line in sink.drain()] == ["строка 5"]
+    assert sink.drain() == []
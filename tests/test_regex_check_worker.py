@@ -0,0 +1,25 @@
+from src.controller.analysis_worker import RegexCheckWorker
+from src.model import regex_guard
+
+
+def run_check(config, ioc_types):
+    worker = RegexCheckWorker(config, ioc_types)
+    worker.start()
+    worker.join(60)
+    return worker.events.get_nowait()
+
+
+def test_reports_blocked_and_slow(default_config):
+    ioc_types = dict(default_config.get_ioc_types())
+    ioc_types["Evil"] = {"enabled": True, "regex": "(a+)+$"}
+    kind, (blocked, slow) = run_check(default_config, ioc_types)
+    assert kind == "done"
+    assert list(blocked) == ["Evil"]
+
+
+def test_process_start_failure_is_reported(default_config, monkeypatch):
+    def fail(*args):
+        raise OSError("нельзя запустить процесс")
+    monkeypatch.setattr(regex_guard, "_start_process", fail)
+    ioc_types = dict(default_config.get_ioc_types(), New={"enabled": True, "regex": "x+"})
+    assert run_check(default_config, ioc_types) == ("error", "нельзя запустить процесс")
@@ -0,0 +1,105 @@
+import random
+import re
+
+import pytest
+
+from src.model.scan_engine import ScanEngine
+from src.model.scan_plan import ScanPlan
+
+# Встроенный IPv4 с октетами, ограниченными 0-255 (так работает токенизатор)
+STRICT_IPV4 = r"\b(?:(?:25[0-5]|2[0-4]\d|[01]?\d?\d)(?:\[\.\]|\.)){3}(?:25[0-5]|2[0-4]\d|[01]?\d?\d)\b"
+
+# Шаблоны, на которых статический анализ (литералы, окна строк) легко ошибиться
+EDGE_PATTERNS = {
+    "lookbehind": r"(?<=id=)\w+(?=;)",
+    "negative_lookaround": r"(?<![\w.])\d+\.\d+(?!\w)",
+    "space": r"key\s+\w+",
+    "negated_class": r"a[^x]b",
+    "negated_class_no_newline": r"<[^>\n]+>",
+    "alternation": r"(?:foo|bar)\d+",
+    "alternation_groups": r"(foo|bar)(\d)",
+    "no_literal": r"\d{3,}",
+    "empty_match": r"z*",
+    "multiline_anchor": r"(?m)^\w+:",
+    "text_anchor": r"^\w+|\w+$",
+    "boundary": r"\bhost-\d+\b",
+    "ignorecase": r"(?i)evil\.com",
+    "dotall": r"(?s)begin.*?end",
+    "value_group": r'"(?P<value>[^"]+)"',
+}
+
+FRAGMENTS = [
+    "1.2.3.4", "10[.]0[.]0[.]1", "999.1.1.1", "1.2.3.4.5", "evil[.]com", "EVIL.com", "hxxp[:]//evil[.]com/path?a=1&b=2",
+    '"payload.exe"', '"archive.tar.gz"', "HKLM\\Software\\Run", "hkcu\\Soft Ware\\x.", "user@mail[.]ru",
+    "id=", ";", "foo", "bar12", "foo7", "begin", "end", "key", "host-", "12", "3.14", "<tag>", "<a\nb>",
+    "axb", "a\nb", "a b", "zz", ":", "_", "\n", "\n", " ", " ", "\t", ".", ",", '"', "[.]", "x",
+]
+
+
+def random_hex(rng, length):
+    return "".join(rng.choice("0123456789abcdefABCDEF") for _ in range(length))
+
+
+def random_text(seed, pieces=3000):
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(pieces):
+        roll = rng.random()
+        if roll < 0.08:
+            parts.append(random_hex(rng, rng.choice([31, 32, 33, 40, 64, 65])))
+        else:
+            parts.append(rng.choice(FRAGMENTS))
+    return "".join(parts)
+
+
+def reference(plan, text):
+    """
+    Ожидаемый результат: re.findall (или группа value) каждого шаблона по всему тексту.
+    """
+    expected = {}
+    for entry in plan.enabled():
+        if entry.use_value_group:
+            found = {match.group("value") for match in entry.pattern.finditer(text)}
+        else:
+            found = set(entry.pattern.findall(text))
+        if found: expected[entry.name] = found
+    return expected
+
+
+def scan(plan, text):
+    return {name: set(found) for name, found in ScanEngine(plan).scan(text).items()}
+
+
+def edge_plan():
+    return ScanPlan({name: {"enabled": True, "regex": regex} for name, regex in EDGE_PATTERNS.items()})
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_default_config_matches_findall(default_config, seed):
+    plan = default_config.get_scan_plan()
+    text = random_text(seed)
+    result, expected = scan(plan, text), reference(plan, text)
+    # Встроенный IPv4 ищет только адреса с октетами 0-255
+    expected["IP"] = set(re.findall(STRICT_IPV4, text))
+    assert result == {name: found for name, found in expected.items() if found}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_edge_patterns_match_findall(seed):
+    plan = edge_plan()
+    text = random_text(100 + seed)
+    assert scan(plan, text) == reference(plan, text)
+
+
+def test_edge_patterns_on_short_texts():
+    plan = edge_plan()
+    for text in ["", "\n", "id=abc;", "key\nvalue", "a\nb", "foo\n1", "begin\nend", "head\nhost-1", "tail:"]:
+        assert scan(plan, text) == reference(plan, text), text
+
+
+def test_missing_literal_skips_pattern():
+    entry = ScanEngine(ScanPlan({"t": {"enabled": True, "regex": r"key=\d+"}})).entries[0]
+    assert entry.literals == ["key="]
+    assert list(entry.windows("no literal here\n123")) == []
+    assert list(entry.windows("x\nkey=1\ny")) == [(2, 7)]
+
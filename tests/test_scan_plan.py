@@ -0,0 +1,26 @@
+from src.model.scan_plan import ScanPlan
+
+
+def test_reordered_types_rebuild_plan(default_config):
+    ioc_types = default_config.get_ioc_types()
+    plan = default_config.get_scan_plan()
+    reordered = {name: ioc_types[name] for name in ["Registry", *[n for n in ioc_types if n != "Registry"]]}
+    assert plan.matches_config(ioc_types)
+    assert not plan.matches_config(reordered)
+
+    default_config.update_ioc_types(reordered)
+    default_config.save()
+    assert default_config.get_scan_plan().names()[:3] == ["Registry", "IP", "DNS"]
+
+
+def test_same_config_keeps_plan(default_config):
+    plan = default_config.get_scan_plan()
+    default_config.update_ioc_types(dict(default_config.get_ioc_types()))
+    assert default_config.get_scan_plan() is plan
+
+
+def test_invalid_regex_is_reported():
+    plan = ScanPlan({"Bad": {"enabled": True, "regex": "("}, "Ok": {"enabled": True, "regex": "a(?P<value>b)"}})
+    assert list(plan.errors) == ["Bad"]
+    assert plan.get("Bad").pattern is None
+    assert plan.get("Ok").use_value_group
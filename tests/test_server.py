@@ -0,0 +1,66 @@
+import http.client
+import json
+import threading
+
+import pytest
+from docx import Document
+
+from src.controller.server import AnalysisService
+from src.model.ioc_parser import IOCParser
+from src.model.report_generator import ReportGenerator
+
+
+@pytest.fixture
+def service(default_config):
+    model = {"config": default_config, "parser": IOCParser(), "reporter": ReportGenerator()}
+    service = AnalysisService(model, port=0, concurrency=1, queue_timeout=1, max_upload_mb=1)
+    thread = threading.Thread(target=service.serve_forever, daemon=True)
+    thread.start()
+    yield service
+    service.shutdown()
+
+
+def request(service, method, path, body=b"", headers=None):
+    host, port = service.server.server_address[:2]
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        conn.putrequest(method, path)
+        for name, value in (headers or {}).items(): conn.putheader(name, value)
+        conn.endheaders(body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("length", ["abc", "-1"])
+def test_bad_content_length_is_rejected(service, length):
+    status, payload = request(service, "POST", "/analyze?name=a.txt", headers={"Content-Length": length})
+    assert status == 400
+    assert "Content-Length" in payload["error"]
+
+
+def test_analyze_text_upload(service):
+    body = "адрес 10[.]0[.]0[.]1".encode("utf-8")
+    status, payload = request(service, "POST", "/analyze?name=a.txt&queries=0", body, {"Content-Length": str(len(body))})
+    assert status == 200
+    assert payload["indicators"]["IP"] == [{"raw": "10[.]0[.]0[.]1", "ioc": "10.0.0.1", "sources": ["a.txt"]}]
+
+
+def test_analyze_paths(service, tmp_path):
+    document = Document()
+    document.add_paragraph("хеш 0123456789abcdef0123456789abcdef")
+    document.save(tmp_path / "b.docx")
+    body = json.dumps({"paths": [str(tmp_path)], "queries": False}).encode("utf-8")
+    status, payload = request(service, "POST", "/analyze", body,
+                              {"Content-Type": "application/json", "Content-Length": str(len(body))})
+    assert status == 200
+    assert payload["counts"] == {"MD5": 1}
+
+
+def test_too_large_and_unknown(service):
+    body = b"x" * (1024 * 1024 + 1)
+    assert request(service, "POST", "/analyze?name=a.txt", body, {"Content-Length": str(len(body))})[0] == 413
+    assert request(service, "GET", "/nope")[0] == 404
+    status, metrics = request(service, "GET", "/metrics")
+    assert status == 200 and metrics["responses"]["413"] == 1
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from src.model.report_generator import ReportGenerator, split_balanced
+
+JOINER = " OR "
+
+
+def random_parts(rng, count):
+    return [f'object.name = "{"x" * rng.randint(1, 60)}"' for _ in range(count)]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_keeps_every_value_and_respects_limits(seed):
+    rng = random.Random(seed)
+    parts = random_parts(rng, rng.randint(1, 300))
+    max_terms, max_chars = rng.choice([0, 1, 7, 50, 500]), rng.choice([0, 30, 200, 1000, 30000])
+    chunks = list(split_balanced(parts, JOINER, max_terms, max_chars))
+    # Части идут подряд и без потерь: объединение частей дает исходный запрос
+    assert JOINER.join(chunks) == JOINER.join(parts)
+    split = [chunk.split(JOINER) for chunk in chunks]
+    assert sum(split, []) == parts
+    for terms, chunk in zip(split, chunks):
+        if max_terms: assert len(terms) <= max_terms
+        # Условие длиннее лимита остается в своей части целиком
+        if max_chars and len(terms) > 1: assert len(chunk) <= max_chars
+
+
+def test_no_limits_gives_one_part():
+    parts = ["a", "b", "c"]
+    assert list(split_balanced(parts, JOINER)) == ["a OR b OR c"]
+    assert list(split_balanced([], JOINER, 1, 1)) == []
+
+
+def test_parts_are_balanced():
+    chunks = list(split_balanced([str(i) for i in range(10)], JOINER, max_terms=4))
+    assert [len(chunk.split(JOINER)) for chunk in chunks] == [3, 3, 4]
+
+
+def test_query_data_numbers_parts():
+    reporter = ReportGenerator(query_limits={"MP10": {"max_terms": 2, "max_chars": 0}})
+    plan = {"MD5": {"enabled": True, "regex": "x", "query_templates": {"MP10": ['hash = "{ioc}"']}}}
+    items = reporter.generate_query_data({"MD5": ["a", "b", "c", "d", "e"]}, plan)["MD5"]
+    assert [(item["part"], item["parts"]) for item in items] == [(1, 3), (2, 3), (3, 3)]
+    assert " OR ".join(item["query"] for item in items).count("hash =") == 5
+
+
+@pytest.mark.parametrize("template", ['hash = "{ioc}"', 'a = "{ioc}" OR b = "{ioc}"', '{{raw}} {ioc}', 'pad {ioc:>12}', 'repr {ioc!r}'])
+@pytest.mark.parametrize("seed", range(5))
+def test_query_data_matches_split_of_formatted_terms(template, seed):
+    # Части собираются лениво по границам из длин, но совпадают с делением готовых условий
+    rng = random.Random(seed)
+    values = sorted({"x" * rng.randint(1, 40) + str(i) for i in range(rng.randint(1, 200))})
+    max_terms, max_chars = rng.choice([0, 3, 50]), rng.choice([0, 40, 300, 5000])
+    reporter = ReportGenerator(query_limits={"MP10": {"max_terms": max_terms, "max_chars": max_chars}})
+    plan = {"MD5": {"enabled": True, "regex": "x", "query_templates": {"MP10": [template]}}}
+    items = [item for _, item in reporter.iter_query_data({"MD5": values}, plan)]
+    expected = list(split_balanced([template.format(ioc=value) for value in values], JOINER, max_terms, max_chars))
+    assert [item["query"] for item in items] == expected
+    assert [(item["part"], item["parts"]) for item in items] == [(i, len(expected)) for i in range(1, len(expected) + 1)]
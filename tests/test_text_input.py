@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from src.model.ioc_parser import IOCParser
+from src.model.text_input import iter_text_chunks
+
+FRAGMENTS = [
+    "1.2.3.4", "10[.]0[.]0[.]1", "1.2.3.4.5.6", "evil[.]com", "hxxp[:]//evil[.]com/path?a=1&b=2", '"payload.exe"',
+    '"my file.tar.gz"', '"', "HKLM\\Software\\Run", "user@mail[.]ru", "Файл", " ", " ", ",", ";", ".", "[.]", "\t",
+]
+
+
+def single_line(seed, pieces=1500):
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(pieces):
+        if rng.random() < 0.1:
+            parts.append("".join(rng.choice("0123456789abcdef") for _ in range(rng.choice([32, 40, 64, 70]))))
+        else:
+            parts.append(rng.choice(FRAGMENTS))
+    return "".join(parts)
+
+
+def scan_file(path, plan, chunk_size, budget=0, encoding="utf-8"):
+    parser = IOCParser(pattern_budget=budget, text_chunk_size=chunk_size, text_encoding=encoding)
+    try:
+        return parser._scan_file(str(path), plan)
+    finally:
+        if parser._guard is not None: parser._guard.close()
+
+
+@pytest.mark.parametrize("chunk_size", [64, 100, 256, 512])
+@pytest.mark.parametrize("seed", range(3))
+def test_chunked_single_line_matches_whole_text(default_config, tmp_path, chunk_size, seed):
+    plan = default_config.get_scan_plan()
+    text = single_line(seed)
+    path = tmp_path / "blob.log"
+    path.write_text(text, encoding="utf-8")
+    whole = {name: set(found) for name, found in IOCParser()._get_engine(plan).scan(text).items()}
+    assert scan_file(path, plan, chunk_size) == whole
+
+
+def test_chunked_scan_in_guard_process(default_config, tmp_path):
+    plan = default_config.get_scan_plan()
+    text = single_line(10, pieces=400)
+    path = tmp_path / "blob.log"
+    path.write_text(text, encoding="utf-8")
+    whole = {name: set(found) for name, found in IOCParser()._get_engine(plan).scan(text).items()}
+    assert scan_file(path, plan, 128, budget=10) == whole
+
+
+def test_chunks_cover_file(tmp_path):
+    text = "строка с IOC 1.2.3.4\n" * 50 + "x" * 300
+    path = tmp_path / "a.txt"
+    path.write_text(text, encoding="utf-8")
+    cores = [content[pos:limit] for content, pos, limit in iter_text_chunks(path, 100, 20)]
+    assert "".join(cores) == text
+    # Если перевод строки есть, фрагмент заканчивается на нем
+    assert all(core.endswith("\n") for core in cores[:-4])
+
+
+@pytest.mark.parametrize("encoding", ["utf-16", "utf-16-le", "cp1251", "koi8-r", "shift_jis", "iso-2022-jp"])
+def test_chunked_scan_in_other_encodings(default_config, tmp_path, encoding):
+    # UTF-16 и многобайтовые кодировки читаются целиком, однобайтовые режутся по байтам
+    plan = default_config.get_scan_plan()
+    text = single_line(20, pieces=600)
+    path = tmp_path / "blob.log"
+    path.write_bytes(text.encode(encoding, 'replace'))
+    text = path.read_bytes().decode(encoding)
+    whole = {name: set(found) for name, found in IOCParser()._get_engine(plan).scan(text).items()}
+    assert scan_file(path, plan, 100, encoding=encoding) == whole
+    cores = [content[pos:limit] for content, pos, limit in iter_text_chunks(path, 100, 20, encoding)]
+    assert "".join(cores) == text
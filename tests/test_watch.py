@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+from docx import Document
+from openpyxl import load_workbook
+
+from src.controller.watch import FolderWatcher
+from src.model.ioc_parser import IOCParser
+from src.model.report_generator import ReportGenerator
+
+
+def bulletin(path, text):
+    document = Document()
+    document.add_paragraph(text)
+    document.save(path)
+    # Файл "докопирован": старше SETTLE_SECONDS
+    os.utime(path, (time.time() - 100,) * 2)
+
+
+@pytest.fixture
+def watcher(default_config, tmp_path):
+    (tmp_path / "in").mkdir()
+    model = {"config": default_config, "parser": IOCParser(), "reporter": ReportGenerator()}
+    return FolderWatcher(model, tmp_path / "in", tmp_path / "report.xlsx")
+
+
+def xlsx_rows(path):
+    return [tuple(cell.value for cell in row) for row in load_workbook(path).active.iter_rows(min_row=2)]
+
+
+def test_rows_keep_source_files(watcher):
+    bulletin(watcher.directory / "a.docx", "адрес 10[.]0[.]0[.]1")
+    watcher._cycle()
+    bulletin(watcher.directory / "b.docx", "адрес 10[.]0[.]0[.]2 и 10[.]0[.]0[.]1")
+    watcher._cycle()
+    rows = xlsx_rows(watcher.xlsx_path)
+    assert [(row[6], row[8]) for row in rows] == [("10[.]0[.]0[.]1", "a.docx"), ("10[.]0[.]0[.]2", "b.docx")]
+
+
+def test_failed_query_file_does_not_duplicate_rows(watcher, monkeypatch):
+    reporter = watcher.model["reporter"]
+    create_query_file = reporter.create_query_file
+    monkeypatch.setattr(reporter, "create_query_file", lambda *args, **kwargs: (False, "файл занят"))
+    bulletin(watcher.directory / "a.docx", "адрес 10[.]0[.]0[.]1")
+    assert watcher._cycle()["status"] == "error"
+    assert len(xlsx_rows(watcher.xlsx_path)) == 1
+
+    monkeypatch.setattr(reporter, "create_query_file", create_query_file)
+    # Перезапуск: состояние берется из файла рядом с отчетом
+    watcher = FolderWatcher(watcher.model, watcher.directory, watcher.xlsx_path)
+    stats = watcher._cycle()
+    assert stats["new_indicators"] == 0
+    assert len(xlsx_rows(watcher.xlsx_path)) == 1
+    assert "10.0.0.1" in watcher.txt_path.read_text(encoding="utf-8")
+    assert watcher._cycle() is None
+
+
+def test_rescanned_file_replaces_its_finds(watcher, monkeypatch):
+    sha1 = "a" * 8 + "0123456789abcdef0123456789abcdef"
+    md5 = sha1[8:]
+    bulletin(watcher.directory / "a.docx", f"хеш {sha1}")
+    bulletin(watcher.directory / "b.docx", f"хеш {md5}")
+    saves = []
+    save_state = watcher._save_state
+    monkeypatch.setattr(watcher, "_save_state", lambda: saves.append(1) or save_state())
+    watcher._cycle()
+    assert len(saves) == 1
+    # MD5 входит в SHA1 из a.docx и отбрасывается очисткой
+    assert [row[6] for row in xlsx_rows(watcher.xlsx_path)] == [sha1]
+
+    # Новая версия a.docx без SHA1: прежние находки файла больше не учитываются
+    bulletin(watcher.directory / "a.docx", "хеш удален")
+    os.utime(watcher.directory / "a.docx", (time.time() - 50,) * 2)
+    stats = watcher._cycle()
+    assert stats["new_indicators"] == 1
+    assert [row[6] for row in xlsx_rows(watcher.xlsx_path)] == [sha1, md5]
+    assert str(watcher.directory / "a.docx") not in watcher.raw
+
+    # После перезапуска находки берутся из состояния по файлам
+    restarted = FolderWatcher(watcher.model, watcher.directory, watcher.xlsx_path)
+    assert restarted.raw == {str(watcher.directory / "b.docx"): {"MD5": [md5]}}